@@ -1,5 +1,6 @@
 from django.contrib import admin
-from apps.analytics.models import ChatAnalytics, IntentAnalytics, UserActivity, MessageFeedback
+from core.utils.counts import EstimatedCountPaginator
+from apps.analytics.models import ChatAnalytics, HourlyAnalytics, IntentAnalytics, UserActivity, MessageFeedback
 
 
 
@@ -11,6 +12,13 @@ class ChatAnalyticsAdmin(admin.ModelAdmin):
     ordering = ['-date']
 
 
+@admin.register(HourlyAnalytics)
+class HourlyAnalyticsAdmin(admin.ModelAdmin):
+    list_display = ['hour', 'messages', 'user_messages', 'bot_messages', 'conversations']
+    readonly_fields = ['updated_at']
+    ordering = ['-hour']
+
+
 @admin.register(IntentAnalytics)
 class IntentAnalyticsAdmin(admin.ModelAdmin):
     list_display = ['intent_name', 'date', 'usage_count', 'avg_confidence']
@@ -21,11 +29,15 @@ class IntentAnalyticsAdmin(admin.ModelAdmin):
 
 @admin.register(UserActivity)
 class UserActivityAdmin(admin.ModelAdmin):
+    # Large tables: no exact COUNT(*) per changelist page
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_display = ['user', 'activity_type', 'timestamp']
     list_filter = ['activity_type', 'timestamp']
     readonly_fields = ['timestamp']
     search_fields = ['user__username']
     ordering = ['-timestamp']
+    list_select_related = ['user']
 
 @admin.register(MessageFeedback)
 class MessageFeedbackAdmin(admin.ModelAdmin):
@@ -34,6 +46,7 @@ class MessageFeedbackAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'comment']
     readonly_fields = ['created_at']
     ordering = ['-created_at']
+    list_select_related = ['user', 'message']
 
     def message_preview(self, obj):
         return obj.message.content[:50] + '...' if len(obj.message.content) > 50 else obj.message.content
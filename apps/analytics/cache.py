@@ -0,0 +1,106 @@
+"""
+Analytics Response Cache
+Short-lived cache for dashboard payloads, invalidated by message writes.
+
+Writes bump a global analytics version. A cached payload is served while
+  * its version is current and it is younger than ANALYTICS_CACHE_TTL, or
+  * it is younger than ANALYTICS_CACHE_MIN_FRESHNESS, even if writes happened
+    since (so a busy chat does not force a recompute on every refresh).
+Otherwise it is stale: one caller takes a lock (cache.add) and recomputes,
+while the others keep serving the stale copy instead of piling onto the
+database. Without a stale copy they wait briefly for the winner.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'analytics:version'
+KEY_PREFIX = 'analytics:payload:'
+LOCK_PREFIX = 'analytics:lock:'
+
+# Stale copies outlive their TTL so waiting callers always have something to serve
+STALE_TTL = 300
+LOCK_TIMEOUT = 30
+WAIT_INTERVAL = 0.05
+
+# result: fresh (served from cache), stale (served while another caller
+# recomputes) or computed; the hit ratio is (fresh + stale) / all
+cache_requests = metrics.counter(
+    'analytics_cache_requests_total', 'Analytics payload cache lookups by payload and result'
+)
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_version():
+    """Mark every cached analytics payload as out of date (call after writes)"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Key missing (first write or evicted): any new value invalidates
+        cache.add(VERSION_KEY, 2, timeout=None)
+    except Exception as e:
+        # A cache outage must never break the message write path
+        logger.warning(f"Could not bump analytics cache version: {e}")
+
+
+def _is_fresh(entry, version, now):
+    age = now - entry['computed_at']
+    if age < settings.ANALYTICS_CACHE_MIN_FRESHNESS:
+        return True
+    return entry['version'] == version and age < settings.ANALYTICS_CACHE_TTL
+
+
+def get_or_compute(name, compute):
+    """Cached result of compute() for the payload called `name`"""
+    key = KEY_PREFIX + name
+    version = current_version()
+    entry = cache.get(key)
+    if entry is not None and _is_fresh(entry, version, time.time()):
+        cache_requests.inc(payload=name, result='fresh')
+        return entry['data']
+
+    lock_key = LOCK_PREFIX + name
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    locked = cache.add(lock_key, 1, timeout=LOCK_TIMEOUT)
+    while not locked:
+        # Someone else is recomputing
+        if entry is not None:
+            cache_requests.inc(payload=name, result='stale')
+            return entry['data']
+        if time.monotonic() >= deadline:
+            break  # The holder looks stuck: compute without the lock
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        locked = cache.add(lock_key, 1, timeout=LOCK_TIMEOUT)
+
+    try:
+        # The previous holder may have just stored a fresh payload
+        entry = cache.get(key)
+        if entry is not None and _is_fresh(entry, current_version(), time.time()):
+            cache_requests.inc(payload=name, result='fresh')
+            return entry['data']
+
+        # Read the version before computing so writes during the
+        # computation leave the new entry already out of date
+        version = current_version()
+        data = compute()
+        cache_requests.inc(payload=name, result='computed')
+        cache.set(key, {'version': version, 'computed_at': time.time(), 'data': data}, timeout=STALE_TTL)
+        return data
+    finally:
+        if locked:
+            cache.delete(lock_key)
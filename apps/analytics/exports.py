@@ -0,0 +1,195 @@
+"""
+Streaming Exports
+Generators that turn conversations, messages and activity rows into CSV or
+JSONL bytes, optionally gzip-compressed, with constant memory: rows are read
+through server-side iterators and written out chunk by chunk.
+
+Message exports also cover archived conversations: their messages are read
+from the archive segments and follow the live rows.
+"""
+
+import csv
+import json
+import zlib
+from datetime import datetime
+from itertools import chain
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from apps.analytics.models import UserActivity
+from apps.analytics.utils import local_day_range
+from apps.chatbot.models import Conversation, Message
+from apps.chatbot.services.archive_service import iter_archived_messages
+
+# dataset -> (model, date field, user field, [(output column, ORM lookup)])
+DATASETS = {
+    'conversations': (Conversation, 'created_at', 'user_id', [
+        ('id', 'id'),
+        ('user_id', 'user_id'),
+        ('username', 'user__username'),
+        ('title', 'title'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+        ('is_active', 'is_active'),
+        ('message_count', 'message_count'),
+        ('archived_at', 'archived_at'),
+    ]),
+    'messages': (Message, 'timestamp', 'conversation__user_id', [
+        ('id', 'id'),
+        ('conversation_id', 'conversation_id'),
+        ('user_id', 'conversation__user_id'),
+        ('username', 'conversation__user__username'),
+        ('message_type', 'message_type'),
+        ('content', 'content'),
+        ('intent', 'intent'),
+        ('confidence', 'confidence'),
+        ('timestamp', 'timestamp'),
+        ('metadata', 'metadata'),
+    ]),
+    'activity': (UserActivity, 'timestamp', 'user_id', [
+        ('id', 'id'),
+        ('user_id', 'user_id'),
+        ('username', 'user__username'),
+        ('activity_type', 'activity_type'),
+        ('timestamp', 'timestamp'),
+        ('metadata', 'metadata'),
+    ]),
+}
+
+# Filters applied to every export of a dataset: messages of conversations
+# that are soft-deleted and waiting for background removal are left out
+BASE_FILTERS = {
+    'messages': {'conversation__deleted_at__isnull': True},
+}
+
+# Spreadsheet apps evaluate cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# Flush to the client roughly every 64 KB instead of once per row
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def export_columns(dataset):
+    return [column for column, _ in DATASETS[dataset][3]]
+
+
+def _archived_message_rows(start, end, user_id):
+    """Archived messages as tuples in the 'messages' column order"""
+    for conversation, message in iter_archived_messages(start, end, user_id):
+        yield (
+            message['id'],
+            conversation['id'],
+            conversation['user_id'],
+            conversation['username'],
+            message['message_type'],
+            message['content'],
+            message['intent'],
+            message['confidence'],
+            message['timestamp'],
+            message['metadata'],
+        )
+
+
+def iter_rows(dataset, start=None, end=None, user_id=None, chunk_size=None):
+    """
+    Yield value tuples for a dataset in primary-key order (archived messages
+    last). start/end are inclusive local dates; user_id limits to one user's rows.
+    """
+    model, date_field, user_field, columns = DATASETS[dataset]
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    start = local_day_range(start)[0] if start else None
+    end = local_day_range(end)[1] if end else None
+
+    queryset = model.objects.filter(**BASE_FILTERS.get(dataset, {})).order_by('id')
+    if start:
+        queryset = queryset.filter(**{f'{date_field}__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{date_field}__lt': end})
+    if user_id:
+        queryset = queryset.filter(**{user_field: user_id})
+
+    lookups = [lookup for _, lookup in columns]
+    rows = queryset.values_list(*lookups).iterator(chunk_size=chunk_size)
+    if dataset == 'messages':
+        rows = chain(rows, _archived_message_rows(start, end, user_id))
+    yield from rows
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Quote user-controlled text so it opens as text, not a formula
+        return "'" + value
+    return value
+
+
+def render_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def render_jsonl(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _encode_chunks(pieces, chunk_bytes=STREAM_CHUNK_BYTES):
+    """Join small text pieces into ~chunk_bytes UTF-8 blocks"""
+    buffer, size = [], 0
+    for piece in pieces:
+        data = piece.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_bytes:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_stream(chunks, level=6):
+    """Compress a byte stream incrementally into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(dataset, fmt='csv', compress=False, **filters):
+    """Byte chunks of a full export; memory use does not depend on row count"""
+    columns = export_columns(dataset)
+    rows = iter_rows(dataset, **filters)
+    renderer = render_csv if fmt == 'csv' else render_jsonl
+
+    chunks = _encode_chunks(renderer(columns, rows))
+    if compress:
+        chunks = gzip_stream(chunks)
+    return chunks
+
+
+def export_filename(dataset, fmt, compress):
+    return f'{dataset}.{fmt}' + ('.gz' if compress else '')
+
+
+def export_content_type(fmt, compress):
+    return 'application/gzip' if compress else FORMATS[fmt]
@@ -0,0 +1,195 @@
+"""
+Activity Ingestion
+UserActivity events are written off the request thread, in batches.
+
+log_activity() puts an event on a bounded in-process queue and returns; a
+daemon thread drains the queue and writes with one bulk_create per batch,
+flushing when ACTIVITY_BATCH_SIZE events are waiting or ACTIVITY_FLUSH_INTERVAL
+seconds after the first event of a batch arrived, whichever comes first.
+
+Backpressure is the queue bound (ACTIVITY_QUEUE_SIZE): when the writer cannot
+keep up and the queue is full, new events are dropped and counted instead of
+blocking the request. Activity is analytics, not state; losing the tail under
+overload (or on a hard kill) is the accepted trade-off. Queued events are
+flushed at interpreter exit.
+
+stats() reports what the pipeline did in this process.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, close_old_connections, connection
+from django.utils import timezone
+
+from apps.analytics.models import UserActivity
+
+logger = logging.getLogger(__name__)
+
+# Log every this many drops, so an overload does not flood the logs too
+DROP_LOG_EVERY = 1000
+
+
+class ActivityPipeline:
+    """Bounded queue plus one writer thread, started lazily per process"""
+
+    def __init__(self, max_queue=None, batch_size=None, flush_interval=None):
+        self.max_queue = max_queue or settings.ACTIVITY_QUEUE_SIZE
+        self.batch_size = batch_size or settings.ACTIVITY_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.ACTIVITY_FLUSH_INTERVAL
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._queue = None
+        self._metrics = dict.fromkeys(('enqueued', 'dropped', 'written', 'failed', 'batches'), 0)
+        self._last_flush_at = None
+        self._last_flush_seconds = None
+
+    # ---------- producer side ----------
+
+    def submit(self, user_id, activity_type, metadata=None, timestamp=None):
+        """Queue one event; never blocks and never raises"""
+        event = (user_id, activity_type, metadata or {}, timestamp or timezone.now())
+        try:
+            self._ensure_started().put_nowait(event)
+        except queue.Full:
+            dropped = self._count('dropped')
+            if dropped % DROP_LOG_EVERY == 1:
+                logger.warning(f"Activity queue full ({self.max_queue}): {dropped} events dropped so far")
+            return False
+        self._count('enqueued')
+        return True
+
+    def _ensure_started(self):
+        # A forked worker inherits the queue but not the thread: start afresh
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self.max_queue)
+                    self._thread = threading.Thread(target=self._run, name='activity-writer', daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+                    atexit.register(self.flush)
+        return self._queue
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._metrics[name] += amount
+            return self._metrics[name]
+
+    # ---------- writer thread ----------
+
+    def _run(self):
+        events = self._queue
+        while True:
+            batch = [events.get()]  # idle until something arrives
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(events.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("Activity writer failed")
+            finally:
+                for _ in batch:
+                    events.task_done()
+
+    def _write(self, batch):
+        started = time.monotonic()
+        close_old_connections()
+        try:
+            written = self._bulk_create(batch)
+        except IntegrityError:
+            # Most likely events of a user deleted while they were queued:
+            # keep the rest of the batch
+            existing = set(User.objects.filter(
+                id__in={user_id for user_id, *_ in batch}
+            ).values_list('id', flat=True))
+            written = self._bulk_create([event for event in batch if event[0] in existing])
+        except Exception as e:
+            logger.error(f"Could not write {len(batch)} activity events: {e}")
+            self._count('failed', len(batch))
+            connection.close()  # the next batch starts on a fresh connection
+            return
+
+        self._count('written', written)
+        self._count('failed', len(batch) - written)
+        self._count('batches')
+        with self._lock:
+            self._last_flush_at = timezone.now()
+            self._last_flush_seconds = round(time.monotonic() - started, 4)
+
+    def _bulk_create(self, batch):
+        rows = [
+            UserActivity(user_id=user_id, activity_type=activity_type, metadata=metadata, timestamp=timestamp)
+            for user_id, activity_type, metadata, timestamp in batch
+        ]
+        UserActivity.objects.bulk_create(rows, batch_size=self.batch_size)
+        return len(rows)
+
+    # ---------- control ----------
+
+    def flush(self, timeout=5.0):
+        """Wait (up to timeout seconds) until every queued event has been written"""
+        if self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._metrics)
+            result['queue_depth'] = self._queue.qsize() if self._pid == os.getpid() else 0
+            result['queue_capacity'] = self.max_queue
+            result['last_flush_at'] = self._last_flush_at
+            result['last_flush_seconds'] = self._last_flush_seconds
+        return result
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = ActivityPipeline()
+    return _pipeline
+
+
+def record(user_id, activity_type, metadata=None):
+    """
+    Record one activity event. Asynchronous unless ACTIVITY_ASYNC is off
+    (then written inline, e.g. for management commands and tests).
+    """
+    if settings.ACTIVITY_ASYNC:
+        return get_pipeline().submit(user_id, activity_type, metadata)
+
+    try:
+        UserActivity.objects.create(user_id=user_id, activity_type=activity_type, metadata=metadata or {})
+    except Exception as e:
+        logger.error(f"Error logging activity: {e}")
+        return False
+    return True
+
+
+def stats():
+    return get_pipeline().stats()
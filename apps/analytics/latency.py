@@ -0,0 +1,119 @@
+"""
+Chat Latency
+Where the time of a chat turn goes, stage by stage.
+
+Every turn records its stage timings (ms) twice:
+  * in the bot message's metadata ({'engine': 'ml'|'gemini', 'timings_ms': {...}}),
+    so percentiles can be computed for any past window, and
+  * in the in-process `chat_stage_ms` histogram, for a live view of this
+    process since it started.
+The bot message insert and the turn total are only known once the bot row is
+written, so they are added to its metadata with one more UPDATE at the end of
+the turn (one bulk update per batch). Batch turns store their share of the
+batch-wide stages (stage time / turns in the batch).
+"""
+
+from collections import defaultdict
+from itertools import chain
+
+from apps.chatbot.models import Message
+from apps.chatbot.services.archive_service import iter_archived_messages
+from core.utils import metrics
+
+STAGES = (
+    'conversation_lookup',
+    'user_message_insert',
+    'ml_preprocess',
+    'ml_vectorize',
+    'ml_predict',
+    'routing',
+    'history_lookup',
+    'gemini',
+    'bot_message_insert',
+    'message_insert',  # batch turns: both messages in one bulk insert
+    'total',
+)
+PERCENTILES = (50, 95, 99)
+
+# Most recent turns read for a window, so a huge window stays a bounded scan
+MAX_WINDOW_TURNS = 50000
+# Longest ?minutes= window; longer ranges are asked for by date
+MAX_WINDOW_MINUTES = 31 * 24 * 60
+
+stage_histogram = metrics.histogram(
+    'chat_stage_ms', description='Duration of each chat turn stage in milliseconds'
+)
+turns_total = metrics.counter('chat_turns_total', 'Chat turns by the engine that answered')
+
+
+def turn_metadata(timings, engine, **extra):
+    """Metadata stored on the bot message of a turn"""
+    return dict(extra, engine=engine, timings_ms=dict(timings))
+
+
+def observe_turn(timings, engine):
+    """Count one turn and add its stage timings to the live histogram"""
+    turns_total.inc(engine=engine)
+    for stage, milliseconds in timings.items():
+        stage_histogram.observe(milliseconds, stage=stage, engine=engine)
+
+
+def _summary(values):
+    values.sort()
+    row = {'count': len(values), 'mean': round(sum(values) / len(values), 3)}
+    for q in PERCENTILES:
+        row[f'p{q}'] = metrics.percentile(values, q)
+    return row
+
+
+def _archived_turns(start, end, engine):
+    """Metadata of archived bot turns in [start, end)"""
+    for _, message in iter_archived_messages(start, end):
+        metadata = message['metadata'] or {}
+        if message['message_type'] != 'bot' or 'timings_ms' not in metadata:
+            continue
+        if engine and metadata.get('engine') != engine:
+            continue
+        yield metadata
+
+
+def window_percentiles(start, end, engine=None, limit=MAX_WINDOW_TURNS):
+    """
+    {stage: {'all': summary, 'ml': summary, 'gemini': summary}} over bot
+    messages timestamped in [start, end), read from their metadata. Only the
+    most recent `limit` turns are used; `turns` reports how many were.
+    Archived conversations are idle, so their turns are older than live ones
+    and fill whatever the live rows leave of the limit.
+    """
+    queryset = Message.objects.filter(
+        message_type='bot', timestamp__gte=start, timestamp__lt=end, metadata__has_key='timings_ms'
+    )
+    if engine:
+        queryset = queryset.filter(metadata__engine=engine)
+    rows = queryset.order_by('-timestamp').values_list('metadata', flat=True)[:limit]
+
+    values = defaultdict(lambda: defaultdict(list))
+    turns = 0
+    for metadata in chain(rows.iterator(chunk_size=2000), _archived_turns(start, end, engine)):
+        if turns >= limit:
+            break
+        turns += 1
+        turn_engine = metadata.get('engine', 'unknown')
+        for stage, milliseconds in metadata['timings_ms'].items():
+            values[stage]['all'].append(milliseconds)
+            values[stage][turn_engine].append(milliseconds)
+
+    stages = {
+        stage: {group: _summary(samples) for group, samples in values[stage].items()}
+        for stage in STAGES if stage in values
+    }
+    return turns, stages
+
+
+def live_percentiles():
+    """{stage: {engine: summary}} from this process's histogram"""
+    stages = defaultdict(dict)
+    for row in stage_histogram.summary(PERCENTILES):
+        labels = row.pop('labels')
+        stages[labels['stage']][labels['engine']] = row
+    return {stage: stages[stage] for stage in STAGES if stage in stages}
@@ -0,0 +1,60 @@
+"""
+Stream a dataset export to a file or stdout.
+python manage.py export_analytics messages --type jsonl --gzip --start 2025-01-01 -o messages.jsonl.gz
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.analytics import exports
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = 'Export conversations, messages or activity as CSV/JSONL with constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(exports.DATASETS))
+        parser.add_argument('--type', dest='fmt', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='gzip-compress the output')
+        parser.add_argument('--start', type=_date, help='First local date to include (YYYY-MM-DD)')
+        parser.add_argument('--end', type=_date, help='Last local date to include (YYYY-MM-DD)')
+        parser.add_argument('--user', type=int, help='Only rows belonging to this user id')
+        parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+
+    def handle(self, *args, **options):
+        chunks = exports.stream_export(
+            options['dataset'],
+            options['fmt'],
+            options['gzip'],
+            start=options['start'],
+            end=options['end'],
+            user_id=options['user'],
+        )
+
+        written = 0
+        try:
+            if options['output']:
+                with open(options['output'], 'wb') as f:
+                    for chunk in chunks:
+                        f.write(chunk)
+                        written += len(chunk)
+            else:
+                out = sys.stdout.buffer
+                for chunk in chunks:
+                    out.write(chunk)
+                    written += len(chunk)
+                out.flush()
+        except OSError as e:
+            raise CommandError(f'Export failed: {e}')
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f'Wrote {written} bytes to {options["output"]}'))
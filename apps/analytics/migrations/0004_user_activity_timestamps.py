@@ -0,0 +1,29 @@
+# Generated by Django 5.0 on 2026-10-19 06:28
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0003_hourly_rollups"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="useractivity",
+            name="timestamp",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name="useractivity",
+            index=models.Index(fields=["timestamp"], name="useractivity_ts_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="useractivity",
+            index=models.Index(fields=["user", "timestamp"], name="useractivity_user_ts_idx"),
+        ),
+    ]
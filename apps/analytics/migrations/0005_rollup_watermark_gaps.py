@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-19 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0004_user_activity_timestamps"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rollupwatermark",
+            name="gaps",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
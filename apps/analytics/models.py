@@ -72,6 +72,38 @@ class IntentAnalytics(models.Model):
         return f"{self.intent_name} - {self.date}"
 
 
+class HourlyAnalytics(models.Model):
+    """Message and conversation counts per local hour, folded in by the rollup job"""
+    hour = models.DateTimeField(unique=True)  # start of the hour, local time
+    messages = models.IntegerField(default=0)
+    user_messages = models.IntegerField(default=0)
+    bot_messages = models.IntegerField(default=0)
+    conversations = models.IntegerField(default=0)  # conversations started
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Hourly Analytics'
+        verbose_name_plural = 'Hourly Analytics'
+        ordering = ['-hour']
+
+    def __str__(self):
+        return f"Analytics for {self.hour:%Y-%m-%d %H:00}"
+
+
+class RollupWatermark(models.Model):
+    """Highest source row id already folded into the rollup tables"""
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    # [low, high, first seen (epoch seconds)] id ranges below last_id that had
+    # no rows when folded: ids held by transactions that had not committed yet
+    gaps = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
+
+
 class UserActivity(models.Model):
     """Track individual user activities"""
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -82,13 +114,18 @@ class UserActivity(models.Model):
         ('conversation_started', 'Conversation Started'),
         ('conversation_ended', 'Conversation Ended'),
     ])
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the event happens, not when the ingestion pipeline writes it
+    timestamp = models.DateTimeField(default=timezone.now)
     metadata = models.JSONField(null=True, blank=True)  # Additional data
 
     class Meta:
         verbose_name = 'User Activity'
         verbose_name_plural = 'User Activities'
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp'], name='useractivity_ts_idx'),
+            models.Index(fields=['user', 'timestamp'], name='useractivity_user_ts_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.activity_type} - {self.timestamp}"
@@ -0,0 +1,429 @@
+"""
+Analytics Rollups
+Folds new Message and Conversation rows into HourlyAnalytics, ChatAnalytics
+and IntentAnalytics incrementally. Each source has a RollupWatermark with the
+highest row id already folded; a run aggregates the next id range with a few
+GROUP BY queries and upserts the touched rollup rows in the same transaction
+that advances the watermark, so every row is counted exactly once.
+
+Ids are allocated when a row is inserted but become visible only when its
+transaction commits, so a long transaction (a transcript import, a slow
+Gemini turn) can commit ids below a watermark that has already moved past
+them. Each fold records the ids missing from its range as gaps on the
+watermark; later runs fold rows that have since appeared in a gap, and gaps
+are forgotten after ROLLUP_GAP_SECONDS (ids of rolled-back transactions
+never appear).
+
+Readers add a live tail (rows above the watermark) to the rollups, so
+dashboard numbers stay exact while costing a handful of small queries however
+large the message table grows (a row committed late into a gap is counted
+from the next run on). Rollups count messages and conversations as they
+were created; later archiving or deletion does not subtract from them
+(conversations are only archived once their messages have been folded).
+"""
+
+import time
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Max, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, ExtractHour, TruncDate, TruncHour
+from django.utils import timezone
+
+from apps.analytics.models import ChatAnalytics, HourlyAnalytics, IntentAnalytics, RollupWatermark
+from apps.analytics.utils import local_day_range
+from apps.chatbot.models import Conversation, Message
+
+MESSAGES = 'messages'
+CONVERSATIONS = 'conversations'
+
+
+# ---------- watermarks and tails ----------
+
+def _watermark_subquery(name):
+    # Inlined into the tail query: no extra round trip per reader
+    return Coalesce(Subquery(RollupWatermark.objects.filter(name=name).values('last_id')[:1]), 0)
+
+
+def message_tail():
+    """Messages not folded into the rollups yet"""
+    return Message.objects.filter(id__gt=_watermark_subquery(MESSAGES))
+
+
+def conversation_tail():
+    """Conversations not folded into the rollups yet"""
+    return Conversation.all_objects.filter(id__gt=_watermark_subquery(CONVERSATIONS))
+
+
+def _next_upper_id(queryset, last_id, batch_size):
+    """Upper id of the next batch, or None when there is nothing to fold"""
+    pending = queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)
+    upper = list(pending[batch_size - 1:batch_size])
+    if upper:
+        return upper[0]
+    return pending.aggregate(upper=Max('id'))['upper']
+
+
+def _missing_ranges(ids, low, high):
+    """[lo, hi] id ranges within (low, high] absent from the sorted ids"""
+    ranges = []
+    expected = low + 1
+    for row_id in ids:
+        if row_id > expected:
+            ranges.append([expected, row_id - 1])
+        expected = row_id + 1
+    if expected <= high:
+        ranges.append([expected, high])
+    return ranges
+
+
+def _record_gaps(mark, source, upper):
+    """Remember the ids of (last_id, upper] that have no row yet"""
+    batch = source.filter(id__gt=mark.last_id, id__lte=upper)
+    if batch.count() == upper - mark.last_id:
+        return  # Dense range: nothing was skipped
+    ids = batch.order_by('id').values_list('id', flat=True)
+    seen_at = int(time.time())
+    mark.gaps.extend([low, high, seen_at] for low, high in _missing_ranges(ids, mark.last_id, upper))
+
+
+def _late_rows(mark, source):
+    """
+    Q matching rows committed into the watermark's gaps since they were
+    recorded (None if there are none). The gaps are narrowed to the ids still
+    missing and expired ones are dropped.
+    """
+    expire_before = time.time() - settings.ROLLUP_GAP_SECONDS
+    gaps = [gap for gap in mark.gaps if gap[2] >= expire_before]
+    if not gaps:
+        mark.gaps = []
+        return None
+
+    in_gaps = reduce(or_, (Q(id__gte=low, id__lte=high) for low, high, _ in gaps))
+    found = list(source.filter(in_gaps).order_by('id').values_list('id', flat=True))
+    if found:
+        gaps = [
+            [low, high, seen_at]
+            for gap_low, gap_high, seen_at in gaps
+            for low, high in _missing_ranges(
+                found[bisect_left(found, gap_low):bisect_right(found, gap_high)], gap_low - 1, gap_high
+            )
+        ]
+    mark.gaps = gaps
+    # Every row inside an old gap committed after its batch was folded
+    return in_gaps if found else None
+
+
+def _next_rows(mark, source, date_field, cutoff, batch_size):
+    """
+    (rows, upper): the next batch of rows older than cutoff plus rows that
+    committed late into gaps, and the watermark to store once they are
+    folded. rows is None when there is nothing to fold.
+    """
+    gaps = list(mark.gaps)
+    late = _late_rows(mark, source)
+    upper = _next_upper_id(source.filter(**{f'{date_field}__lt': cutoff}), mark.last_id, batch_size)
+
+    if upper is None:
+        if late is None:
+            if mark.gaps != gaps:
+                mark.save(update_fields=['gaps', 'updated_at'])
+            return None, mark.last_id
+        return source.filter(late), mark.last_id
+
+    _record_gaps(mark, source, upper)
+    batch = Q(id__gt=mark.last_id, id__lte=upper)
+    return source.filter(batch if late is None else batch | late), upper
+
+
+# ---------- upserts ----------
+
+def _add_counts(model, key_field, increments):
+    """Add {key: {field: n}} onto rollup rows, creating missing ones"""
+    if not increments:
+        return
+    rows = {
+        getattr(row, key_field): row
+        for row in model.objects.select_for_update().filter(**{f'{key_field}__in': list(increments)})
+    }
+    fields = sorted({field for counts in increments.values() for field in counts})
+    now = timezone.now()
+
+    created = []
+    for key, counts in increments.items():
+        row = rows.get(key)
+        if row is None:
+            row = model(**{key_field: key})
+            created.append(row)
+        for field, value in counts.items():
+            setattr(row, field, getattr(row, field) + value)
+        row.updated_at = now
+
+    model.objects.bulk_create(created)
+    # bulk_update skips auto_now, so updated_at is set explicitly above
+    model.objects.bulk_update(list(rows.values()), fields + ['updated_at'])
+
+
+def _add_intents(increments):
+    """Fold {(intent, day): (count, confidence sum, failed)} into IntentAnalytics"""
+    if not increments:
+        return
+    days = {day for _, day in increments}
+    intents = {intent for intent, _ in increments}
+    rows = {
+        (row.intent_name, row.date): row
+        for row in IntentAnalytics.objects.select_for_update().filter(date__in=days, intent_name__in=intents)
+    }
+    now = timezone.now()
+
+    created = []
+    for key, (count, confidence, failed) in increments.items():
+        row = rows.get(key)
+        if row is None:
+            row = IntentAnalytics(intent_name=key[0], date=key[1])
+            created.append(row)
+        total = row.usage_count + count
+        row.avg_confidence = (row.avg_confidence * row.usage_count + confidence) / total
+        row.usage_count = total
+        row.failed_responses += failed
+        row.successful_responses += count - failed
+        row.updated_at = now
+
+    IntentAnalytics.objects.bulk_create(created)
+    IntentAnalytics.objects.bulk_update(
+        list(rows.values()),
+        ['usage_count', 'avg_confidence', 'successful_responses', 'failed_responses', 'updated_at']
+    )
+
+
+def _refresh_days(increments, upper):
+    """
+    Recompute the per-day figures that are not plain sums (distinct users,
+    averages) for days that just received {'total_messages': n} more. They
+    count the conversations with folded messages (id <= upper) that day plus
+    archived conversations active over it, and are never lowered: deleted
+    messages have left the table yet stay counted, like every other rollup.
+    """
+    rows = ChatAnalytics.objects.select_for_update().filter(date__in=list(increments))
+    for row in rows:
+        start, end = local_day_range(row.date)
+        active = Conversation.all_objects.filter(
+            Q(id__in=Message.objects.filter(timestamp__gte=start, timestamp__lt=end, id__lte=upper)
+              .values('conversation_id'))
+            | Q(archived_at__isnull=False, created_at__lt=end, updated_at__gte=start)
+        ).aggregate(
+            conversations=Count('id'),
+            users=Count('user', distinct=True),
+        )
+        previous_messages = row.total_messages - increments[row.date].get('total_messages', 0)
+        previous_conversations = (
+            previous_messages / row.avg_messages_per_conversation if row.avg_messages_per_conversation else 0
+        )
+        conversations = max(active['conversations'], round(previous_conversations))
+
+        row.active_users = max(row.active_users, active['users'])
+        row.avg_messages_per_conversation = row.total_messages / conversations if conversations else 0.0
+        row.total_users = User.objects.filter(date_joined__lt=end).count()
+        row.updated_at = timezone.now()
+        row.save(update_fields=['active_users', 'avg_messages_per_conversation', 'total_users', 'updated_at'])
+
+
+# ---------- folding ----------
+
+def fold_messages(batch_size, cutoff):
+    """Fold the next batch of messages older than cutoff; returns rows folded"""
+    tz = timezone.get_current_timezone()
+
+    with transaction.atomic():
+        mark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=MESSAGES)
+        rows, upper = _next_rows(mark, Message.objects.all(), 'timestamp', cutoff, batch_size)
+        if rows is None:
+            return 0
+
+        hourly = {}
+        daily = {}
+        for bucket in rows.annotate(bucket=TruncHour('timestamp', tzinfo=tz)).values('bucket').annotate(
+            total=Count('id'),
+            user=Count('id', filter=Q(message_type='user')),
+            bot=Count('id', filter=Q(message_type='bot')),
+        ).order_by():
+            hourly[bucket['bucket']] = {
+                'messages': bucket['total'],
+                'user_messages': bucket['user'],
+                'bot_messages': bucket['bot'],
+            }
+            day = timezone.localtime(bucket['bucket'], tz).date()
+            daily.setdefault(day, {'total_messages': 0})['total_messages'] += bucket['total']
+
+        intents = {
+            (row['intent'], row['day']): (row['count'], row['confidence'] or 0.0, row['failed'])
+            for row in rows.filter(message_type='bot', intent__isnull=False)
+            .annotate(day=TruncDate('timestamp', tzinfo=tz))
+            .values('intent', 'day')
+            .annotate(count=Count('id'), confidence=Sum('confidence'), failed=Count('id', filter=Q(intent='error')))
+            .order_by()
+        }
+
+        folded = sum(counts['messages'] for counts in hourly.values())
+        _add_counts(HourlyAnalytics, 'hour', hourly)
+        _add_counts(ChatAnalytics, 'date', daily)
+        _add_intents(intents)
+        _refresh_days(daily, upper)
+
+        mark.last_id = upper
+        mark.save()
+    return folded
+
+
+def fold_conversations(batch_size, cutoff):
+    """Fold the next batch of started conversations; returns rows folded"""
+    tz = timezone.get_current_timezone()
+
+    with transaction.atomic():
+        mark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=CONVERSATIONS)
+        rows, upper = _next_rows(mark, Conversation.all_objects.all(), 'created_at', cutoff, batch_size)
+        if rows is None:
+            return 0
+
+        hourly = {}
+        daily = {}
+        for bucket in rows.annotate(bucket=TruncHour('created_at', tzinfo=tz)).values('bucket').annotate(
+            total=Count('id')
+        ).order_by():
+            hourly[bucket['bucket']] = {'conversations': bucket['total']}
+            day = timezone.localtime(bucket['bucket'], tz).date()
+            daily.setdefault(day, {'total_conversations': 0})['total_conversations'] += bucket['total']
+
+        _add_counts(HourlyAnalytics, 'hour', hourly)
+        _add_counts(ChatAnalytics, 'date', daily)
+
+        mark.last_id = upper
+        mark.save()
+    return sum(counts['conversations'] for counts in hourly.values())
+
+
+def run_rollups(batch_size=None, lag_seconds=None):
+    """
+    Fold everything older than the lag into the rollups, one batch per
+    transaction. Rows newer than the lag stay in the live tail so that
+    transactions still in flight (holding lower ids) commit first.
+    Returns {'messages': n, 'conversations': n}.
+    """
+    batch_size = batch_size or settings.ROLLUP_BATCH_SIZE
+    lag_seconds = settings.ROLLUP_LAG_SECONDS if lag_seconds is None else lag_seconds
+    cutoff = timezone.now() - timedelta(seconds=lag_seconds)
+
+    totals = {MESSAGES: 0, CONVERSATIONS: 0}
+    for name, fold in ((MESSAGES, fold_messages), (CONVERSATIONS, fold_conversations)):
+        while True:
+            folded = fold(batch_size, cutoff)
+            totals[name] += folded
+            if not folded:
+                break
+    return totals
+
+
+def reset_rollups():
+    """Drop all rollup rows and watermarks so the next run rebuilds from scratch"""
+    with transaction.atomic():
+        HourlyAnalytics.objects.all().delete()
+        ChatAnalytics.objects.all().delete()
+        IntentAnalytics.objects.all().delete()
+        RollupWatermark.objects.all().delete()
+
+
+# ---------- readers (rollups + live tail) ----------
+
+def messages_between(start, end):
+    """Messages sent in [start, end); bounds must fall on local hour starts"""
+    rolled = HourlyAnalytics.objects.filter(hour__gte=start, hour__lt=end).aggregate(n=Sum('messages'))['n']
+    return (rolled or 0) + message_tail().filter(timestamp__gte=start, timestamp__lt=end).count()
+
+
+def conversations_between(start, end):
+    """Conversations started in [start, end); bounds must fall on local hour starts"""
+    rolled = HourlyAnalytics.objects.filter(hour__gte=start, hour__lt=end).aggregate(n=Sum('conversations'))['n']
+    return (rolled or 0) + conversation_tail().filter(created_at__gte=start, created_at__lt=end).count()
+
+
+def overall_totals():
+    """All-time message and conversation counts"""
+    rolled = ChatAnalytics.objects.aggregate(
+        messages=Sum('total_messages'),
+        conversations=Sum('total_conversations'),
+    )
+    return {
+        'messages': (rolled['messages'] or 0) + message_tail().count(),
+        'conversations': (rolled['conversations'] or 0) + conversation_tail().count(),
+    }
+
+
+def average_conversation_length(start_day, end_day):
+    """
+    Messages per active conversation over [start_day, end_day], weighting each
+    day by its conversations. Conversations active on several days count once
+    per day, so this is an approximation of the per-conversation average.
+    """
+    messages = conversations = 0.0
+    for total, average in ChatAnalytics.objects.filter(
+        date__gte=start_day, date__lte=end_day, avg_messages_per_conversation__gt=0
+    ).values_list('total_messages', 'avg_messages_per_conversation'):
+        messages += total
+        conversations += total / average
+
+    start, _ = local_day_range(start_day)
+    _, end = local_day_range(end_day)
+    tail = message_tail().filter(timestamp__gte=start, timestamp__lt=end).aggregate(
+        messages=Count('id'),
+        conversations=Count('conversation', distinct=True),
+    )
+    messages += tail['messages']
+    conversations += tail['conversations']
+    return messages / conversations if conversations else 0
+
+
+def popular_hours(start, end, limit=3):
+    """[{'hour': local hour of day, 'count': messages}] busiest first"""
+    counts = {}
+    for hour, messages in HourlyAnalytics.objects.filter(
+        hour__gte=start, hour__lt=end, messages__gt=0
+    ).values_list('hour', 'messages'):
+        local_hour = timezone.localtime(hour).hour
+        counts[local_hour] = counts.get(local_hour, 0) + messages
+
+    for row in message_tail().filter(timestamp__gte=start, timestamp__lt=end).annotate(
+        hour=ExtractHour('timestamp')
+    ).values('hour').annotate(count=Count('id')).order_by():
+        counts[row['hour']] = counts.get(row['hour'], 0) + row['count']
+
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return [{'hour': hour, 'count': count} for hour, count in ranked]
+
+
+def intent_stats(day, limit=None):
+    """[{'intent', 'count', 'avg_confidence'}] for bot messages on a local day, most used first"""
+    stats = {
+        row.intent_name: [row.usage_count, row.avg_confidence * row.usage_count]
+        for row in IntentAnalytics.objects.filter(date=day)
+    }
+
+    start, end = local_day_range(day)
+    for row in message_tail().filter(
+        timestamp__gte=start, timestamp__lt=end, message_type='bot', intent__isnull=False
+    ).values('intent').annotate(count=Count('id'), confidence=Sum('confidence')).order_by():
+        entry = stats.setdefault(row['intent'], [0, 0.0])
+        entry[0] += row['count']
+        entry[1] += row['confidence'] or 0.0
+
+    ranked = sorted(stats.items(), key=lambda item: (-item[1][0], item[0]))
+    if limit:
+        ranked = ranked[:limit]
+    return [
+        {'intent': intent, 'count': count, 'avg_confidence': confidence / count if count else 0.0}
+        for intent, (count, confidence) in ranked
+    ]
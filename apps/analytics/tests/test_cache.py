@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from apps.analytics import cache as analytics_cache
+
+
+@override_settings(ANALYTICS_CACHE_TTL=30, ANALYTICS_CACHE_MIN_FRESHNESS=5)
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.clock = 1_000_000.0
+        patcher = mock.patch.object(analytics_cache.time, 'time', lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        return {'run': self.computed}
+
+    def get(self):
+        return analytics_cache.get_or_compute('dashboard', self.compute)
+
+    def hold_lock(self):
+        self.assertTrue(cache.add(analytics_cache.LOCK_PREFIX + 'dashboard', 1))
+
+    def test_fresh_payload_is_served_from_cache(self):
+        self.assertEqual(self.get(), {'run': 1})
+        self.clock += 29
+
+        self.assertEqual(self.get(), {'run': 1})
+        self.assertEqual(self.computed, 1)
+
+    def test_expired_payload_is_recomputed(self):
+        self.get()
+        self.clock += 30
+
+        self.assertEqual(self.get(), {'run': 2})
+
+    def test_write_bumps_version_after_min_freshness(self):
+        self.get()
+        analytics_cache.bump_version()
+
+        # Within the minimum freshness window writes are ignored
+        self.clock += 4
+        self.assertEqual(self.get(), {'run': 1})
+
+        self.clock += 1
+        self.assertEqual(self.get(), {'run': 2})
+        self.assertEqual(self.get(), {'run': 2})
+
+    def test_stale_copy_served_while_another_caller_recomputes(self):
+        self.get()
+        analytics_cache.bump_version()
+        self.clock += 10
+        self.hold_lock()
+
+        with mock.patch.object(analytics_cache.time, 'sleep') as sleep:
+            self.assertEqual(self.get(), {'run': 1})
+
+        self.assertEqual(self.computed, 1)
+        sleep.assert_not_called()
+
+    def test_waits_for_the_lock_holder_without_stale_copy(self):
+        self.hold_lock()
+
+        def winner_finishes(seconds):
+            cache.set(analytics_cache.KEY_PREFIX + 'dashboard', {
+                'version': analytics_cache.current_version(), 'computed_at': self.clock, 'data': {'run': 'winner'},
+            })
+            cache.delete(analytics_cache.LOCK_PREFIX + 'dashboard')
+
+        with mock.patch.object(analytics_cache.time, 'sleep', side_effect=winner_finishes) as sleep:
+            self.assertEqual(self.get(), {'run': 'winner'})
+
+        sleep.assert_called_once_with(analytics_cache.WAIT_INTERVAL)
+        self.assertEqual(self.computed, 0)
+
+    def test_computes_without_lock_when_holder_is_stuck(self):
+        self.hold_lock()
+        ticks = iter(range(0, 1000, 10))
+
+        with mock.patch.object(analytics_cache.time, 'monotonic', lambda: next(ticks)), \
+                mock.patch.object(analytics_cache.time, 'sleep'):
+            self.assertEqual(self.get(), {'run': 1})
+
+        # The stuck holder's lock is left alone
+        self.assertIsNotNone(cache.get(analytics_cache.LOCK_PREFIX + 'dashboard'))
@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from apps.analytics import counters
+from apps.chatbot.models import Conversation, Message
+
+
+class MemoryCounterBackendTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = 1000.0
+        patcher = mock.patch.object(counters.time, 'monotonic', lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backend = counters.MemoryCounterBackend()
+
+    def test_keys_expire_after_their_ttl(self):
+        self.backend.apply([('incr', 'a', 2, 10), ('pfadd', 'u', '1', 10), ('hincr', 'h', 'greet', 1, 10)])
+        self.assertEqual(self.backend.get_many(['a']), [2])
+
+        self.clock += 10
+
+        self.assertEqual(self.backend.get_many(['a']), [0])
+        self.assertEqual(self.backend.distinct('u'), 0)
+        self.assertEqual(self.backend.hash('h'), {})
+
+    def test_write_after_expiry_starts_from_zero(self):
+        self.backend.apply([('incr', 'a', 2, 10)])
+        self.clock += 11
+        self.backend.apply([('incr', 'a', 1, 10)])
+
+        self.assertEqual(self.backend.get_many(['a']), [1])
+
+    def test_expired_keys_are_swept(self):
+        self.backend.apply([('incr', f'minute:{i}', 1, 5) for i in range(100)])
+        self.clock += self.backend.SWEEP_INTERVAL
+
+        self.backend.apply([('incr', 'fresh', 1, 5)])
+
+        self.assertEqual(self.backend.key_count(), 1)
+
+
+class ActiveUsersTests(TestCase):
+    def setUp(self):
+        counters.set_backend(counters.MemoryCounterBackend())
+        self.addCleanup(counters.set_backend, None)
+
+    def test_process_local_backend_counts_from_the_database(self):
+        for name in ('alice', 'bob'):
+            user = User.objects.create_user(name, f'{name}@example.com', 'pw')
+            Message.objects.create(conversation=Conversation.objects.create(user=user), content='hi')
+        # Only one of them was served by this process
+        counters.record_messages([('user', None, 1)])
+
+        self.assertEqual(counters.active_users(), 2)
+
+    def test_shared_backend_is_read_directly(self):
+        backend = mock.Mock(shared=True)
+        backend.distinct.return_value = 7
+        counters.set_backend(backend)
+
+        self.assertEqual(counters.active_users(), 7)
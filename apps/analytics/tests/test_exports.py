@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.analytics import exports
+from apps.chatbot.models import Conversation, Message
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.kept = Conversation.objects.create(user=cls.user, title='Kept')
+        Message.objects.create(conversation=cls.kept, content='=HYPERLINK("http://evil.example","x")')
+        Message.objects.create(conversation=cls.kept, content='-1 is fine as text')
+        deleted = Conversation.objects.create(user=cls.user, title='Deleted', deleted_at=timezone.now())
+        Message.objects.create(conversation=deleted, content='should not be exported')
+
+    def export_csv(self, dataset):
+        return b''.join(exports.stream_export(dataset, 'csv')).decode('utf-8')
+
+    def test_messages_of_deleted_conversations_are_left_out(self):
+        rows = list(exports.iter_rows('messages'))
+
+        self.assertEqual({row[1] for row in rows}, {self.kept.id})
+        self.assertNotIn('should not be exported', self.export_csv('messages'))
+
+    def test_csv_cells_cannot_start_formulas(self):
+        body = self.export_csv('messages')
+
+        self.assertIn('"\'=HYPERLINK(""http://evil.example"",""x"")"', body)
+        self.assertIn("'-1 is fine as text", body)
+
+    def test_jsonl_is_not_quoted(self):
+        body = b''.join(exports.stream_export('messages', 'jsonl')).decode('utf-8')
+
+        self.assertIn('"content": "=HYPERLINK', body)
+
+    def test_numbers_are_not_quoted(self):
+        self.assertEqual(exports._csv_value(-0.5), -0.5)
+        self.assertEqual(exports._csv_value('+91 98765'), "'+91 98765")
@@ -0,0 +1,88 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase
+
+from apps.analytics.ingestion import ActivityPipeline
+from apps.analytics.models import UserActivity
+
+
+class ActivityPipelineTests(TransactionTestCase):
+    """The writer thread needs committed rows to see, hence TransactionTestCase"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+
+    def pipeline(self, **options):
+        options.setdefault('max_queue', 10)
+        options.setdefault('batch_size', 2)
+        options.setdefault('flush_interval', 0.05)
+        return ActivityPipeline(**options)
+
+    def test_events_are_written_in_batches(self):
+        pipeline = self.pipeline()
+
+        for number in range(5):
+            self.assertTrue(pipeline.submit(self.user.id, 'message_sent', {'n': number}))
+        self.assertTrue(pipeline.flush())
+
+        stats = pipeline.stats()
+        self.assertEqual((stats['enqueued'], stats['written'], stats['dropped'], stats['failed']), (5, 5, 0, 0))
+        self.assertGreaterEqual(stats['batches'], 3)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertIsNotNone(stats['last_flush_at'])
+        self.assertEqual(
+            sorted(UserActivity.objects.values_list('metadata__n', flat=True)), [0, 1, 2, 3, 4]
+        )
+
+    def test_full_queue_drops_events(self):
+        pipeline = self.pipeline(max_queue=3, batch_size=1)
+        writing, release = threading.Event(), threading.Event()
+        write = pipeline._write
+
+        def slow_write(batch):
+            writing.set()
+            release.wait(5)
+            write(batch)
+
+        with mock.patch.object(pipeline, '_write', side_effect=slow_write):
+            pipeline.submit(self.user.id, 'login')
+            self.assertTrue(writing.wait(5))
+            # The writer is busy with the first event: three fit, the rest are dropped
+            with self.assertLogs('apps.analytics.ingestion', 'WARNING'):
+                accepted = [pipeline.submit(self.user.id, 'message_sent') for _ in range(5)]
+            release.set()
+            self.assertTrue(pipeline.flush())
+
+        self.assertEqual(accepted, [True, True, True, False, False])
+        stats = pipeline.stats()
+        self.assertEqual((stats['enqueued'], stats['dropped'], stats['written']), (4, 2, 4))
+        self.assertEqual(UserActivity.objects.count(), 4)
+
+    def test_events_of_deleted_users_are_skipped(self):
+        pipeline = self.pipeline(batch_size=3, flush_interval=1)
+        gone = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        gone_id = gone.id
+        gone.delete()
+
+        for user_id in (self.user.id, gone_id, self.user.id):
+            pipeline.submit(user_id, 'login')
+        self.assertTrue(pipeline.flush())
+
+        stats = pipeline.stats()
+        self.assertEqual((stats['written'], stats['failed'], stats['batches']), (2, 1, 1))
+        self.assertEqual(UserActivity.objects.filter(user=self.user).count(), 2)
+
+    def test_failed_batch_is_counted(self):
+        pipeline = self.pipeline()
+
+        with mock.patch.object(pipeline, '_bulk_create', side_effect=RuntimeError('database gone')), \
+                self.assertLogs('apps.analytics.ingestion', 'ERROR'):
+            pipeline.submit(self.user.id, 'login')
+            pipeline.submit(self.user.id, 'logout')
+            self.assertTrue(pipeline.flush())
+
+        stats = pipeline.stats()
+        self.assertEqual((stats['written'], stats['failed']), (0, 2))
+        self.assertFalse(UserActivity.objects.exists())
@@ -0,0 +1,31 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.analytics import latency
+
+
+class LatencyViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('ops', 'ops@example.com', 'pw', is_staff=True))
+
+    def get(self, **params):
+        return self.client.get('/api/analytics/latency/', params)
+
+    def test_minutes_window(self):
+        response = self.get(minutes=15)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['turns'], 0)
+        self.assertEqual((response.data['end'] - response.data['start']).total_seconds(), 15 * 60)
+
+    def test_rejects_out_of_range_minutes(self):
+        for minutes in ('0', '-5', str(latency.MAX_WINDOW_MINUTES + 1), '99999999999999999999', 'soon'):
+            with self.subTest(minutes=minutes):
+                response = self.get(minutes=minutes)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.data['success'])
+
+    def test_longest_window_is_allowed(self):
+        self.assertEqual(self.get(minutes=latency.MAX_WINDOW_MINUTES).status_code, 200)
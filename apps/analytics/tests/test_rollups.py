@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.analytics import rollups
+from apps.analytics.models import RollupWatermark
+from apps.chatbot.models import Conversation, Message
+
+
+class LateCommitTests(TestCase):
+    """A row whose id is below the watermark when it commits is still folded"""
+
+    def setUp(self):
+        user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.conversation = Conversation.objects.create(user=user)
+        sent_at = timezone.now() - timedelta(hours=2)
+        self.messages = [
+            Message.objects.create(conversation=self.conversation, content=f'm{i}', timestamp=sent_at)
+            for i in range(4)
+        ]
+
+    def hold_back(self, message):
+        """Pretend the message's transaction has not committed yet"""
+        Message.objects.filter(id=message.id).delete()
+
+    def commit(self, message):
+        Message.objects.bulk_create([message])
+
+    def watermark(self):
+        return RollupWatermark.objects.get(name=rollups.MESSAGES)
+
+    def test_gap_is_recorded_and_folded_once_committed(self):
+        held = self.messages[1]
+        self.hold_back(held)
+
+        self.assertEqual(rollups.run_rollups(lag_seconds=0)['messages'], 3)
+        self.assertEqual([gap[:2] for gap in self.watermark().gaps], [[held.id, held.id]])
+
+        self.commit(held)
+
+        self.assertEqual(rollups.run_rollups(lag_seconds=0)['messages'], 1)
+        self.assertEqual(rollups.overall_totals()['messages'], 4)
+        self.assertEqual(self.watermark().gaps, [])
+
+        # Folded exactly once
+        self.assertEqual(rollups.run_rollups(lag_seconds=0)['messages'], 0)
+        self.assertEqual(rollups.overall_totals()['messages'], 4)
+
+    def test_partly_filled_gap_keeps_the_missing_ids(self):
+        first, second = self.messages[1], self.messages[2]
+        self.hold_back(first)
+        self.hold_back(second)
+        rollups.run_rollups(lag_seconds=0)
+        self.assertEqual([gap[:2] for gap in self.watermark().gaps], [[first.id, second.id]])
+
+        self.commit(second)
+        rollups.run_rollups(lag_seconds=0)
+
+        self.assertEqual([gap[:2] for gap in self.watermark().gaps], [[first.id, first.id]])
+        self.assertEqual(rollups.overall_totals()['messages'], 3)
+
+    def test_gaps_expire(self):
+        self.hold_back(self.messages[1])
+        rollups.run_rollups(lag_seconds=0)
+
+        with override_settings(ROLLUP_GAP_SECONDS=-1):
+            rollups.run_rollups(lag_seconds=0)
+
+        self.assertEqual(self.watermark().gaps, [])
+
+    def test_missing_ranges(self):
+        self.assertEqual(rollups._missing_ranges([2, 3, 6], 0, 8), [[1, 1], [4, 5], [7, 8]])
+        self.assertEqual(rollups._missing_ranges([1, 2], 0, 2), [])
@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.analytics import rollups, timeseries
+from apps.analytics.utils import local_day_range
+from apps.chatbot.models import Conversation, Message
+
+
+class TimeSeriesTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.yesterday = self.today - timedelta(days=1)
+        self.start, _ = local_day_range(self.yesterday)
+        _, self.end = local_day_range(self.today)
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+
+    def turn(self, user, day, message_type='user', intent=None):
+        conversation = Conversation.objects.create(user=user)
+        at = local_day_range(day)[0] + timedelta(hours=10)
+        Conversation.objects.filter(id=conversation.id).update(created_at=at)
+        return Message.objects.create(
+            conversation=conversation, message_type=message_type, intent=intent, content='hi', timestamp=at
+        )
+
+    def daily(self, *metrics):
+        return {
+            timezone.localtime(row['bucket']).date(): {metric: row[metric] for metric in metrics}
+            for row in timeseries.series(list(metrics), self.start, self.end, 'day')
+        }
+
+    def test_counts_combine_rollups_and_live_tail(self):
+        self.turn(self.alice, self.yesterday)
+        self.turn(self.bob, self.yesterday, 'bot', intent='error')
+        rollups.run_rollups(lag_seconds=0)
+        self.turn(self.alice, self.today)
+
+        self.assertEqual(self.daily('messages', 'conversations', 'failed_responses'), {
+            self.yesterday: {'messages': 2, 'conversations': 2, 'failed_responses': 1},
+            self.today: {'messages': 1, 'conversations': 1, 'failed_responses': 0},
+        })
+
+    def test_folded_history_survives_leaving_the_message_table(self):
+        self.turn(self.alice, self.yesterday)
+        rollups.run_rollups(lag_seconds=0)
+        Message.objects.all().delete()
+
+        self.assertEqual(self.daily('messages', 'user_messages')[self.yesterday], {'messages': 1, 'user_messages': 1})
+
+    def test_active_users_from_rollups_and_live_days(self):
+        self.turn(self.alice, self.yesterday)
+        self.turn(self.bob, self.yesterday)
+        rollups.run_rollups(lag_seconds=0)
+        self.turn(self.alice, self.today)
+
+        counts = self.daily('active_users')
+
+        self.assertEqual(counts[self.yesterday], {'active_users': 2})
+        self.assertEqual(counts[self.today], {'active_users': 1})
+
+    def test_hourly_buckets(self):
+        self.turn(self.alice, self.yesterday)
+        rollups.run_rollups(lag_seconds=0)
+        self.turn(self.bob, self.yesterday)
+
+        rows = timeseries.series(['messages'], self.start, self.end, 'hour')
+
+        self.assertEqual(len(rows), 48)
+        self.assertEqual(rows[10]['messages'], 2)
+        self.assertEqual(sum(row['messages'] for row in rows), 2)
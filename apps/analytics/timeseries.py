@@ -0,0 +1,193 @@
+"""
+Time-series queries for analytics charts.
+
+Rows are truncated to the bucket size in the configured TIME_ZONE (Trunc
+with tzinfo), counted per bucket, and the buckets with no rows are filled
+with zeros in Python. Any range and granularity costs a few round trips per
+metric, whatever its length:
+
+  * message and conversation counts sum the hourly rollups and add the live
+    tail (rows the rollup job has not folded yet), so archived history is
+    included and the hot tables are only read for recent rows
+  * failed_responses sums the daily intent rollups plus the tail (hourly
+    buckets count bot messages directly)
+  * active_users reads the daily rollups for days before the tail and counts
+    distinct users from Message for the rest; distinct users cannot be
+    summed across days, so hour/week/month buckets count live messages only
+  * activity counts UserActivity rows
+
+Bounds must fall on local hour starts (local day starts for the daily
+rollups); the analytics views pass whole local days.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, DateTimeField, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from apps.analytics import rollups
+from apps.analytics.models import ChatAnalytics, HourlyAnalytics, IntentAnalytics, UserActivity
+from apps.chatbot.models import Message
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+
+# Largest number of buckets a single request may ask for
+MAX_BUCKETS = 5000
+
+# Round trips a metric may need (rollups, live tail, boundary lookup)
+MAX_QUERIES_PER_METRIC = 3
+
+
+def _floor(moment, granularity):
+    """Local start of the bucket containing an aware datetime"""
+    local = timezone.localtime(moment)
+    if granularity == 'hour':
+        return local.replace(minute=0, second=0, microsecond=0)
+
+    day = local.date()
+    if granularity == 'week':
+        day -= timedelta(days=day.weekday())  # ISO weeks start on Monday, like TruncWeek
+    elif granularity == 'month':
+        day = day.replace(day=1)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _step(bucket, granularity):
+    """Start of the bucket after `bucket`"""
+    if granularity == 'hour':
+        # Step in absolute time so DST transitions do not repeat or skip hours
+        return timezone.localtime(bucket + timedelta(hours=1))
+
+    day = timezone.localtime(bucket).date()
+    if granularity == 'day':
+        day += timedelta(days=1)
+    elif granularity == 'week':
+        day += timedelta(days=7)
+    else:
+        day = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def buckets(start, end, granularity):
+    """Bucket starts covering [start, end), oldest first"""
+    result = []
+    bucket = _floor(start, granularity)
+    while bucket < end:
+        result.append(bucket)
+        if len(result) > MAX_BUCKETS:
+            raise ValueError(f'Range has more than {MAX_BUCKETS} {granularity} buckets')
+        bucket = _step(bucket, granularity)
+    return result
+
+
+def _grouped(queryset, field, start, end, granularity, aggregate):
+    """{bucket start: value} from a single grouped query over [start, end)"""
+    tz = timezone.get_current_timezone()
+
+    rows = queryset.filter(
+        **{f'{field}__gte': start, f'{field}__lt': end}
+    ).annotate(
+        bucket=Trunc(field, granularity, output_field=DateTimeField(), tzinfo=tz)
+    ).values('bucket').annotate(value=aggregate).order_by()
+
+    return {row['bucket']: row['value'] for row in rows}
+
+
+def _daily(queryset, field, start, end, granularity):
+    """{bucket start: sum of field} over daily rollup rows dated in [start, end)"""
+    counts = {}
+    for day, value in queryset.filter(
+        date__gte=timezone.localtime(start).date(), date__lt=timezone.localtime(end).date()
+    ).values_list('date', field):
+        bucket = _floor(timezone.make_aware(datetime.combine(day, time.min)), granularity)
+        counts[bucket] = counts.get(bucket, 0) + value
+    return counts
+
+
+def _merge(*parts):
+    counts = {}
+    for part in parts:
+        for bucket, value in part.items():
+            counts[bucket] = counts.get(bucket, 0) + value
+    return counts
+
+
+def _hourly_metric(field, message_filter=None):
+    """Counts from HourlyAnalytics.<field> plus the matching live-tail rows"""
+    def counts(start, end, granularity):
+        rolled = _grouped(HourlyAnalytics.objects.all(), 'hour', start, end, granularity, Sum(field))
+        if message_filter is None:
+            live = _grouped(rollups.conversation_tail(), 'created_at', start, end, granularity, Count('id'))
+        else:
+            live = _grouped(
+                rollups.message_tail().filter(message_filter), 'timestamp', start, end, granularity, Count('id')
+            )
+        return _merge(rolled, live)
+    return counts
+
+
+def _failed_responses(start, end, granularity):
+    failed = Q(message_type='bot', intent='error')
+    if granularity == 'hour':
+        return _grouped(Message.objects.filter(failed), 'timestamp', start, end, granularity, Count('id'))
+    rolled = _daily(IntentAnalytics.objects.filter(intent_name='error'), 'failed_responses', start, end, granularity)
+    live = _grouped(rollups.message_tail().filter(failed), 'timestamp', start, end, granularity, Count('id'))
+    return _merge(rolled, live)
+
+
+def _active_users(start, end, granularity):
+    users = Count('conversation__user', distinct=True)
+    user_messages = Message.objects.filter(message_type='user')
+    if granularity != 'day':
+        return _grouped(user_messages, 'timestamp', start, end, granularity, users)
+
+    # Days up to the first one with unfolded messages come from the rollups
+    live_days = _grouped(rollups.message_tail(), 'timestamp', start, end, 'day', Count('id'))
+    boundary = min(live_days, default=end)
+    counts = _daily(ChatAnalytics.objects.all(), 'active_users', start, boundary, granularity)
+    if boundary < end:
+        counts.update(_grouped(user_messages, 'timestamp', boundary, end, granularity, users))
+    return counts
+
+
+def _activity(start, end, granularity):
+    return _grouped(UserActivity.objects.all(), 'timestamp', start, end, granularity, Count('id'))
+
+
+# metric -> counts(start, end, granularity) returning {bucket start: value}
+METRICS = {
+    'messages': _hourly_metric('messages', Q()),
+    'user_messages': _hourly_metric('user_messages', Q(message_type='user')),
+    'bot_messages': _hourly_metric('bot_messages', Q(message_type='bot')),
+    'conversations': _hourly_metric('conversations'),
+    'active_users': _active_users,
+    'failed_responses': _failed_responses,
+    'activity': _activity,
+}
+
+
+def metric_counts(metric, start, end, granularity):
+    """{bucket start: value} for one metric"""
+    return METRICS[metric](start, end, granularity)
+
+
+def series(metrics, start, end, granularity='day'):
+    """
+    Zero-filled rows for a chart: [{'bucket': aware local datetime, metric: value, ...}]
+    covering [start, end). Raises ValueError for unknown metrics or granularities
+    and for ranges with too many buckets.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Unknown granularity: {granularity}')
+    unknown = [metric for metric in metrics if metric not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metric: {', '.join(unknown)}")
+
+    starts = buckets(start, end, granularity)
+    counts = {metric: metric_counts(metric, start, end, granularity) for metric in metrics}
+
+    return [
+        dict({'bucket': bucket}, **{metric: counts[metric].get(bucket, 0) for metric in metrics})
+        for bucket in starts
+    ]
@@ -2,8 +2,11 @@ from django.urls import path
 from apps.analytics.views import (
     DashboardStatsView,
     WeeklyChartDataView,
+    TimeSeriesView,
+    LatencyView,
     IntentAnalyticsView,
     MessageFeedbackView,
+    ExportView,
 )
 
 app_name = 'analytics'
@@ -11,6 +14,9 @@ app_name = 'analytics'
 urlpatterns = [
     path('dashboard/', DashboardStatsView.as_view(), name='dashboard'),
     path('weekly-chart/', WeeklyChartDataView.as_view(), name='weekly-chart'),
+    path('timeseries/', TimeSeriesView.as_view(), name='timeseries'),
+    path('latency/', LatencyView.as_view(), name='latency'),
     path('intents/', IntentAnalyticsView.as_view(), name='intents'),
     path('feedback/', MessageFeedbackView.as_view(), name='feedback'),
+    path('export/<str:dataset>/', ExportView.as_view(), name='export'),
 ]
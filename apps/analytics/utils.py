@@ -1,14 +1,29 @@
-from apps.analytics.models import UserActivity
+from apps.analytics import ingestion
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import datetime, time, timedelta
 
-def log_activity(user, activity_type, details=None):
-    """Log user activity"""
-    try:
-        UserActivity.objects.create(
-            user=user,
-            activity_type=activity_type,
-            details=details or {},
-            timestamp=timezone.now()
-        )
-    except Exception as e:
-        print(f"Error logging activity: {e}")
+def log_activity(user, activity_type, metadata=None):
+    """Log user activity (queued and written in batches off the request thread)"""
+    return ingestion.record(user.id, activity_type, metadata)
+
+
+def local_day_range(day):
+    """
+    Aware [start, end) datetimes covering a local calendar day.
+    Filter with field__gte=start, field__lt=end instead of field__date=day:
+    __date wraps the column in a function, so no index on it can be used.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def parse_date_param(params, name):
+    """Optional YYYY-MM-DD query parameter; raises ValueError when malformed"""
+    value = params.get(name)
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
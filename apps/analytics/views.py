@@ -1,6 +1,7 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.http import StreamingHttpResponse
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.db.models import Count, Avg, Q
@@ -9,6 +10,12 @@ from datetime import timedelta
 from apps.chatbot.models import Conversation, Message
 from apps.analytics.models import ChatAnalytics, IntentAnalytics, UserActivity
 from apps.analytics.models import MessageFeedback
+from apps.analytics.utils import local_day_range, parse_date_param
+from apps.analytics import exports, rollups, timeseries
+from apps.analytics import cache as analytics_cache
+from apps.analytics import counters
+from apps.analytics import latency
+from core.utils.counts import estimated_count
 from apps.chatbot.models import Message
 from rest_framework import status
 from apps.analytics.models import MessageFeedback
@@ -68,59 +75,53 @@ class MessageFeedbackView(APIView):
 class DashboardStatsView(APIView):
     """Real-time dashboard statistics"""
     permission_classes = [IsAuthenticated]
+    query_budget = 21  # uncached, active users counted in the database; a cache hit runs 1-2
+    read_replica = True
 
     def get(self, request):
-        today = timezone.now().date()
+        # Shared by every admin tab; recomputed at most once per refresh window
+        return Response(analytics_cache.get_or_compute('dashboard', self._compute_stats))
+
+    def _compute_stats(self):
+        today = timezone.localdate()
         yesterday = today - timedelta(days=1)
         week_ago = today - timedelta(days=7)
+        today_start, today_end = local_day_range(today)
+        yesterday_start, yesterday_end = local_day_range(yesterday)
 
-        # Today's stats
-        today_messages = Message.objects.filter(timestamp__date=today).count()
-        today_conversations = Conversation.objects.filter(created_at__date=today).count()
-        today_active_users = Conversation.objects.filter(
-            updated_at__date=today
-        ).values('user').distinct().count()
+        # Today's stats: rollup rows plus the not-yet-folded tail
+        today_messages = rollups.messages_between(today_start, today_end)
+        today_conversations = rollups.conversations_between(today_start, today_end)
+        # Distinct-user sketch kept by the chat write path: O(1) to read
+        today_active_users = counters.active_users(today)
 
         # Yesterday's stats for comparison
-        yesterday_messages = Message.objects.filter(timestamp__date=yesterday).count()
-        yesterday_conversations = Conversation.objects.filter(created_at__date=yesterday).count()
+        yesterday_messages = rollups.messages_between(yesterday_start, yesterday_end)
+        yesterday_conversations = rollups.conversations_between(yesterday_start, yesterday_end)
 
         # Overall stats
-        total_users = User.objects.count()
-        total_conversations = Conversation.objects.count()
-        total_messages = Message.objects.count()
+        total_users = estimated_count(User)[0]
+        totals = rollups.overall_totals()
+        total_conversations = totals['conversations']
+        total_messages = totals['messages']
 
         # Calculate percentage changes
         message_change = self._calculate_change(today_messages, yesterday_messages)
         conversation_change = self._calculate_change(today_conversations, yesterday_conversations)
 
         # Average conversation length
-        avg_messages = Message.objects.filter(
-            timestamp__gte=week_ago
-        ).values('conversation').annotate(
-            msg_count=Count('id')
-        ).aggregate(avg=Avg('msg_count'))['avg'] or 0
-
-        # Most active time (hour of day) - FIXED for SQLite
-        popular_hours = Message.objects.filter(
-            timestamp__date=today
-        ).annotate(
-            hour=ExtractHour('timestamp')
-        ).values('hour').annotate(
-            count=Count('id')
-        ).order_by('-count')[:3]
+        avg_messages = rollups.average_conversation_length(week_ago, today)
+
+        # Most active time (hour of day)
+        popular_hours = rollups.popular_hours(today_start, today_end, limit=3)
 
         # Top intents today
-        top_intents = Message.objects.filter(
-            timestamp__date=today,
-            message_type='bot'
-        ).exclude(
-            intent__isnull=True
-        ).values('intent').annotate(
-            count=Count('id')
-        ).order_by('-count')[:5]
+        top_intents = [
+            {'intent': row['intent'], 'count': row['count']}
+            for row in rollups.intent_stats(today, limit=5)
+        ]
 
-        return Response({
+        return {
             'success': True,
             'stats': {
                 'today': {
@@ -139,9 +140,13 @@ class DashboardStatsView(APIView):
                 'trends': {
                     'popular_hours': list(popular_hours),
                     'top_intents': list(top_intents),
+                },
+                'realtime': {
+                    'messages_per_minute': counters.messages_per_minute(60),
+                    'intents_today': counters.intent_counts(today),
                 }
             }
-        })
+        }
 
     def _calculate_change(self, today_val, yesterday_val):
         """Calculate percentage change"""
@@ -153,23 +158,24 @@ class DashboardStatsView(APIView):
 class WeeklyChartDataView(APIView):
     """Data for charts - last 7 days"""
     permission_classes = [IsAuthenticated]
+    query_budget = 5
+    read_replica = True
 
     def get(self, request):
-        today = timezone.now().date()
-
-        # Get daily message counts for last 7 days
-        daily_data = []
-        for i in range(7):
-            date = today - timedelta(days=6 - i)
-            messages = Message.objects.filter(timestamp__date=date).count()
-            conversations = Conversation.objects.filter(created_at__date=date).count()
-
-            daily_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'day': date.strftime('%a'),  # Mon, Tue, etc.
-                'messages': messages,
-                'conversations': conversations,
-            })
+        today = timezone.localdate()
+        start, _ = local_day_range(today - timedelta(days=6))
+        _, end = local_day_range(today)
+
+        # One grouped query per metric instead of two COUNTs per day
+        daily_data = [
+            {
+                'date': row['bucket'].strftime('%Y-%m-%d'),
+                'day': row['bucket'].strftime('%a'),  # Mon, Tue, etc.
+                'messages': row['messages'],
+                'conversations': row['conversations'],
+            }
+            for row in timeseries.series(['messages', 'conversations'], start, end, 'day')
+        ]
 
         return Response({
             'success': True,
@@ -177,27 +183,114 @@ class WeeklyChartDataView(APIView):
         })
 
 
+class TimeSeriesView(APIView):
+    """
+    Chart data for any range and granularity
+    GET ?metrics=messages,conversations&granularity=hour|day|week|month
+        &start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive local dates, default last 7 days)
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 3 + timeseries.MAX_QUERIES_PER_METRIC * len(timeseries.METRICS)
+    read_replica = True
+
+    def get(self, request):
+        metrics = [m for m in request.GET.get('metrics', 'messages,conversations').split(',') if m]
+        granularity = request.GET.get('granularity', 'day')
+
+        try:
+            today = timezone.localdate()
+            end_day = parse_date_param(request.GET, 'end') or today
+            start_day = parse_date_param(request.GET, 'start') or end_day - timedelta(days=6)
+            if start_day > end_day:
+                raise ValueError('start is after end')
+
+            start, _ = local_day_range(start_day)
+            _, end = local_day_range(end_day)
+            rows = timeseries.series(metrics, start, end, granularity)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': f'Invalid time-series request: {e}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'success': True,
+            'granularity': granularity,
+            'timezone': timezone.get_current_timezone_name(),
+            'start': start_day,
+            'end': end_day,
+            'metrics': metrics,
+            'series': rows
+        })
+
+
+class LatencyView(APIView):
+    """
+    Chat turn latency percentiles (p50/p95/p99, ms) per stage and engine
+    GET ?minutes=15 (the last N minutes, at most 31 days), or ?start=YYYY-MM-DD&end=YYYY-MM-DD
+        (inclusive local dates, default today); &engine=ml|gemini to filter.
+        ?source=live reports this process's histograms instead.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 4
+    read_replica = True
+
+    def get(self, request):
+        if request.GET.get('source') == 'live':
+            return Response({
+                'success': True,
+                'source': 'live',
+                'stages': latency.live_percentiles()
+            })
+
+        try:
+            minutes = request.GET.get('minutes')
+            if minutes:
+                minutes = int(minutes)
+                if not 0 < minutes <= latency.MAX_WINDOW_MINUTES:
+                    raise ValueError(f'minutes must be between 1 and {latency.MAX_WINDOW_MINUTES}')
+                end = timezone.now()
+                start = end - timedelta(minutes=minutes)
+            else:
+                today = timezone.localdate()
+                end_day = parse_date_param(request.GET, 'end') or today
+                start_day = parse_date_param(request.GET, 'start') or end_day
+                if start_day > end_day:
+                    raise ValueError('start is after end')
+                start, _ = local_day_range(start_day)
+                _, end = local_day_range(end_day)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': f'Invalid latency request: {e}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        turns, stages = latency.window_percentiles(start, end, engine=request.GET.get('engine'))
+        return Response({
+            'success': True,
+            'source': 'messages',
+            'start': start,
+            'end': end,
+            'turns': turns,
+            'stages': stages
+        })
+
+
 class IntentAnalyticsView(APIView):
     """Intent usage statistics"""
     permission_classes = [IsAuthenticated]
+    query_budget = 8
+    read_replica = True
 
     def get(self, request):
-        today = timezone.now().date()
-
         # Get intent statistics
-        intent_stats = Message.objects.filter(
-            timestamp__date=today,
-            message_type='bot'
-        ).exclude(
-            intent__isnull=True
-        ).values('intent').annotate(
-            count=Count('id'),
-            avg_confidence=Avg('confidence')
-        ).order_by('-count')
+        intent_stats = analytics_cache.get_or_compute(
+            'intents', lambda: rollups.intent_stats(timezone.localdate())
+        )
 
         return Response({
             'success': True,
-            'intents': list(intent_stats)
+            'intents': intent_stats
         })
 
 
@@ -238,4 +331,49 @@ class MessageFeedbackView(APIView):
             return Response({
                 'success': False,
                 'message': str(e)
-            }, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ExportView(APIView):
+    """
+    Stream a dataset (conversations, messages, activity) as CSV or JSONL
+    GET /api/analytics/export/<dataset>/?type=csv|jsonl&gzip=1&start=YYYY-MM-DD&end=YYYY-MM-DD&user=<id>
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    query_budget = 4
+    read_replica = True
+
+    def get(self, request, dataset):
+        if dataset not in exports.DATASETS:
+            return Response({
+                'success': False,
+                'message': f'Unknown dataset. Choose from: {", ".join(exports.DATASETS)}'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        # `type` rather than `format`, which DRF reserves for renderer selection
+        fmt = request.GET.get('type', 'csv')
+        if fmt not in exports.FORMATS:
+            return Response({
+                'success': False,
+                'message': f'Unknown format. Choose from: {", ".join(exports.FORMATS)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            start = parse_date_param(request.GET, 'start')
+            end = parse_date_param(request.GET, 'end')
+            user_id = int(request.GET['user']) if request.GET.get('user') else None
+        except ValueError:
+            return Response({
+                'success': False,
+                'message': 'start/end must be YYYY-MM-DD and user must be an id'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        compress = request.GET.get('gzip') in ('1', 'true', 'yes')
+
+        response = StreamingHttpResponse(
+            exports.stream_export(dataset, fmt, compress, start=start, end=end, user_id=user_id),
+            content_type=exports.export_content_type(fmt, compress)
+        )
+        filename = exports.export_filename(dataset, fmt, compress)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -3,15 +3,20 @@ Chatbot Admin Configuration
 """
 
 from django.contrib import admin
-from .models import Conversation, Message, ChatbotIntent, ChatbotFeedback
+from core.utils.counts import EstimatedCountPaginator
+from .models import Conversation, Message, ChatbotIntent, ChatbotFeedback, DeletionJob
 
 
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
+    # Large tables: no exact COUNT(*) per changelist page
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_display = ['title', 'user', 'created_at', 'updated_at', 'is_active', 'get_message_count']
     list_filter = ['is_active', 'created_at']
     search_fields = ['title', 'user__username']
     date_hierarchy = 'created_at'
+    list_select_related = ['user']
 
     def get_message_count(self, obj):
         return obj.get_message_count()
@@ -21,10 +26,14 @@ class ConversationAdmin(admin.ModelAdmin):
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
+    # Large tables: no exact COUNT(*) per changelist page
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_display = ['conversation', 'message_type', 'content_preview', 'intent', 'confidence', 'timestamp']
     list_filter = ['message_type', 'timestamp']
     search_fields = ['content', 'intent']
     date_hierarchy = 'timestamp'
+    list_select_related = ['conversation']
 
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
@@ -45,3 +54,12 @@ class ChatbotFeedbackAdmin(admin.ModelAdmin):
     list_filter = ['rating', 'created_at']
     search_fields = ['comment']
     date_hierarchy = 'created_at'
+    list_select_related = ['message']
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ['target_type', 'label', 'target_id', 'status', 'rows_deleted', 'created_at', 'finished_at']
+    list_filter = ['status', 'target_type']
+    search_fields = ['label']
+    readonly_fields = ['started_at', 'finished_at', 'rows_deleted', 'error']
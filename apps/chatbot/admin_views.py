@@ -12,6 +12,8 @@ from django.utils import timezone
 from datetime import timedelta
 from apps.chatbot.models import Message, Conversation
 from apps.analytics.models import ChatAnalytics
+from core.utils.counts import estimated_count
+from core.utils.replica import read_replica
 
 
 # Admin permission check
@@ -20,6 +22,7 @@ def is_admin(user):
     return user.is_staff or user.is_superuser
 
 
+@read_replica
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_dashboard_stats(request):
@@ -32,17 +35,17 @@ def admin_dashboard_stats(request):
     week_ago = today - timedelta(days=7)
 
     # User stats
-    total_users = User.objects.count()
+    total_users = estimated_count(User)[0]
     active_users_today = User.objects.filter(last_login__date=today).count()
     new_users_week = User.objects.filter(date_joined__gte=week_ago).count()
 
     # Message stats
-    total_messages = Message.objects.count()
+    total_messages = estimated_count(Message)[0]
     messages_today = Message.objects.filter(timestamp__date=today).count()
     messages_week = Message.objects.filter(timestamp__gte=week_ago).count()
 
     # Conversation stats
-    total_conversations = Conversation.objects.count()
+    total_conversations = estimated_count(Conversation)[0]
     active_conversations = Conversation.objects.filter(updated_at__gte=week_ago).count()
 
     return Response({
@@ -63,6 +66,7 @@ def admin_dashboard_stats(request):
     })
 
 
+@read_replica
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_users_list(request):
@@ -70,10 +74,8 @@ def admin_users_list(request):
     if not is_admin(request.user):
         return Response({'error': 'Admin access required'}, status=403)
 
-    users = User.objects.all().annotate(
-        message_count=Count('conversation__message', distinct=True),
-        conversation_count=Count('conversation', distinct=True)
-    ).order_by('-date_joined')
+    # Totals are precomputed per user (apps.users.services.stats_service)
+    users = User.objects.select_related('profile').order_by('-date_joined')
 
     user_data = [{
         'id': user.id,
@@ -82,13 +84,14 @@ def admin_users_list(request):
         'date_joined': user.date_joined,
         'last_login': user.last_login,
         'is_active': user.is_active,
-        'message_count': user.message_count,
-        'conversation_count': user.conversation_count,
+        'message_count': user.profile.total_messages if hasattr(user, 'profile') else 0,
+        'conversation_count': user.profile.total_conversations if hasattr(user, 'profile') else 0,
     } for user in users]
 
     return Response({'count': len(user_data), 'users': user_data})
 
 
+@read_replica
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_user_detail(request, user_id):
@@ -169,6 +172,7 @@ def admin_delete_user(request, user_id):
     return Response({'success': True, 'message': f'User {username} deleted'})
 
 
+@read_replica
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_system_health(request):
@@ -178,9 +182,9 @@ def admin_system_health(request):
 
     return Response({
         'database': {
-            'users': User.objects.count(),
-            'conversations': Conversation.objects.count(),
-            'messages': Message.objects.count(),
+            'users': estimated_count(User)[0],
+            'conversations': estimated_count(Conversation)[0],
+            'messages': estimated_count(Message)[0],
         },
         'status': 'healthy',
     })
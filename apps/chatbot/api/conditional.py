@@ -0,0 +1,72 @@
+"""
+HTTP conditional requests for conversation reads.
+
+ETags come from columns that change whenever the payload does:
+Conversation.updated_at and message_count (both bumped on every turn), plus
+the query string, since cursor and limit select a different page. A matching
+If-None-Match gets a 304 before anything is serialized.
+
+There is no Last-Modified: HTTP dates have one-second resolution, so two
+turns within a second would look unchanged, and a list's newest updated_at
+moves backwards when its latest conversation is deleted. The ETag hashes
+microsecond timestamps and the counts, so it changes in both cases.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+
+def _etag(*parts):
+    digest = hashlib.sha1(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def conversation_validators(conversation, request):
+    """ETag for one conversation's detail page"""
+    return _etag(
+        'conversation',
+        conversation.id,
+        conversation.updated_at.isoformat(),
+        conversation.message_count,
+        request.GET.urlencode(),
+    )
+
+
+def conversation_list_validators(queryset, request):
+    """ETag for a user's conversation list, from one aggregate query"""
+    state = queryset.order_by().aggregate(
+        latest=Max('updated_at'),
+        conversations=Count('id'),
+        messages=Sum('message_count'),
+    )
+    latest = state['latest']
+    return _etag(
+        'conversations',
+        latest.isoformat() if latest else '',
+        state['conversations'],
+        state['messages'] or 0,
+        request.GET.urlencode(),
+    )
+
+
+def not_modified(request, etag):
+    """A 304 response if the client's copy is current, else None"""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        add_validators(response, etag)
+    return response
+
+
+def add_validators(response, etag):
+    """Attach the ETag so the client can revalidate next time"""
+    response['ETag'] = etag
+    _set_cache_headers(response)
+    return response
+
+
+def _set_cache_headers(response):
+    # Per-user data: caches may store it but must revalidate every time
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
@@ -0,0 +1,259 @@
+"""
+Keyset (cursor) pagination
+Pages through large result sets by seeking on an indexed key instead of OFFSET,
+so every page costs the same no matter how deep the client has scrolled
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on a unique tuple of columns, e.g. ('-updated_at', '-id').
+
+    The last field must be unique so every row has a stable position. All fields
+    must share the same direction so a single composite index can serve the seek.
+    Cursors are opaque base64 tokens holding the boundary row's key values and
+    the paging direction, so clients can move both forwards and backwards.
+    """
+    ordering = ('-id',)
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+
+    def __init__(self, ordering=None, page_size=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        if page_size is not None:
+            self.page_size = page_size
+
+        directions = {field.startswith('-') for field in self.ordering}
+        assert len(directions) == 1, 'Keyset ordering fields must share one direction'
+        self.descending = directions.pop()
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+        self.base_url = None
+        self.has_next = False
+        self.has_previous = False
+        self.next_position = None
+        self.previous_position = None
+
+    # ---------- cursor encoding ----------
+
+    def encode_cursor(self, position, reverse=False):
+        """Encode a key position into an opaque cursor token"""
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in position]
+        payload = json.dumps({'p': values, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        """Decode the request cursor into (position, reverse)"""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            values = payload['p']
+            reverse = payload.get('r', 0)
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError('cursor does not match ordering')
+            if reverse not in (0, 1) or isinstance(reverse, float):
+                raise ValueError('bad direction')
+            position = [self._parse_key(value) for value in values]
+        except (binascii.Error, ValueError, KeyError, TypeError, AttributeError, UnicodeDecodeError):
+            raise NotFound('Invalid cursor')
+        return position, bool(reverse)
+
+    @staticmethod
+    def _parse_key(value):
+        """A cursor key value: an id (64-bit int) or an aware ISO datetime"""
+        if isinstance(value, int) and not isinstance(value, bool):
+            if not -2 ** 63 <= value < 2 ** 63:
+                raise ValueError('key out of range')
+            return value
+        if isinstance(value, str):
+            parsed = parse_datetime(value)
+            if parsed is not None and parsed.tzinfo is not None:
+                return parsed
+        raise ValueError('bad key value')
+
+    def get_page_size(self, request):
+        """Page size from the query string, clamped to max_page_size"""
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    # ---------- seeking ----------
+
+    def _seek_filter(self, position, forward):
+        """
+        Build the row-value comparison (a, b) < (x, y) as
+        a < x OR (a = x AND b < y), which the planner turns into an index range scan
+        """
+        after = self.descending == forward  # True -> "less than" in column order
+        lookup = 'lt' if after else 'gt'
+
+        condition = Q()
+        for i, field in enumerate(self.fields):
+            branch = Q(**{f'{field}__{lookup}': position[i]})
+            for j in range(i):
+                branch &= Q(**{self.fields[j]: position[j]})
+            condition |= branch
+        return condition
+
+    def _order_by(self, forward):
+        """ORDER BY clause for walking forwards or backwards through the keyset"""
+        if forward:
+            return list(self.ordering)
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    @staticmethod
+    def _key_value(item, field):
+        if isinstance(item, dict):
+            return item[field]
+        return getattr(item, field)
+
+    def get_position(self, item):
+        """Key values of a row, usable as a cursor boundary"""
+        return [self._key_value(item, field) for field in self.fields]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return one page of the queryset using an index seek"""
+        position, reverse = self.decode_cursor(request)
+        forward = not reverse
+        limit = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self._order_by(forward))
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._seek_filter(position, forward))
+            except (ValidationError, ValueError, TypeError):
+                # Well-formed, but a datetime where the ordering has an id (or vice versa)
+                raise NotFound('Invalid cursor')
+
+        rows = list(queryset[:limit + 1])
+        return self._finish_page(request, rows, limit, position, forward)
+
+    def paginate_items(self, items, request):
+        """
+        Same paging contract over an in-memory sequence already sorted by the
+        ordering (used for sources that are not querysets)
+        """
+        position, reverse = self.decode_cursor(request)
+        forward = not reverse
+
+        keyed = sorted(items, key=self.get_position, reverse=self.descending)
+        if not forward:
+            keyed.reverse()
+        if position is not None:
+            bound = tuple(position)
+            try:
+                if self.descending == forward:
+                    keyed = [item for item in keyed if tuple(self.get_position(item)) < bound]
+                else:
+                    keyed = [item for item in keyed if tuple(self.get_position(item)) > bound]
+            except TypeError:
+                raise NotFound('Invalid cursor')
+
+        limit = self.get_page_size(request)
+        return self._finish_page(request, keyed[:limit + 1], limit, position, forward)
+
+    def _finish_page(self, request, rows, limit, position, forward):
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if not forward:
+            rows.reverse()
+
+        if forward:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        else:
+            self.has_next = position is not None
+            self.has_previous = has_more
+
+        self.next_position = self.get_position(rows[-1]) if rows and self.has_next else None
+        self.previous_position = self.get_position(rows[0]) if rows and self.has_previous else None
+        self.base_url = request.build_absolute_uri()
+        return rows
+
+    # ---------- links ----------
+
+    def get_next_cursor(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_previous_cursor(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.get_next_cursor())
+
+    def get_previous_link(self):
+        return self._link(self.get_previous_cursor())
+
+    def get_link_header(self):
+        """RFC 8288 Link header for the current page"""
+        links = []
+        next_link = self.get_next_link()
+        previous_link = self.get_previous_link()
+        if next_link:
+            links.append(f'<{next_link}>; rel="next"')
+        if previous_link:
+            links.append(f'<{previous_link}>; rel="prev"')
+        if self.has_previous or self.has_next:
+            first_link = remove_query_param(self.base_url, self.cursor_query_param)
+            links.append(f'<{first_link}>; rel="first"')
+        return ', '.join(links)
+
+    def get_paginated_response(self, data):
+        """
+        Keep the body shape unchanged (a plain list) and expose paging through
+        the Link header so existing clients keep working
+        """
+        headers = {}
+        link_header = self.get_link_header()
+        if link_header:
+            headers['Link'] = link_header
+        return Response(data, headers=headers)
+
+
+class ConversationPagination(KeysetPagination):
+    """Most recently updated conversations first"""
+    ordering = ('-updated_at', '-id')
+    page_size = 50
+
+
+class MessagePagination(KeysetPagination):
+    """
+    Newest messages first: the first page is the tail of the conversation,
+    `next` walks back in time and `previous` walks forward again
+    """
+    ordering = ('-timestamp', '-id')
+    page_size = 100
+    max_page_size = 500
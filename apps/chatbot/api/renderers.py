@@ -0,0 +1,50 @@
+"""
+Fast JSON rendering for hot read endpoints.
+Uses orjson when installed and falls back to the stdlib encoder otherwise;
+both produce the same document as DRF's JSONRenderer.
+"""
+
+import json
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional dependency: stdlib json is used instead
+    orjson = None
+
+_drf_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Compact JSON via orjson. Aware UTC datetimes end in 'Z' like DRF's output;
+    types orjson does not know (Decimal, lazy strings, ...) go through DRF's
+    encoder.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is not None:
+            return orjson.dumps(
+                data,
+                default=_drf_encoder.default,
+                option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+            )
+        return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastReadRendererMixin:
+    """Swap in ORJSONRenderer for JSON responses when FAST_READ_SERIALIZATION is on"""
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if not settings.FAST_READ_SERIALIZATION:
+            return renderers
+        return [ORJSONRenderer()] + [renderer for renderer in renderers if renderer.format != 'json']
@@ -2,6 +2,7 @@
 Chat Serializers
 """
 
+from django.conf import settings
 from rest_framework import serializers
 from apps.chatbot.models import Conversation, Message
 
@@ -30,12 +31,67 @@ class ConversationSerializer(serializers.ModelSerializer):
 
 class ConversationDetailSerializer(serializers.ModelSerializer):
     """Detailed serializer with messages"""
-    messages = MessageSerializer(many=True, read_only=True)
+    messages = serializers.SerializerMethodField()
 
     class Meta:
         model = Conversation
         fields = ['id', 'title', 'created_at', 'updated_at', 'is_active', 'messages']
 
+    def get_messages(self, obj):
+        # Views pass a single page of messages; fall back to the full history
+        messages = self.context.get('messages')
+        if messages is None:
+            messages = obj.messages.all()
+        return MessageSerializer(messages, many=True).data
+
+
+# ---------- fast read path ----------
+# Plain functions over values() rows for hot endpoints; output matches the
+# serializers above field for field, without per-field serializer overhead
+
+MESSAGE_FIELDS = MessageSerializer.Meta.fields
+CONVERSATION_FIELDS = ConversationSerializer.Meta.fields
+
+_datetime = serializers.DateTimeField()
+
+
+def message_dicts(rows):
+    """Message values() rows (or archived message dicts) in MessageSerializer shape"""
+    to_representation = _datetime.to_representation
+    return [
+        {
+            'id': row['id'],
+            'message_type': row['message_type'],
+            'content': row['content'],
+            'intent': row['intent'],
+            'confidence': row['confidence'],
+            'timestamp': to_representation(row['timestamp']) if row['timestamp'] else None,
+            'metadata': row['metadata'],
+        }
+        for row in rows
+    ]
+
+
+def conversation_dicts(rows):
+    """Conversation values(*CONVERSATION_FIELDS) rows in ConversationSerializer shape"""
+    to_representation = _datetime.to_representation
+    for row in rows:
+        row['created_at'] = to_representation(row['created_at'])
+        row['updated_at'] = to_representation(row['updated_at'])
+    return rows
+
+
+def conversation_detail_dict(conversation, messages):
+    """ConversationDetailSerializer output for one page of message rows"""
+    return {
+        'id': conversation.id,
+        'title': conversation.title,
+        'created_at': _datetime.to_representation(conversation.created_at),
+        'updated_at': _datetime.to_representation(conversation.updated_at),
+        'is_active': conversation.is_active,
+        'messages': message_dicts(messages),
+    }
+
 
 class ChatRequestSerializer(serializers.Serializer):
     """Serializer for chat requests"""
@@ -43,6 +99,24 @@ class ChatRequestSerializer(serializers.Serializer):
     conversation_id = serializers.IntegerField(required=False, allow_null=True)
 
 
+class ChatBatchItemSerializer(serializers.Serializer):
+    """One message of a batch; group labels put messages in the same new conversation"""
+    message = serializers.CharField(required=True)
+    conversation_id = serializers.IntegerField(required=False, allow_null=True)
+    group = serializers.CharField(required=False, allow_blank=True, max_length=100)
+
+
+class ChatBatchRequestSerializer(serializers.Serializer):
+    """Serializer for batch chat requests"""
+    messages = ChatBatchItemSerializer(many=True, allow_empty=False)
+
+    def validate_messages(self, value):
+        limit = settings.CHAT_BATCH_MAX_MESSAGES
+        if len(value) > limit:
+            raise serializers.ValidationError(f'At most {limit} messages per batch')
+        return value
+
+
 class ChatResponseSerializer(serializers.Serializer):
     """Serializer for chat responses"""
     conversation_id = serializers.IntegerField()
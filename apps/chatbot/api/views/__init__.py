@@ -13,7 +13,13 @@ from .admin_views import (
     admin_user_detail,
     admin_toggle_user_status,
     admin_delete_user,
-    admin_system_health
+    admin_deletion_status,
+    admin_system_health,
+    admin_profiles_list,
+    admin_profile_download,
+    admin_memory,
+    admin_memory_snapshots,
+    admin_memory_snapshot
 )
 
 __all__ = [
@@ -22,5 +28,11 @@ __all__ = [
     'admin_user_detail',
     'admin_toggle_user_status',
     'admin_delete_user',
+    'admin_deletion_status',
     'admin_system_health',
+    'admin_profiles_list',
+    'admin_profile_download',
+    'admin_memory',
+    'admin_memory_snapshots',
+    'admin_memory_snapshot',
 ]
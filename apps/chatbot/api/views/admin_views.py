@@ -1,53 +1,105 @@
 """Admin Dashboard Views"""
+import os
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.fields import BooleanField
+from django.http import HttpResponse
 from django.contrib.auth.models import User
 from django.db.models import Count
 from django.utils import timezone
 from datetime import timedelta
-from apps.chatbot.models import Message, Conversation
+from apps.chatbot.api.pagination import KeysetPagination
+from apps.chatbot.models import Message, Conversation, DeletionJob
+from apps.chatbot.services.deletion_service import pending_user_ids, request_user_deletion
 from apps.analytics.models import ChatAnalytics
+from apps.analytics import cache as analytics_cache
+from apps.analytics import counters, ingestion
+from apps.users.models import UserProfile
+from apps.chatbot.services.chatbot_service import engine_footprint
+from core.utils import counts, memory, metrics, profiler
+from core.utils.query_budget import query_budget
+from core.utils.replica import read_replica
 
 
 def is_admin(user):
     return user.is_staff or user.is_superuser
 
 
+@read_replica
+@query_budget(8)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_dashboard_stats(request):
     if not is_admin(request.user):
         return Response({'error': 'Admin access required'}, status=403)
 
-    total_users = User.objects.count()
-    total_messages = Message.objects.count()
-    total_conversations = Conversation.objects.count()
+    return Response(analytics_cache.get_or_compute('admin-dashboard', _dashboard_totals))
 
-    return Response({
-        'users': {'total': total_users},
-        'messages': {'total': total_messages},
-        'conversations': {'total': total_conversations}
-    })
+
+def _dashboard_totals():
+    # Planner estimates on large tables; `estimated` says which totals are approximate
+    return {
+        'users': counts.total(User),
+        'messages': counts.total(Message),
+        'conversations': counts.total(Conversation)
+    }
+
+
+# ?sort= keys for the user list -> keyset ordering (last field unique)
+USER_SORTS = {
+    'joined': ('user_id',),
+    'messages': ('total_messages', 'user_id'),
+    'conversations': ('total_conversations', 'user_id'),
+}
 
 
+@read_replica
+@query_budget(4)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_users_list(request):
+    """
+    Users with their message/conversation totals.
+    ?sort=joined|messages|conversations, ?order=asc|desc (default desc),
+    paged with ?cursor=&limit= (next/previous links in the body and Link header).
+    """
     if not is_admin(request.user):
         return Response({'error': 'Admin access required'}, status=403)
 
-    users = User.objects.all()
-    return Response({
+    sort = request.GET.get('sort', 'joined')
+    if sort not in USER_SORTS:
+        return Response({'error': f'sort must be one of {", ".join(USER_SORTS)}'}, status=400)
+    prefix = '' if request.GET.get('order') == 'asc' else '-'
+    ordering = [prefix + field for field in USER_SORTS[sort]]
+
+    # Stats are precomputed on the profile, so a page is one index seek
+    profiles = UserProfile.objects.select_related('user').exclude(user_id__in=pending_user_ids())
+    paginator = KeysetPagination(ordering=ordering)
+    page = paginator.paginate_queryset(profiles, request)
+
+    response = Response({
         'users': [{
-            'id': u.id,
-            'username': u.username,
-            'email': u.email,
-            'is_active': u.is_active
-        } for u in users]
+            'id': profile.user.id,
+            'username': profile.user.username,
+            'email': profile.user.email,
+            'is_active': profile.user.is_active,
+            'date_joined': profile.user.date_joined,
+            'total_messages': profile.total_messages,
+            'total_conversations': profile.total_conversations,
+            'last_message_at': profile.last_message_at,
+        } for profile in page],
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
     })
+    link_header = paginator.get_link_header()
+    if link_header:
+        response['Link'] = link_header
+    return response
 
 
+@read_replica
+@query_budget(4)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_user_detail(request, user_id):
@@ -55,19 +107,26 @@ def admin_user_detail(request, user_id):
         return Response({'error': 'Admin access required'}, status=403)
 
     try:
-        user = User.objects.get(id=user_id)
+        user = User.objects.select_related('profile').get(id=user_id)
+        profile = getattr(user, 'profile', None)
         return Response({
             'user': {
                 'id': user.id,
                 'username': user.username,
                 'email': user.email,
                 'is_active': user.is_active
+            },
+            'stats': {
+                'total_messages': profile.total_messages if profile else 0,
+                'total_conversations': profile.total_conversations if profile else 0,
+                'last_message_at': profile.last_message_at if profile else None,
             }
         })
     except User.DoesNotExist:
         return Response({'error': 'User not found'}, status=404)
 
 
+@query_budget(6)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsAdminUser])
 def toggle_ban(request, user_id):
@@ -107,6 +166,7 @@ def toggle_ban(request, user_id):
 admin_toggle_user_status = toggle_ban
 
 
+@query_budget(6)
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def admin_delete_user(request, user_id):
@@ -115,16 +175,199 @@ def admin_delete_user(request, user_id):
 
     try:
         user = User.objects.get(id=user_id)
-        user.delete()
-        return Response({'success': True})
     except User.DoesNotExist:
         return Response({'error': 'User not found'}, status=404)
 
+    if user.id == request.user.id:
+        return Response({'error': 'Cannot delete yourself'}, status=400)
+
+    # Deactivates now; the account's history is deleted by a background job
+    job = request_user_deletion(user, requested_by=request.user)
+    return Response({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+    }, status=202)
+
+
+@query_budget(3)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_deletion_status(request, job_id):
+    if not is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=403)
+
+    try:
+        job = DeletionJob.objects.get(id=job_id)
+    except DeletionJob.DoesNotExist:
+        return Response({'error': 'Deletion job not found'}, status=404)
+
+    return Response({
+        'job': {
+            'id': job.id,
+            'target_type': job.target_type,
+            'target_id': job.target_id,
+            'label': job.label,
+            'status': job.status,
+            'rows_deleted': job.rows_deleted,
+            'error': job.error,
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+        }
+    })
 
+
+@query_budget(2)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_system_health(request):
     if not is_admin(request.user):
         return Response({'error': 'Admin access required'}, status=403)
 
-    return Response({'status': 'healthy'})
+    return Response({
+        'status': 'healthy',
+        'activity_pipeline': ingestion.stats(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_profiles_list(request):
+    """Recent request profiles (see core.middleware.profiling)"""
+    if not is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=403)
+
+    return Response({'profiles': profiler.list_profiles()})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_profile_download(request, profile_id):
+    """One profile as folded stacks (flamegraph.pl, speedscope)"""
+    if not is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=403)
+
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        return Response({'error': 'Profile not found'}, status=404)
+
+    _, folded = profile
+    response = HttpResponse(folded, content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.folded"'
+    return response
+
+
+def _int_param(value, default):
+    try:
+        return int(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        return None
+
+
+def _bool_param(value):
+    """True/False from JSON or form values ("false", "0", "off" are False), None if unrecognised"""
+    if isinstance(value, str):
+        value = value.strip().lower()
+    elif not isinstance(value, (bool, int)):
+        return None
+    if value in BooleanField.TRUE_VALUES:
+        return True
+    if value in BooleanField.FALSE_VALUES:
+        return False
+    return None
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def admin_memory(request):
+    """
+    GET: memory footprint of the worker serving the request.
+    POST {"tracing": true|false, "frames": n}: start or stop tracemalloc there.
+    """
+    if not is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=403)
+
+    if request.method == 'POST':
+        tracing = _bool_param(request.data.get('tracing'))
+        if tracing is None:
+            return Response({'error': 'tracing must be true or false'}, status=400)
+        if tracing:
+            frames = _int_param(request.data.get('frames'), None)
+            if frames is not None and not 1 <= frames <= 100:
+                return Response({'error': 'frames must be between 1 and 100'}, status=400)
+            memory.start_tracing(frames)
+        else:
+            memory.stop_tracing()
+        return Response({'pid': os.getpid(), **memory.tracing_status()})
+
+    return Response({
+        'pid': os.getpid(),
+        'process': memory.rss(),
+        'tracing': memory.tracing_status(),
+        'model': engine_footprint(),
+        'caches': memory.cache_report(),
+        'in_process': {
+            'metric_series': sum(len(metric.series()) for metric in metrics.registry().values()),
+            'counter_keys': counters.get_backend().key_count(),
+            'activity_queue_depth': ingestion.stats()['queue_depth'],
+        },
+        'modules': memory.modules_report(),
+    })
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def admin_memory_snapshots(request):
+    """
+    GET: tracemalloc snapshots held by this worker.
+    POST {"label": "..."}: take one (tracing must be on).
+    """
+    if not is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=403)
+
+    if request.method == 'POST':
+        try:
+            snapshot_id = memory.take_snapshot(str(request.data.get('label', ''))[:100])
+        except RuntimeError as e:
+            return Response({'error': str(e)}, status=409)
+        return Response({'pid': os.getpid(), 'id': snapshot_id}, status=201)
+
+    return Response({'pid': os.getpid(), 'snapshots': memory.list_snapshots()})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_memory_snapshot(request, snapshot_id):
+    """
+    Top allocation sites of one snapshot, or with ?compare_to=<id> the sites
+    that grew the most since that one. ?group_by=lineno|filename|traceback, ?limit=
+    """
+    if not is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=403)
+
+    group_by = request.GET.get('group_by', 'lineno')
+    limit = _int_param(request.GET.get('limit'), 20)
+    compare_to = _int_param(request.GET.get('compare_to'), None)
+    if limit is None or not 1 <= limit <= 500:
+        return Response({'error': 'limit must be between 1 and 500'}, status=400)
+    if compare_to is None and request.GET.get('compare_to'):
+        return Response({'error': 'compare_to must be a snapshot id'}, status=400)
+
+    try:
+        if compare_to is not None:
+            sites = memory.diff(compare_to, snapshot_id, group_by, limit)
+        else:
+            sites = memory.top_allocations(snapshot_id, group_by, limit)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    except KeyError:
+        return Response({'error': 'Snapshot not found in this worker'}, status=404)
+
+    return Response({
+        'pid': os.getpid(),
+        'id': snapshot_id,
+        'compare_to': compare_to,
+        'group_by': group_by,
+        'sites': sites,
+    })
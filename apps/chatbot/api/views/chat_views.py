@@ -6,13 +6,31 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.conf import settings
+from apps.chatbot.services.archive_service import ArchiveError, read_archived_messages
 from apps.chatbot.services.chatbot_service import ChatbotService
+from apps.chatbot.services.deletion_service import request_conversation_deletion
+from apps.chatbot.services import idempotency_service
+from apps.chatbot.services.search_service import search_messages
 from apps.chatbot.api.serializers.chat_serializers import (
+    ChatBatchRequestSerializer,
     ChatRequestSerializer,
     ChatResponseSerializer,
     ConversationSerializer,
-    ConversationDetailSerializer
+    ConversationDetailSerializer,
+    CONVERSATION_FIELDS,
+    MESSAGE_FIELDS,
+    conversation_detail_dict,
+    conversation_dicts
 )
+from apps.chatbot.api.renderers import FastReadRendererMixin
+from apps.chatbot.api.conditional import (
+    add_validators,
+    conversation_list_validators,
+    conversation_validators,
+    not_modified
+)
+from apps.chatbot.api.pagination import ConversationPagination, MessagePagination
 from apps.chatbot.models import Conversation, Message
 import logging
 
@@ -22,16 +40,74 @@ logger = logging.getLogger(__name__)
 class ChatAPIView(APIView):
     """
     Main chat endpoint
-    POST: Send message and get bot response
+    POST: Send message and get bot response.
+          With an Idempotency-Key header (authenticated users only), retries
+          of the same request replay the first response instead of creating
+          new messages.
     """
     permission_classes = [AllowAny]
+    query_budget = 12
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.chatbot_service = ChatbotService()
 
     def post(self, request):
-        """Handle chat message"""
+        """Handle chat message, once per Idempotency-Key"""
+        key = request.headers.get(idempotency_service.IDEMPOTENCY_HEADER)
+        if not key:
+            return self.handle_chat(request)
+
+        if len(key) > idempotency_service.MAX_KEY_LENGTH:
+            return Response(
+                {'error': 'Idempotency-Key is too long'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        owner = idempotency_service.request_owner(request)
+        if owner is None:
+            return Response(
+                {'error': 'Idempotency-Key requires an authenticated request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            record, replay = idempotency_service.begin(
+                owner,
+                key,
+                idempotency_service.request_fingerprint(request.data)
+            )
+        except idempotency_service.IdempotencyKeyReused as e:
+            return Response({'error': str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        except idempotency_service.IdempotencyInProgress as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_409_CONFLICT,
+                headers={'Retry-After': str(idempotency_service.RETRY_AFTER_SECONDS)}
+            )
+
+        if replay:
+            return Response(
+                record.response_body,
+                status=record.response_status,
+                headers={'Idempotent-Replayed': 'true'}
+            )
+
+        try:
+            response = self.handle_chat(request)
+        except Exception:
+            idempotency_service.abandon(record)
+            raise
+
+        # Server errors are not stored, so the client's retry gets a fresh attempt
+        if response.status_code >= 500:
+            idempotency_service.abandon(record)
+        else:
+            idempotency_service.complete(record, response.status_code, response.data)
+        return response
+
+    def handle_chat(self, request):
+        """Process one chat message and build the response"""
         serializer = ChatRequestSerializer(data=request.data)
 
         if not serializer.is_valid():
@@ -73,10 +149,51 @@ class ChatAPIView(APIView):
             )
 
 
-class ConversationListAPIView(APIView):
+class ChatBatchAPIView(APIView):
     """
-    GET: List all conversations for authenticated user
+    Batch chat endpoint
+    POST: {"messages": [{"message": "...", "conversation_id": 1 | "group": "ticket-42"}, ...]}
+          Returns one result per message, in order, each with its own success flag.
     """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """Handle a batch of chat messages"""
+        serializer = ChatBatchRequestSerializer(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(
+                {'error': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        items = serializer.validated_data['messages']
+        results = ChatbotService().process_batch(items, request.user)
+        failed = sum(1 for result in results if not result['success'])
+
+        try:
+            log_activity(request.user, 'message_sent', {
+                'batch_size': len(items),
+                'failed': failed
+            })
+        except Exception as e:
+            logger.error(f"Error logging activity: {e}")
+
+        return Response({
+            'success': failed == 0,
+            'processed': len(results) - failed,
+            'failed': failed,
+            'results': results
+        }, status=status.HTTP_200_OK)
+
+
+class ConversationListAPIView(FastReadRendererMixin, APIView):
+    """
+    GET: List conversations for authenticated user, most recent first.
+    Paged with ?cursor=&limit=; next/prev links are sent in the Link header.
+    Supports ETag revalidation (304 when nothing changed).
+    """
+    query_budget = 6
 
     def get(self, request):
         """Get user's conversations"""
@@ -86,19 +203,33 @@ class ConversationListAPIView(APIView):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        conversations = Conversation.objects.filter(
-            user=request.user
-        ).order_by('-updated_at')
+        queryset = Conversation.objects.filter(user=request.user)
 
-        serializer = ConversationSerializer(conversations, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Polling clients revalidate with If-None-Match; unchanged lists cost one aggregate
+        etag = conversation_list_validators(queryset, request)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+        paginator = ConversationPagination()
+        if settings.FAST_READ_SERIALIZATION:
+            rows = paginator.paginate_queryset(queryset.values(*CONVERSATION_FIELDS), request, view=self)
+            response = paginator.get_paginated_response(conversation_dicts(rows))
+        else:
+            conversations = paginator.paginate_queryset(queryset, request, view=self)
+            serializer = ConversationSerializer(conversations, many=True)
+            response = paginator.get_paginated_response(serializer.data)
+        return add_validators(response, etag)
 
 
-class ConversationDetailAPIView(APIView):
+class ConversationDetailAPIView(FastReadRendererMixin, APIView):
     """
-    GET: Get conversation details with all messages
+    GET: Get conversation details with one page of messages (newest page first,
+         ?cursor= from `next` walks back through older history).
+         Supports ETag revalidation (304 when nothing changed).
     DELETE: Delete conversation
     """
+    query_budget = 7
 
     def get(self, request, conversation_id):
         """Get conversation history"""
@@ -106,15 +237,45 @@ class ConversationDetailAPIView(APIView):
             conversation = Conversation.objects.get(id=conversation_id)
 
             # Check if user owns conversation (if authenticated)
-            if request.user.is_authenticated and conversation.user:
-                if conversation.user != request.user:
+            if request.user.is_authenticated and conversation.user_id:
+                if conversation.user_id != request.user.id:
                     return Response(
                         {'error': 'Permission denied'},
                         status=status.HTTP_403_FORBIDDEN
                     )
 
-            serializer = ConversationDetailSerializer(conversation)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            etag = conversation_validators(conversation, request)
+            cached = not_modified(request, etag)
+            if cached is not None:
+                return cached
+
+            paginator = MessagePagination()
+            if conversation.is_archived:
+                # Cold conversations are served from their archive segment
+                try:
+                    archived = read_archived_messages(conversation)
+                except ArchiveError as e:
+                    logger.error(f"Error reading archived conversation {conversation.id}: {e}")
+                    return Response(
+                        {'error': 'Conversation history is temporarily unavailable'},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE
+                    )
+                messages = paginator.paginate_items(archived, request)
+            else:
+                queryset = conversation.messages.all()
+                if settings.FAST_READ_SERIALIZATION:
+                    queryset = queryset.values(*MESSAGE_FIELDS)
+                messages = paginator.paginate_queryset(queryset, request, view=self)
+            messages.reverse()  # Pages are fetched newest-first, shown oldest-first
+
+            if settings.FAST_READ_SERIALIZATION:
+                data = conversation_detail_dict(conversation, messages)
+            else:
+                serializer = ConversationDetailSerializer(conversation, context={'messages': messages})
+                data = serializer.data
+            data['next'] = paginator.get_next_link()
+            data['previous'] = paginator.get_previous_link()
+            return add_validators(Response(data, status=status.HTTP_200_OK), etag)
 
         except Conversation.DoesNotExist:
             return Response(
@@ -128,14 +289,18 @@ class ConversationDetailAPIView(APIView):
             conversation = Conversation.objects.get(id=conversation_id)
 
             # Check if user owns conversation
-            if request.user.is_authenticated and conversation.user:
-                if conversation.user != request.user:
+            if request.user.is_authenticated and conversation.user_id:
+                if conversation.user_id != request.user.id:
                     return Response(
                         {'error': 'Permission denied'},
                         status=status.HTTP_403_FORBIDDEN
                     )
 
-            conversation.delete()
+            # Hidden right away; messages are removed in the background
+            request_conversation_deletion(
+                conversation,
+                requested_by=request.user if request.user.is_authenticated else None
+            )
             return Response(
                 {'message': 'Conversation deleted successfully'},
                 status=status.HTTP_200_OK
@@ -153,6 +318,7 @@ class HealthCheckAPIView(APIView):
     Simple health check endpoint
     """
     permission_classes = [AllowAny]
+    query_budget = 2
 
     def get(self, request):
         """Health check"""
@@ -164,8 +330,9 @@ class HealthCheckAPIView(APIView):
 
 
 class SearchConversationsAPIView(APIView):
-    """Search conversations by keyword"""
+    """Full-text search over the user's conversations, best match first"""
     permission_classes = [IsAuthenticated]
+    query_budget = 6
 
     def get(self, request):
         """Search user's conversations"""
@@ -177,27 +344,36 @@ class SearchConversationsAPIView(APIView):
                 'message': 'Search query required'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Search in messages
-        messages = Message.objects.filter(
-            conversation__user=request.user,
-            content__icontains=query
-        ).select_related('conversation').order_by('-timestamp')[:50]
-
-        # Get unique conversations
-        conversations = {}
-        for msg in messages:
-            conv = msg.conversation
-            if conv.id not in conversations:
-                conversations[conv.id] = {
-                    'id': conv.id,
-                    'title': conv.title,
-                    'created_at': conv.created_at.isoformat(),
-                    'message_count': conv.messages.count(),
-                    'matched_message': msg.content[:100]
-                }
+        # Ranked hits from the full-text index
+        hits = search_messages(request.user, query, limit=50)
+
+        # Keep the best-ranked hit per conversation
+        best_hits = {}
+        for hit in hits:
+            best_hits.setdefault(hit['conversation_id'], hit)
+
+        conversation_rows = Conversation.objects.filter(
+            id__in=best_hits.keys()
+        ).values('id', 'title', 'created_at', 'message_count')
+        conversations_by_id = {row['id']: row for row in conversation_rows}
+
+        conversations = []
+        for conversation_id, hit in best_hits.items():
+            conv = conversations_by_id.get(conversation_id)
+            if conv is None:
+                continue
+            conversations.append({
+                'id': conv['id'],
+                'title': conv['title'],
+                'created_at': conv['created_at'].isoformat(),
+                'message_count': conv['message_count'],
+                'matched_message': hit['snippet'],
+                'matched_message_id': hit['message_id'],
+                'rank': hit['rank'],
+            })
 
         return Response({
             'success': True,
-            'results': list(conversations.values()),
+            'results': conversations,
             'count': len(conversations)
         })
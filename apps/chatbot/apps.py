@@ -10,4 +10,11 @@ class ChatbotConfig(AppConfig):
         """
         Import signals when app is ready
         """
-        pass
+        from django.db.models.signals import post_migrate
+        from apps.chatbot.services.search_service import ensure_search_index
+
+        post_migrate.connect(ensure_search_index, sender=self)
+
+        # Baseline for the memory report's "imported since startup"
+        from core.utils import memory
+        memory.mark_startup()
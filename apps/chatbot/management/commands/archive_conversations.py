@@ -0,0 +1,69 @@
+"""
+Move conversations idle for more than N days into compressed archive segments.
+Schedule it daily, e.g. python manage.py archive_conversations --days 90
+
+Each run then compacts sealed segments left mostly dead by deleted or
+restored conversations (archive_service.compact_segments).
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.chatbot.models import Conversation
+from apps.chatbot.services.archive_service import SegmentStore, archive_conversation, compact_segments
+
+
+class Command(BaseCommand):
+    help = 'Archive idle conversations into compressed, append-only segment files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_IDLE_DAYS,
+                            help='Archive conversations not updated for this many days')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after archiving this many conversations')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many conversations would be archived')
+        parser.add_argument('--compact-ratio', type=float, default=0.5,
+                            help='Rewrite sealed segments once this share of their bytes is dead (0 disables)')
+
+    def handle(self, *args, **options):
+        idle_before = timezone.now() - timedelta(days=options['days'])
+        candidates = Conversation.objects.filter(
+            archived_at__isnull=True,
+            updated_at__lt=idle_before,
+            message_count__gt=0
+        ).order_by('updated_at')
+
+        if options['dry_run']:
+            self.stdout.write(f'{candidates.count()} conversations idle since before {idle_before:%Y-%m-%d} would be archived')
+            return
+
+        store = SegmentStore()
+        archived = messages = 0
+        started = time.monotonic()
+
+        for conversation_id in candidates.values_list('id', flat=True).iterator(chunk_size=500):
+            moved = archive_conversation(conversation_id, idle_before, store=store)
+            if moved is None:
+                continue
+
+            archived += 1
+            messages += moved
+            if archived % 100 == 0:
+                self.stdout.write(f'  {archived} conversations / {messages} messages archived...')
+            if options['limit'] and archived >= options['limit']:
+                break
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} conversations ({messages} messages) to {store.root} in {elapsed:.1f}s'
+        ))
+
+        if options['compact_ratio'] > 0:
+            compacted, reclaimed = compact_segments(options['compact_ratio'], store=store)
+            if compacted:
+                self.stdout.write(f'Compacted {compacted} segments, reclaiming {reclaimed} bytes')
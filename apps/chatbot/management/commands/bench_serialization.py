@@ -0,0 +1,106 @@
+"""
+Compare the conversation detail serializers against the fast read path.
+
+Builds throwaway conversations of each size inside a transaction that is
+rolled back, then times fetch + serialize and render for both paths and
+records peak allocations with tracemalloc.
+
+python manage.py bench_serialization --sizes 1000 10000 --repeat 5
+"""
+
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from apps.chatbot.api import renderers
+from apps.chatbot.api.renderers import ORJSONRenderer
+from apps.chatbot.api.serializers.chat_serializers import (
+    ConversationDetailSerializer,
+    MESSAGE_FIELDS,
+    conversation_detail_dict,
+)
+from apps.chatbot.models import Conversation, Message
+
+
+def serialize_current(conversation):
+    messages = list(conversation.messages.order_by('timestamp', 'id'))
+    return ConversationDetailSerializer(conversation, context={'messages': messages}).data
+
+
+def serialize_fast(conversation):
+    messages = list(conversation.messages.order_by('timestamp', 'id').values(*MESSAGE_FIELDS))
+    return conversation_detail_dict(conversation, messages)
+
+
+PATHS = [
+    ('serializers + json', serialize_current, JSONRenderer()),
+    ('values() + ' + ('orjson' if renderers.orjson else 'json fallback'), serialize_fast, ORJSONRenderer()),
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark conversation detail serialization (time and allocations)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='Messages per conversation')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path (best is reported)')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['sizes'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, sizes, repeat):
+        user = User.objects.create(username=f'bench-{time.time_ns()}')
+        self.stdout.write(f"{'messages':>9}  {'path':<24} {'serialize ms':>13} {'render ms':>10} "
+                          f"{'peak KiB':>10} {'bytes':>11}")
+
+        for size in sizes:
+            conversation = self._make_conversation(user, size)
+            for name, serialize, renderer in PATHS:
+                serialize_ms, render_ms = [], []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    data = serialize(conversation)
+                    serialized = time.perf_counter()
+                    body = renderer.render(data)
+                    serialize_ms.append((serialized - started) * 1000)
+                    render_ms.append((time.perf_counter() - serialized) * 1000)
+
+                # Separate run for allocations: tracemalloc slows everything down
+                tracemalloc.start()
+                renderer.render(serialize(conversation))
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                self.stdout.write(f'{size:>9}  {name:<24} {min(serialize_ms):>13.1f} {min(render_ms):>10.1f} '
+                                  f'{peak / 1024:>10,.0f} {len(body):>11,}')
+
+    def _make_conversation(self, user, size):
+        conversation = Conversation.objects.create(user=user, title=f'Benchmark {size}')
+        now = timezone.now()
+        Message.objects.bulk_create([
+            Message(
+                conversation=conversation,
+                message_type='user' if i % 2 == 0 else 'bot',
+                content=f'Benchmark message {i} with a realistic amount of text in it.',
+                intent=None if i % 2 == 0 else 'greeting',
+                confidence=0.0 if i % 2 == 0 else 0.87,
+                timestamp=now,
+                metadata={'source': 'bench', 'index': i, 'tags': ['a', 'b']},
+            )
+            for i in range(size)
+        ], batch_size=2000)
+        return conversation
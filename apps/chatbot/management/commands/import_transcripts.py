@@ -0,0 +1,267 @@
+"""
+Bulk-load chat transcripts from JSONL files.
+
+One message per line, the same shape as the messages export:
+    {"conversation_id": "src-42", "message_type": "user", "content": "Hi",
+     "intent": null, "confidence": 0.0, "timestamp": "2025-01-01T10:00:00Z",
+     "metadata": {}, "username": "alice", "title": "Support chat"}
+
+conversation_id is the source system's key and groups lines into a new
+Conversation; username (or --user) assigns the owner, and lines naming a
+username that does not exist are skipped. Malformed lines (bad JSON, an
+unknown message_type, a non-numeric confidence, an unparseable timestamp)
+are reported and skipped. Files may be gzipped.
+
+python manage.py import_transcripts dump.jsonl.gz --batch-size 5000 --rescore
+"""
+
+import gzip
+import io
+import json
+import math
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.analytics import cache as analytics_cache
+from apps.chatbot.models import Conversation, Message
+from apps.users.services import stats_service
+
+MESSAGE_TYPES = {choice for choice, _ in Message.MESSAGE_TYPE_CHOICES}
+COPY_COLUMNS = ['conversation_id', 'message_type', 'content', 'intent', 'confidence', 'timestamp', 'metadata']
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def _copy_literal(value):
+    """CSV field for COPY: unquoted empty is NULL, everything else is quoted"""
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class Command(BaseCommand):
+    help = 'Bulk import JSONL chat transcripts into Conversation and Message'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='JSONL transcript files (.jsonl or .jsonl.gz)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Messages per insert batch')
+        parser.add_argument('--user', help='Assign every imported conversation to this username')
+        parser.add_argument('--rescore', action='store_true',
+                            help='Re-predict intent/confidence for user messages with the ML engine')
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Use bulk_create even when PostgreSQL COPY is available')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        self.engine = None
+        if options['rescore']:
+            from ml_models.chatbot_engine import ChatbotEngine
+            self.engine = ChatbotEngine()
+
+        self.owner = None
+        if options['user']:
+            try:
+                self.owner = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+
+        # source conversation key -> [conversation id, first ts, last ts, message count]
+        self.conversations = {}
+        self.users = {}
+        self.imported = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+
+        batch = []
+        for path in options['files']:
+            with _open(path) as f:
+                for line_number, line in enumerate(f, 1):
+                    record = self._parse(line, path, line_number)
+                    if record is None:
+                        continue
+                    batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        self._flush(batch)
+                        batch = []
+        if batch:
+            self._flush(batch)
+
+        self._finalize_conversations()
+        owners = [self.owner.id] if self.owner else [user_id for user_id in self.users.values() if user_id]
+        stats_service.rebuild(user_ids=owners)
+        analytics_cache.bump_version()
+
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.imported} messages into {len(self.conversations)} conversations '
+            f'in {elapsed:.1f}s ({self.imported / elapsed:,.0f} msg/s, '
+            f'{"COPY" if self.use_copy else "bulk_create"}); skipped {self.skipped} lines'
+        ))
+
+    # ---------- parsing ----------
+
+    def _parse(self, line, path, line_number):
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            record = json.loads(line)
+            key = str(record['conversation_id'])
+            content = record['content']
+            if not isinstance(content, str):
+                raise TypeError('content must be a string')
+
+            message_type = record.get('message_type', 'user')
+            if message_type not in MESSAGE_TYPES:
+                raise ValueError(f'unknown message_type {message_type!r}')
+
+            confidence = float(record.get('confidence') or 0.0)
+            if not math.isfinite(confidence):
+                raise ValueError('confidence must be finite')
+
+            timestamp = None
+            if record.get('timestamp'):
+                timestamp = parse_datetime(record['timestamp'])
+                if timestamp is None:
+                    raise ValueError(f"invalid timestamp {record['timestamp']!r}")
+
+            metadata = record.get('metadata') or {}
+            if not isinstance(metadata, dict):
+                raise TypeError('metadata must be an object')
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.skipped += 1
+            self.stderr.write(f'{path}:{line_number}: not a transcript line ({e}), skipped')
+            return None
+
+        if timestamp is None:
+            timestamp = timezone.now()
+        elif timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+
+        return {
+            'key': key,
+            'username': record.get('username'),
+            'title': record.get('title'),
+            'message_type': message_type,
+            'content': content,
+            'intent': record.get('intent'),
+            'confidence': confidence,
+            'timestamp': timestamp,
+            'metadata': metadata,
+        }
+
+    # ---------- batches ----------
+
+    def _resolve_users(self, batch):
+        """Batch records whose owner is known: lines naming an unknown username are skipped"""
+        if self.owner is not None:
+            return batch
+        missing = {r['username'] for r in batch if r['username'] and r['username'] not in self.users}
+        if missing:
+            found = dict(User.objects.filter(username__in=missing).values_list('username', 'id'))
+            for username in missing:
+                self.users[username] = found.get(username)
+                if username not in found:
+                    self.stderr.write(f"Unknown user '{username}': their lines are skipped")
+
+        kept = []
+        for record in batch:
+            if record['username'] and self.users[record['username']] is None:
+                self.skipped += 1
+            else:
+                kept.append(record)
+        return kept
+
+    def _create_conversations(self, batch):
+        new = {}
+        for record in batch:
+            if record['key'] not in self.conversations and record['key'] not in new:
+                user_id = self.owner.id if self.owner else self.users.get(record['username'])
+                title = record['title'] or f"Imported chat {record['key']}"
+                new[record['key']] = Conversation(user_id=user_id, title=title[:200])
+
+        if new:
+            Conversation.objects.bulk_create(new.values(), batch_size=self.batch_size)
+            for key, conversation in new.items():
+                self.conversations[key] = [conversation.id, None, None, 0]
+
+    def _rescore(self, batch):
+        user_records = [r for r in batch if r['message_type'] == 'user']
+        predictions = self.engine.predict_intents([r['content'] for r in user_records])
+        for record, (intent, confidence) in zip(user_records, predictions):
+            record['intent'] = intent
+            record['confidence'] = confidence
+
+    def _insert_copy(self, rows):
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(','.join(_copy_literal(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        sql = f"COPY {Message._meta.db_table} ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):  # psycopg2
+                raw.copy_expert(sql, buffer)
+            else:  # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+    def _flush(self, batch):
+        with transaction.atomic():
+            batch = self._resolve_users(batch)
+            self._create_conversations(batch)
+            if self.engine is not None:
+                self._rescore(batch)
+
+            rows = []
+            for record in batch:
+                state = self.conversations[record['key']]
+                state[1] = min(state[1], record['timestamp']) if state[1] else record['timestamp']
+                state[2] = max(state[2], record['timestamp']) if state[2] else record['timestamp']
+                state[3] += 1
+                rows.append((
+                    state[0],
+                    record['message_type'],
+                    record['content'],
+                    record['intent'],
+                    record['confidence'],
+                    record['timestamp'],
+                    record['metadata'],
+                ))
+
+            if self.use_copy:
+                self._insert_copy([
+                    row[:5] + (row[5].isoformat(), json.dumps(row[6])) for row in rows
+                ])
+            else:
+                Message.objects.bulk_create(
+                    [Message(**dict(zip(COPY_COLUMNS, row))) for row in rows],
+                    batch_size=self.batch_size
+                )
+
+        self.imported += len(batch)
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        self.stdout.write(f'  {self.imported:,} messages ({self.imported / elapsed:,.0f} msg/s)')
+
+    def _finalize_conversations(self):
+        """Carry transcript times and counts onto the new conversations"""
+        updates = [
+            Conversation(id=conversation_id, created_at=first, updated_at=last, message_count=count)
+            for conversation_id, first, last, count in self.conversations.values()
+        ]
+        # bulk_update bypasses auto_now/auto_now_add, so original times survive
+        Conversation.objects.bulk_update(
+            updates, ['created_at', 'updated_at', 'message_count'], batch_size=self.batch_size
+        )
@@ -0,0 +1,46 @@
+"""
+Run queued deletion jobs.
+
+Jobs normally run on a background thread started by the request that queued
+them; this command picks up whatever a restart interrupted.
+
+python manage.py process_deletions --retry-failed
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.chatbot.models import DeletionJob
+from apps.chatbot.services.deletion_service import run_deletion_job
+
+
+class Command(BaseCommand):
+    help = 'Hard-delete users and conversations queued for deletion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows per delete batch')
+        parser.add_argument('--retry-failed', action='store_true', help='Also rerun failed jobs')
+        parser.add_argument('--stale-minutes', type=int, default=30,
+                            help='Requeue jobs stuck in running for longer than this')
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        requeued = DeletionJob.objects.filter(status='running', started_at__lt=stale_before).update(
+            status='pending'
+        )
+        if options['retry_failed']:
+            requeued += DeletionJob.objects.filter(status='failed').update(status='pending', error='')
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} jobs')
+
+        job_ids = list(DeletionJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True))
+        for job_id in job_ids:
+            job = run_deletion_job(job_id, batch_size=options['batch_size'])
+            if job is None:
+                continue
+            style = self.style.SUCCESS if job.status == 'done' else self.style.ERROR
+            self.stdout.write(style(f'{job}: {job.rows_deleted} rows deleted {job.error}'.rstrip()))
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {len(job_ids)} deletion jobs'))
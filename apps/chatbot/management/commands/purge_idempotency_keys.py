@@ -0,0 +1,17 @@
+"""
+Delete expired Idempotency-Key records.
+
+python manage.py purge_idempotency_keys
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.chatbot.services.idempotency_service import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete idempotency keys past their TTL'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
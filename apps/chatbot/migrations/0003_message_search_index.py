@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from apps.chatbot.services.search_service import install_search_index
+
+    install_search_index(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    from apps.chatbot.services.search_service import uninstall_search_index
+
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chatbot", "0002_conversation_message_keyset_indexes"),
+    ]
+
+    operations = [
+        # PostgreSQL: generated tsvector column + GIN index
+        # SQLite: external-content FTS5 table kept in sync by triggers
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0 on 2026-10-19 06:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chatbot", "0003_message_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["user", "-updated_at"],
+                name="conv_user_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(fields=["created_at"], name="conv_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["updated_at", "user"], name="conv_updated_user_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["timestamp", "message_type", "intent"],
+                name="msg_ts_type_intent_idx",
+            ),
+        ),
+    ]
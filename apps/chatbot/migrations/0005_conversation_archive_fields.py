@@ -0,0 +1,60 @@
+# Generated by Django 5.0 on 2026-10-19 06:10
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_message_count(apps, schema_editor):
+    Conversation = apps.get_model("chatbot", "Conversation")
+    Message = apps.get_model("chatbot", "Message")
+
+    counts = (
+        Message.objects.order_by()
+        .values("conversation_id")
+        .annotate(total=Count("id"))
+        .values_list("conversation_id", "total")
+    )
+    batch = []
+    for conversation_id, total in counts.iterator(chunk_size=2000):
+        batch.append(Conversation(id=conversation_id, message_count=total))
+        if len(batch) >= 2000:
+            Conversation.objects.bulk_update(batch, ["message_count"])
+            batch = []
+    if batch:
+        Conversation.objects.bulk_update(batch, ["message_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chatbot", "0004_analytics_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversation",
+            name="archive_length",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="archive_offset",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="archive_segment",
+            field=models.CharField(blank=True, default="", max_length=100),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="archived_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="message_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_message_count, migrations.RunPython.noop),
+    ]
@@ -8,6 +8,13 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 
 
+class ConversationManager(models.Manager):
+    """Hides soft-deleted conversations that are waiting for background removal"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Conversation(models.Model):
     """
     Represents a chat conversation/session
@@ -24,17 +31,49 @@ class Conversation(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    # Denormalized counter, kept in step by the chat write path
+    message_count = models.PositiveIntegerField(default=0)
+
+    # Cold storage: set when the messages were moved to an archive segment
+    archived_at = models.DateTimeField(null=True, blank=True)
+    archive_segment = models.CharField(max_length=100, blank=True, default='')
+    archive_offset = models.BigIntegerField(null=True, blank=True)
+    archive_length = models.PositiveIntegerField(null=True, blank=True)
+
+    # Soft delete: hidden immediately, hard-deleted in batches by a DeletionJob
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ConversationManager()
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ['-updated_at']
         verbose_name = 'Conversation'
         verbose_name_plural = 'Conversations'
+        indexes = [
+            # Keyset pagination of a user's conversation list
+            models.Index(fields=['user', '-updated_at', '-id'], name='conv_user_updated_idx'),
+            # Active conversation lookup on every chat turn
+            models.Index(
+                fields=['user', '-updated_at'],
+                condition=models.Q(is_active=True),
+                name='conv_user_active_idx'
+            ),
+            # Analytics date-range filters
+            models.Index(fields=['created_at'], name='conv_created_idx'),
+            models.Index(fields=['updated_at', 'user'], name='conv_updated_user_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
     def get_message_count(self):
         """Return total messages in this conversation"""
-        return self.messages.count()
+        return self.message_count
+
+    @property
+    def is_archived(self):
+        return self.archived_at is not None
 
 
 class Message(models.Model):
@@ -69,6 +108,12 @@ class Message(models.Model):
         ordering = ['timestamp']
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
+        indexes = [
+            # Keyset pagination of a conversation's history
+            models.Index(fields=['conversation', 'timestamp', 'id'], name='msg_conv_ts_idx'),
+            # Analytics: time range, then type/intent without touching the table
+            models.Index(fields=['timestamp', 'message_type', 'intent'], name='msg_ts_type_intent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.message_type}: {self.content[:50]}"
@@ -123,3 +168,80 @@ class ChatbotFeedback(models.Model):
 
     def __str__(self):
         return f"Feedback: {self.rating} stars"
+
+
+class DeletionJob(models.Model):
+    """
+    Background hard delete of a user or conversation in bounded batches.
+    The target is soft-deleted (hidden) as soon as the job is created.
+    """
+    TARGET_CHOICES = [
+        ('user', 'User'),
+        ('conversation', 'Conversation'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    target_type = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    target_id = models.BigIntegerField()
+    label = models.CharField(max_length=200, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    rows_deleted = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Deletion Job'
+        verbose_name_plural = 'Deletion Jobs'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='deletionjob_status_idx'),
+            models.Index(fields=['target_type', 'target_id'], name='deletionjob_target_idx'),
+        ]
+
+    def __str__(self):
+        return f"Delete {self.target_type} {self.label or self.target_id} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Outcome of a POST sent with an Idempotency-Key header, so client retries
+    replay the stored response instead of running the request again
+    """
+    STATUS_CHOICES = [
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+    ]
+
+    # "user:<id>": keys are only unique per caller
+    owner = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='processing')
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Idempotency Key'
+        verbose_name_plural = 'Idempotency Keys'
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'key'], name='idempotency_owner_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner} {self.key} ({self.status})"
@@ -0,0 +1,498 @@
+"""
+Conversation Archive Service
+Moves cold conversations out of the message table into append-only,
+compressed JSONL segment files and reads them back transparently.
+
+Layout under ARCHIVE_ROOT:
+    segment-000001.jsonl.zst   one independently compressed frame per conversation
+    segment-000001.idx         "conversation_id offset length" per frame
+
+The Conversation row stays behind as a stub holding the segment name, frame
+offset and length, so reading an archived conversation is a single seek.
+
+Frames outlive nothing they belong to: deleting or restoring a conversation
+zeroes its frame in place (erase_frame), and compact_segments rewrites sealed
+segments that are mostly dead bytes, keeping only frames a stub points at.
+
+Archived messages leave the hot tables, so readers that query Message see
+only live history. What still covers the archive:
+  * dashboard totals and charts read the analytics rollups; a conversation
+    is archived only once all of its messages have been folded into them
+  * user stats are rebuilt from Conversation.message_count, kept on the stub
+  * message exports and latency windows read matching archived frames too
+    (iter_archived_messages)
+Full-text search does not: archived messages are not searchable until the
+conversation is restored.
+"""
+
+import gzip
+import json
+import logging
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.chatbot.models import ChatbotFeedback, Conversation, Message
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency: fall back to stdlib gzip frames
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single archiver process assumed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_FIELDS = ['id', 'message_type', 'content', 'intent', 'confidence', 'timestamp', 'metadata']
+SEGMENT_SUFFIXES = ('.zst', '.gz')
+RETIRED_SUFFIX = '.retired'
+
+
+class ArchiveError(Exception):
+    """Raised when an archived conversation cannot be read back"""
+
+
+# ---------- frame codecs ----------
+
+def _codec_for(segment_name):
+    return 'zst' if segment_name.endswith('.zst') else 'gz'
+
+
+def _compress(data, codec):
+    if codec == 'zst':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data, codec):
+    if codec == 'zst':
+        if zstandard is None:
+            raise ArchiveError('zstandard is required to read .zst archive segments')
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+# ---------- segment files ----------
+
+class SegmentStore:
+    """Append-only segment files with a sidecar offset index"""
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = Path(root or settings.ARCHIVE_ROOT)
+        self.max_bytes = max_bytes or settings.ARCHIVE_SEGMENT_MAX_BYTES
+        self.codec = 'zst' if zstandard is not None else 'gz'
+
+    def segments(self):
+        return sorted(path for path in self.root.glob('segment-*.jsonl.*') if path.suffix in SEGMENT_SUFFIXES)
+
+    def _new_segment(self, codec):
+        numbers = [int(path.name.split('-')[1].split('.')[0]) for path in self.segments()]
+        return self.root / f'segment-{max(numbers, default=0) + 1:06d}.jsonl.{codec}'
+
+    def append_targets(self):
+        """The latest segment of each codec: the ones archivers may still append to"""
+        latest = {}
+        for path in self.segments():
+            latest[_codec_for(path.name)] = path
+        return set(latest.values())
+
+    def _current_segment(self):
+        """Latest segment, or a new one once it reaches max_bytes"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        segments = [path for path in self.segments() if _codec_for(path.name) == self.codec]
+        if segments and segments[-1].stat().st_size < self.max_bytes:
+            return segments[-1]
+        return self._new_segment(self.codec)
+
+    def append(self, conversation_id, payload):
+        """Compress and append one frame; returns (segment_name, offset, length)"""
+        frame = _compress(payload, self.codec)
+        segment = self._current_segment()
+
+        with open(segment, 'ab') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(frame)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+        # The index is only a recovery aid; the stub row is the source of truth
+        with open(segment.with_suffix('').with_suffix('.idx'), 'a') as index:
+            index.write(f'{conversation_id} {offset} {len(frame)}\n')
+
+        return segment.name, offset, len(frame)
+
+    def read_frame(self, segment_name, offset, length):
+        """One frame's compressed bytes"""
+        path = self.root / segment_name
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                frame = f.read(length)
+        except FileNotFoundError:
+            raise ArchiveError(f'Archive segment {segment_name} is missing')
+
+        if len(frame) != length:
+            raise ArchiveError(f'Archive segment {segment_name} is truncated')
+        return frame
+
+    def read(self, segment_name, offset, length):
+        """Read and decompress one frame"""
+        frame = self.read_frame(segment_name, offset, length)
+        try:
+            return _decompress(frame, _codec_for(segment_name))
+        except (OSError, EOFError, ValueError) as e:
+            if not frame.strip(b'\0'):
+                raise ArchiveError(f'Archived frame in {segment_name} at {offset} was erased')
+            raise ArchiveError(f'Archived frame in {segment_name} at {offset} is corrupt: {e}')
+
+    def erase(self, segment_name, offset, length):
+        """Overwrite one frame with zeros in place (other frames keep their offsets)"""
+        try:
+            with open(self.root / segment_name, 'r+b') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(offset)
+                    f.write(b'\0' * length)
+                    f.flush()
+                    os.fsync(f.fileno())
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+        except FileNotFoundError:
+            logger.warning(f"Archive segment {segment_name} is missing, nothing to erase")
+
+    def write_segment(self, frames, codec):
+        """
+        Write (conversation_id, compressed frame) pairs into a new segment;
+        returns (segment_name, [offset per frame])
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        segment = self._new_segment(codec)
+        offsets = []
+        with open(segment, 'xb') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                for _, frame in frames:
+                    offsets.append(f.tell())
+                    f.write(frame)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+        with open(segment.with_suffix('').with_suffix('.idx'), 'w') as index:
+            for (conversation_id, frame), offset in zip(frames, offsets):
+                index.write(f'{conversation_id} {offset} {len(frame)}\n')
+        return segment.name, offsets
+
+    def retire(self, path):
+        """
+        Take a compacted segment out of use. It is deleted by the next
+        compaction, so a reader holding its old stub can still finish.
+        """
+        path.rename(path.with_name(path.name + RETIRED_SUFFIX))
+        path.with_suffix('').with_suffix('.idx').unlink(missing_ok=True)
+
+    def remove_retired(self):
+        for path in self.root.glob(f'segment-*{RETIRED_SUFFIX}'):
+            path.unlink(missing_ok=True)
+
+
+# ---------- (de)serialization ----------
+
+def _dump_conversation(conversation, messages):
+    lines = [json.dumps({
+        'conversation': {
+            'id': conversation.id,
+            'user_id': conversation.user_id,
+            'title': conversation.title,
+            'created_at': conversation.created_at,
+            'updated_at': conversation.updated_at,
+        }
+    }, cls=DjangoJSONEncoder)]
+    lines.extend(json.dumps(message, cls=DjangoJSONEncoder) for message in messages)
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _load_messages(payload):
+    messages = []
+    for line in payload.decode('utf-8').splitlines():
+        record = json.loads(line)
+        if 'conversation' in record:
+            continue
+        record['timestamp'] = parse_datetime(record['timestamp'])
+        messages.append(record)
+    return messages
+
+
+def _collect_messages(conversation):
+    """Message rows plus any feedback attached to them"""
+    from apps.analytics.models import MessageFeedback
+
+    messages = list(
+        Message.objects.filter(conversation=conversation)
+        .order_by('timestamp', 'id')
+        .values(*MESSAGE_FIELDS)
+    )
+    message_ids = [message['id'] for message in messages]
+
+    ratings = {
+        row['message_id']: row
+        for row in ChatbotFeedback.objects.filter(message_id__in=message_ids)
+        .values('message_id', 'rating', 'comment', 'created_at')
+    }
+    user_feedback = {}
+    for row in MessageFeedback.objects.filter(message_id__in=message_ids).values(
+        'message_id', 'user_id', 'feedback_type', 'comment', 'created_at'
+    ):
+        user_feedback.setdefault(row['message_id'], []).append(row)
+
+    for message in messages:
+        if message['id'] in ratings:
+            message['rating'] = ratings[message['id']]
+        if message['id'] in user_feedback:
+            message['user_feedback'] = user_feedback[message['id']]
+    return messages
+
+
+# ---------- public API ----------
+
+def _folded_message_id():
+    """Highest message id already counted by the analytics rollups"""
+    from apps.analytics.models import RollupWatermark
+    from apps.analytics.rollups import MESSAGES
+
+    return RollupWatermark.objects.filter(name=MESSAGES).values_list('last_id', flat=True).first() or 0
+
+
+def archive_conversation(conversation_id, idle_before, store=None):
+    """
+    Move one idle conversation's messages into the current segment.
+    Returns the number of archived messages, or None if it was skipped
+    (not idle, already archived, or holding messages the rollups have not
+    counted yet).
+    """
+    from apps.analytics.models import MessageFeedback
+
+    store = store or SegmentStore()
+
+    with transaction.atomic():
+        conversation = Conversation.objects.select_for_update().filter(
+            id=conversation_id,
+            archived_at__isnull=True,
+            updated_at__lt=idle_before
+        ).first()
+        if conversation is None:
+            return None
+
+        messages = _collect_messages(conversation)
+        if not messages:
+            return None
+        if max(message['id'] for message in messages) > _folded_message_id():
+            # Rollups read Message; archiving unfolded rows would lose them
+            return None
+
+        # Write the frame first: a crash before commit leaves dead bytes in
+        # the segment, never a stub pointing at missing data
+        segment, offset, length = store.append(conversation.id, _dump_conversation(conversation, messages))
+
+        message_ids = [message['id'] for message in messages]
+        ChatbotFeedback.objects.filter(message_id__in=message_ids).delete()
+        MessageFeedback.objects.filter(message_id__in=message_ids).delete()
+        Message.objects.filter(conversation=conversation).delete()
+
+        # queryset.update() leaves updated_at (auto_now) untouched
+        Conversation.objects.filter(id=conversation.id).update(
+            archived_at=timezone.now(),
+            archive_segment=segment,
+            archive_offset=offset,
+            archive_length=length,
+            message_count=len(messages),
+        )
+
+    return len(messages)
+
+
+def read_archived_messages(conversation, store=None):
+    """Messages of an archived conversation as dicts shaped like MessageSerializer input"""
+    store = store or SegmentStore()
+    payload = store.read(conversation.archive_segment, conversation.archive_offset, conversation.archive_length)
+    return _load_messages(payload)
+
+
+def iter_archived_messages(start=None, end=None, user_id=None, store=None):
+    """
+    Yield (conversation, message) for archived messages timestamped in
+    [start, end), conversation being a dict with id, user_id and username.
+    Only frames of conversations active in the range are read; unreadable
+    frames are logged and skipped.
+    """
+    store = store or SegmentStore()
+
+    conversations = Conversation.objects.filter(archived_at__isnull=False).order_by('id')
+    if start:
+        conversations = conversations.filter(updated_at__gte=start)
+    if end:
+        conversations = conversations.filter(created_at__lt=end)
+    if user_id:
+        conversations = conversations.filter(user_id=user_id)
+
+    for stub in conversations.values(
+        'id', 'user_id', 'user__username', 'archive_segment', 'archive_offset', 'archive_length'
+    ).iterator(chunk_size=500):
+        try:
+            payload = store.read(stub['archive_segment'], stub['archive_offset'], stub['archive_length'])
+        except ArchiveError as e:
+            logger.error(f"Skipping archived conversation {stub['id']}: {e}")
+            continue
+
+        conversation = {'id': stub['id'], 'user_id': stub['user_id'], 'username': stub['user__username']}
+        for message in _load_messages(payload):
+            if start and message['timestamp'] < start:
+                continue
+            if end and message['timestamp'] >= end:
+                continue
+            yield conversation, message
+
+
+def restore_conversations(conversations, store=None):
+    """
+    Move archived conversations back into the hot tables (e.g. before new
+    messages), all in one transaction with a fixed number of queries.
+    Returns {id: conversation} reloaded after the restore; ids that no
+    longer exist are missing.
+    """
+    from apps.analytics.models import MessageFeedback
+
+    store = store or SegmentStore()
+    ids = [conversation.id for conversation in conversations]
+
+    with transaction.atomic():
+        locked = list(Conversation.objects.select_for_update().filter(id__in=ids, archived_at__isnull=False))
+        records = {conversation.id: read_archived_messages(conversation, store) for conversation in locked}
+
+        Message.objects.bulk_create([
+            Message(conversation_id=conversation_id, **{field: record[field] for field in MESSAGE_FIELDS})
+            for conversation_id, messages in records.items() for record in messages
+        ])
+        ChatbotFeedback.objects.bulk_create([
+            ChatbotFeedback(
+                message_id=record['id'],
+                rating=record['rating']['rating'],
+                comment=record['rating']['comment'],
+            )
+            for messages in records.values() for record in messages if 'rating' in record
+        ])
+        MessageFeedback.objects.bulk_create([
+            MessageFeedback(
+                message_id=record['id'],
+                user_id=feedback['user_id'],
+                feedback_type=feedback['feedback_type'],
+                comment=feedback['comment'],
+            )
+            for messages in records.values() for record in messages
+            for feedback in record.get('user_feedback', [])
+        ])
+
+        if locked:
+            Conversation.objects.filter(id__in=records).update(
+                archived_at=None,
+                archive_segment='',
+                archive_offset=None,
+                archive_length=None,
+            )
+            # The messages are live again; their archived copies must not outlive a later delete
+            frames = [
+                (conversation.archive_segment, conversation.archive_offset, conversation.archive_length)
+                for conversation in locked
+            ]
+
+            def erase():
+                for frame in frames:
+                    store.erase(*frame)
+
+            transaction.on_commit(erase)
+
+    for conversation_id, messages in records.items():
+        logger.info(f"Restored archived conversation {conversation_id} ({len(messages)} messages)")
+    return Conversation.objects.in_bulk(ids)
+
+
+def restore_conversation(conversation, store=None):
+    """Move one archived conversation back into the hot tables (e.g. before a new message)"""
+    restored = restore_conversations([conversation], store).get(conversation.id)
+    if restored is None:
+        raise Conversation.DoesNotExist(f'Conversation {conversation.id} no longer exists')
+    return restored
+
+
+def erase_frame(conversation, store=None):
+    """
+    Zero the archived frame of a conversation that is being hard-deleted.
+    Call it with the stub row locked, so compaction cannot move the frame first.
+    """
+    if not conversation.archive_segment:
+        return
+    (store or SegmentStore()).erase(
+        conversation.archive_segment, conversation.archive_offset, conversation.archive_length
+    )
+
+
+def compact_segments(min_dead_ratio=0.5, store=None):
+    """
+    Rewrite sealed segments whose dead bytes (erased frames, frames of
+    restored conversations, leftovers of interrupted archiving) reach
+    min_dead_ratio of the file: live frames are copied into a new segment and
+    their stubs repointed. Segments still taking appends are left alone.
+    Returns (segments compacted, bytes reclaimed).
+    """
+    store = store or SegmentStore()
+    if not store.root.is_dir():
+        return 0, 0
+    store.remove_retired()
+
+    compacted = reclaimed = 0
+    for path in sorted(set(store.segments()) - store.append_targets()):
+        size = path.stat().st_size
+        with transaction.atomic():
+            stubs = list(
+                Conversation.all_objects.select_for_update()
+                .filter(archive_segment=path.name)
+                .order_by('archive_offset')
+            )
+            live = sum(stub.archive_length for stub in stubs)
+            if size == 0 or (size - live) / size < min_dead_ratio:
+                continue
+
+            if stubs:
+                frames = [
+                    (stub.id, store.read_frame(path.name, stub.archive_offset, stub.archive_length))
+                    for stub in stubs
+                ]
+                segment, offsets = store.write_segment(frames, _codec_for(path.name))
+                for stub, offset in zip(stubs, offsets):
+                    stub.archive_segment, stub.archive_offset = segment, offset
+                Conversation.all_objects.bulk_update(stubs, ['archive_segment', 'archive_offset'])
+            transaction.on_commit(lambda path=path: store.retire(path))
+
+        compacted += 1
+        reclaimed += size - live
+    return compacted, reclaimed
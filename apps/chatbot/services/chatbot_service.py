@@ -5,12 +5,90 @@ Business logic for chatbot functionality
 
 from ml_models.chatbot_engine import ChatbotEngine
 from apps.chatbot.models import Conversation, Message
+from apps.chatbot.services.archive_service import restore_conversation, restore_conversations
+from apps.users.services import stats_service
+from apps.analytics import cache as analytics_cache
+from apps.analytics import counters
+from apps.analytics import latency
+from concurrent.futures import ThreadPoolExecutor
+from core.utils import memory, metrics
+from core.utils.metrics import StageTimer
+from datetime import timedelta
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, F, When, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# One engine per process: models are loaded once, not on every request
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """Shared ChatbotEngine instance"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ChatbotEngine()
+    return _engine
+
+
+model_load_seconds = metrics.gauge('ml_model_load_seconds', 'Seconds the ML intent model took to load')
+model_info = metrics.gauge('ml_model_info', 'Loaded ML intent model (version is a hash of the model file)')
+gemini_requests = metrics.counter('gemini_requests_total', 'Gemini calls by outcome (ok, error, timeout)')
+
+
+def _collect_engine_metrics():
+    engine = _engine
+    if engine is None or engine.load_seconds is None:
+        return  # not loaded in this process yet
+    model_load_seconds.set(round(engine.load_seconds, 6))
+    model_info.set(1, version=engine.model_version)
+
+
+metrics.register_collector(_collect_engine_metrics)
+
+
+def engine_footprint():
+    """Approximate memory held by this process's engine (without loading it)"""
+    engine = _engine
+    if engine is None or engine.load_seconds is None:
+        return {'loaded': False}
+    return {
+        'loaded': True,
+        'version': engine.model_version,
+        'model_bytes': memory.deep_size(engine.model),
+        'vectorizer_bytes': memory.deep_size(engine.vectorizer),
+        'responses_bytes': memory.deep_size(engine.responses_dict),
+        'file_bytes': {
+            path.name: path.stat().st_size for path in sorted(engine.model_path.glob('*.pkl'))
+        },
+    }
+
+
+def _count_gemini(result):
+    gemini_requests.inc(outcome=result.get('error_type', 'ok'))
+
+
+def _add_messages(conversation, count, now):
+    """
+    Add `count` messages to a conversation's counter. Returns 1 when this
+    UPDATE took the counter from zero (the turn started the conversation),
+    else 0, so two concurrent first turns count the conversation once.
+    """
+    rows = Conversation.objects.filter(id=conversation.id)
+    # Counters only grow: a conversation loaded with messages has them still
+    if conversation.message_count == 0 and rows.filter(message_count=0).update(updated_at=now, message_count=count):
+        return 1
+    rows.update(updated_at=now, message_count=F('message_count') + count)
+    return 0
+
 
 class ChatbotService:
     """Service class to handle chatbot logic"""
@@ -18,12 +96,23 @@ class ChatbotService:
     def __init__(self):
         """Initialize chatbot engine"""
         try:
-            self.engine = ChatbotEngine()
+            self.engine = get_engine()
             logger.info("Chatbot engine initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize chatbot engine: {e}")
             self.engine = None
 
+    @staticmethod
+    def needs_ai(user_message, ml_result):
+        """
+        Use Gemini AI if:
+        1. ML confidence is low (< 0.65)
+        2. Question is longer (more than 5 words)
+        """
+        if not ml_result:
+            return True
+        return ml_result['confidence'] < 0.65 or len(user_message.split()) > 5
+
     def get_or_create_conversation(self, user=None):
         """Get existing active conversation or create new one"""
         if user:
@@ -53,49 +142,46 @@ class ChatbotService:
         HYBRID MODE: Uses ML for simple queries, Gemini AI for complex ones (FREE!)
         """
         try:
-            # Get or create conversation
-            if conversation_id:
-                conversation = Conversation.objects.get(id=conversation_id)
-            else:
-                conversation = self.get_or_create_conversation(user)
+            timer = StageTimer()
+
+            with timer.stage('conversation_lookup'):
+                # Get or create conversation
+                if conversation_id:
+                    conversation = Conversation.objects.get(id=conversation_id)
+                else:
+                    conversation = self.get_or_create_conversation(user)
+
+                # New turns go to the hot table, so bring archived history back first
+                if conversation.is_archived:
+                    conversation = restore_conversation(conversation)
 
             # Save user message
-            user_msg = Message.objects.create(
-                conversation=conversation,
-                message_type='user',
-                content=user_message,
-                timestamp=timezone.now()
-            )
+            with timer.stage('user_message_insert'):
+                user_msg = Message.objects.create(
+                    conversation=conversation,
+                    message_type='user',
+                    content=user_message,
+                    timestamp=timezone.now()
+                )
 
             # Try ML engine first for simple queries
             ml_result = None
             if self.engine:
-                ml_result = self.engine.chat(user_message)
+                ml_result = self.engine.chat(user_message, timer.timings)
 
             # Decide which engine to use based on confidence
-            use_ai = False
-
-            # Use Gemini AI if:
-            # 1. ML confidence is low (< 0.65)
-            # 2. Question is longer (more than 5 words)
-            # 3. Contains question words that need real information
-
-            question_keywords = ['what', 'when', 'where', 'why', 'how', 'who', 'explain', 'tell me']
-            contains_question = any(word in user_message.lower() for word in question_keywords)
-
-            if ml_result:
-                if ml_result['confidence'] < 0.65 or len(user_message.split()) > 5:
-                    use_ai = True
-            else:
-                use_ai = True
+            with timer.stage('routing'):
+                use_ai = self.needs_ai(user_message, ml_result)
+                if use_ai:
+                    from ml_models.gemini_engine import GeminiEngine
+                    gemini = GeminiEngine()
+                    use_ai = gemini.is_available()
 
             # Get response
+            engine = 'ml'
             if use_ai:
-                # Try Gemini AI (FREE!)
-                from ml_models.gemini_engine import GeminiEngine
-                gemini = GeminiEngine()
-
-                if gemini.is_available():
+                # Gemini AI (FREE!)
+                with timer.stage('history_lookup'):
                     # Get conversation history for context
                     history = conversation.messages.order_by('timestamp')[:10]
                     conv_history = [
@@ -106,34 +192,50 @@ class ChatbotService:
                         for msg in history
                     ]
 
+                with timer.stage('gemini'):
                     result = gemini.chat(user_message, conv_history)
-                    bot_response = result['response']
-                    intent = result['intent']
-                    confidence = result['confidence']
-                else:
-                    # Fallback to ML
-                    bot_response = ml_result['response'] if ml_result else "I'm currently unavailable."
-                    intent = ml_result['intent'] if ml_result else 'error'
-                    confidence = ml_result['confidence'] if ml_result else 0.0
-            else:
-                # Use ML engine result (fast!)
+                _count_gemini(result)
+                engine = 'gemini'
+                bot_response = result['response']
+                intent = result['intent']
+                confidence = result['confidence']
+            elif ml_result:
+                # Use ML engine result (fast!), also the fallback when Gemini is unavailable
                 bot_response = ml_result['response']
                 intent = ml_result['intent']
                 confidence = ml_result['confidence']
+            else:
+                engine = 'none'
+                bot_response = "I'm currently unavailable."
+                intent = 'error'
+                confidence = 0.0
 
-            # Save bot message
-            bot_msg = Message.objects.create(
-                conversation=conversation,
-                message_type='bot',
-                content=bot_response,
-                intent=intent,
-                confidence=confidence,
-                timestamp=timezone.now()
-            )
+            # Save bot message, with the timings of every stage so far
+            with timer.stage('bot_message_insert'):
+                bot_msg = Message.objects.create(
+                    conversation=conversation,
+                    message_type='bot',
+                    content=bot_response,
+                    intent=intent,
+                    confidence=confidence,
+                    timestamp=timezone.now(),
+                    metadata=latency.turn_metadata(timer.timings, engine)
+                )
 
-            # Update conversation timestamp
-            conversation.updated_at = timezone.now()
-            conversation.save()
+            # Update conversation timestamp and message counter, and the owner's stats
+            now = timezone.now()
+            started = _add_messages(conversation, 2, now)
+            stats_service.record_messages(conversation.user_id, 2, conversations=started, at=now)
+            analytics_cache.bump_version()
+            counters.record_messages([
+                ('user', None, conversation.user_id),
+                ('bot', intent, conversation.user_id),
+            ])
+            timer.add('total', timer.elapsed())
+            latency.observe_turn(timer.timings, engine)
+            # The bot insert and the total are only known now: complete the stored timings
+            bot_msg.metadata = latency.turn_metadata(timer.timings, engine)
+            Message.objects.filter(id=bot_msg.id).update(metadata=bot_msg.metadata)
 
             return {
                 'success': True,
@@ -159,6 +261,242 @@ class ChatbotService:
                 'error': str(e)
             }
 
+    def _batch_conversations(self, items, user):
+        """
+        Resolve every item to a conversation: existing ones by conversation_id
+        (must belong to the user), new ones per `group` label, and one shared
+        new conversation for items with neither. New conversations are not
+        saved yet: the write step creates those that end up with messages.
+        Returns ({index: conversation}, {index: error}, new conversations).
+        """
+        requested = {item['conversation_id'] for item in items if item.get('conversation_id')}
+        existing = {
+            conversation.id: conversation
+            for conversation in Conversation.objects.filter(id__in=requested, user=user)
+        }
+        archived = [conversation for conversation in existing.values() if conversation.is_archived]
+        if archived:
+            existing.update(restore_conversations(archived))
+
+        stamp = timezone.now().strftime('%Y-%m-%d %H:%M')
+        new = {}
+        for item in items:
+            if item.get('conversation_id'):
+                continue
+            group = item.get('group') or ''
+            if group not in new:
+                title = f"Batch - {group}" if group else f"Batch - {stamp}"
+                new[group] = Conversation(user=user, title=title[:200])
+
+        assigned, errors = {}, {}
+        for index, item in enumerate(items):
+            if item.get('conversation_id'):
+                conversation = existing.get(item['conversation_id'])
+                if conversation is None:
+                    errors[index] = 'Conversation not found'
+                    continue
+            else:
+                conversation = new[item.get('group') or '']
+            assigned[index] = conversation
+        return assigned, errors, list(new.values())
+
+    def _batch_history(self, conversations):
+        """Last 10 messages per existing conversation, as Gemini context, in one windowed query"""
+        recent = Message.objects.filter(
+            conversation_id__in=[conversation.id for conversation in conversations]
+        ).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F('conversation_id')],
+                order_by=[F('timestamp').desc(), F('id').desc()],
+            )
+        ).filter(position__lte=10).order_by('conversation_id', '-position').values(
+            'conversation_id', 'message_type', 'content'
+        )
+
+        history = {conversation.id: [] for conversation in conversations}
+        for msg in recent:
+            history[msg['conversation_id']].append({
+                'role': 'user' if msg['message_type'] == 'user' else 'assistant',
+                'content': msg['content']
+            })
+        return history
+
+    def process_batch(self, items, user):
+        """
+        Process many messages in one call.
+
+        items are dicts with `message` and optionally `conversation_id` or
+        `group`. Intents for the whole batch come from one vectorized ML
+        pass; messages that need AI go to Gemini with bounded concurrency
+        (CHAT_BATCH_AI_CONCURRENCY), using each conversation's history as of
+        the start of the batch. New conversations and all messages are
+        written with bulk_create, and counters with one UPDATE, in a single
+        transaction, so the query count does not grow with the batch.
+        Each bot message records its turn's stage timings (apps.analytics.latency).
+        Returns one result per item, in order, each with its own success flag.
+        """
+        timer = StageTimer()
+        with timer.stage('conversation_lookup'):
+            assigned, errors, created = self._batch_conversations(items, user)
+        pending = [index for index in range(len(items)) if index in assigned]
+        texts = [items[index]['message'] for index in pending]
+
+        if self.engine:
+            ml_results = dict(zip(pending, self.engine.chat_batch(texts, timer.timings)))
+        else:
+            ml_results = {}
+
+        replies = {}
+        engines = {}
+        gemini_ms = {}
+        ai_indexes = []
+        with timer.stage('routing'):
+            for index in pending:
+                ml_result = ml_results.get(index)
+                if self.needs_ai(items[index]['message'], ml_result):
+                    ai_indexes.append(index)
+                else:
+                    replies[index] = ml_result
+                    engines[index] = 'ml'
+
+            if ai_indexes:
+                from ml_models.gemini_engine import GeminiEngine
+                gemini = GeminiEngine()
+
+        if ai_indexes:
+            if gemini.is_available():
+                with timer.stage('history_lookup'):
+                    history = self._batch_history({
+                        assigned[index] for index in ai_indexes if items[index].get('conversation_id')
+                    })
+
+                def ask(index):
+                    call = StageTimer()
+                    with call.stage('gemini'):
+                        result = gemini.chat(items[index]['message'], history.get(assigned[index].id))
+                    return result, call.timings['gemini']
+
+                with ThreadPoolExecutor(max_workers=settings.CHAT_BATCH_AI_CONCURRENCY) as pool:
+                    for index, (result, milliseconds) in zip(ai_indexes, pool.map(ask, ai_indexes)):
+                        _count_gemini(result)
+                        if result['intent'] == 'error':
+                            errors[index] = result['response']
+                        else:
+                            replies[index] = result
+                            engines[index] = 'gemini'
+                            gemini_ms[index] = milliseconds
+            else:
+                # Fallback to ML
+                for index in ai_indexes:
+                    ml_result = ml_results.get(index)
+                    replies[index] = ml_result or {
+                        'response': "I'm currently unavailable.",
+                        'intent': 'error',
+                        'confidence': 0.0
+                    }
+                    engines[index] = 'ml' if ml_result else 'none'
+
+        # Each turn stores its share of the batch-wide stages plus its own Gemini call
+        turns = len([index for index in pending if index in replies]) or 1
+        shared = {stage: round(milliseconds / turns, 3) for stage, milliseconds in timer.timings.items()}
+
+        def turn_timings(index):
+            timings = dict(shared)
+            if index in gemini_ms:
+                timings['gemini'] = gemini_ms[index]
+            return timings
+
+        # Keep user/bot pairs in order within a conversation with
+        # strictly increasing timestamps
+        now = timezone.now()
+        rows = []
+        for position, index in enumerate(index for index in pending if index in replies):
+            conversation = assigned[index]
+            reply = replies[index]
+            rows.append((index, Message(
+                conversation=conversation,
+                message_type='user',
+                content=items[index]['message'],
+                timestamp=now + timedelta(microseconds=2 * position)
+            ), Message(
+                conversation=conversation,
+                message_type='bot',
+                content=reply['response'],
+                intent=reply['intent'],
+                confidence=float(reply['confidence']),
+                timestamp=now + timedelta(microseconds=2 * position + 1),
+                metadata=latency.turn_metadata(turn_timings(index), engines[index], batch=turns)
+            )))
+
+        with timer.stage('message_insert'), transaction.atomic():
+            # Only groups with at least one saved message get a conversation
+            Conversation.objects.bulk_create([
+                conversation for conversation in created
+                if any(user_msg.conversation is conversation for _, user_msg, _ in rows)
+            ])
+            Message.objects.bulk_create([msg for _, user_msg, bot_msg in rows for msg in (user_msg, bot_msg)])
+
+            added = {}
+            for _, user_msg, _ in rows:
+                added[user_msg.conversation_id] = added.get(user_msg.conversation_id, 0) + 2
+            if added:
+                Conversation.objects.filter(id__in=added).update(
+                    updated_at=timezone.now(),
+                    message_count=Case(*[
+                        When(id=conversation_id, then=F('message_count') + count)
+                        for conversation_id, count in added.items()
+                    ]),
+                )
+            # Conversations loaded empty (new ones included) are started by this batch
+            started = len({
+                user_msg.conversation_id for _, user_msg, _ in rows if user_msg.conversation.message_count == 0
+            })
+            stats_service.record_messages(user.id, sum(added.values()), conversations=started)
+        if rows:
+            analytics_cache.bump_version()
+            counters.record_messages([
+                (msg.message_type, msg.intent, user.id)
+                for _, user_msg, bot_msg in rows for msg in (user_msg, bot_msg)
+            ])
+            total = round(timer.elapsed() / turns, 3)
+            insert = round(timer.timings['message_insert'] / turns, 3)
+            for index, _, bot_msg in rows:
+                bot_msg.metadata['timings_ms'].update(message_insert=insert, total=total)
+                latency.observe_turn(bot_msg.metadata['timings_ms'], engines[index])
+            # The insert and the total are only known now: complete the stored timings
+            Message.objects.bulk_update([bot_msg for _, _, bot_msg in rows], ['metadata'])
+
+        saved = {index: (user_msg, bot_msg) for index, user_msg, bot_msg in rows}
+        results = []
+        for index in range(len(items)):
+            if index in saved:
+                user_msg, bot_msg = saved[index]
+                results.append({
+                    'index': index,
+                    'success': True,
+                    'conversation_id': user_msg.conversation_id,
+                    'user_message': {
+                        'id': user_msg.id,
+                        'content': user_msg.content,
+                        'timestamp': user_msg.timestamp
+                    },
+                    'bot_message': {
+                        'id': bot_msg.id,
+                        'content': bot_msg.content,
+                        'intent': bot_msg.intent,
+                        'confidence': bot_msg.confidence,
+                        'timestamp': bot_msg.timestamp
+                    }
+                })
+            else:
+                results.append({
+                    'index': index,
+                    'success': False,
+                    'error': errors.get(index, 'Message could not be processed')
+                })
+        return results
+
     def get_conversation_history(self, conversation_id):
         """Get all messages in a conversation"""
         try:
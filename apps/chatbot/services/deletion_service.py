@@ -0,0 +1,211 @@
+"""
+Deletion Service
+Deletes users and conversations with large histories without loading them.
+
+Requesting a deletion is constant time: the target is hidden at once (the
+conversation is soft-deleted, the user deactivated) and a DeletionJob is
+queued. The job then hard-deletes the rows bottom-up in bounded raw batches,
+one short transaction per batch, recording progress as it goes. Django's
+cascade collector is never involved, so nothing is pulled into memory and no
+table stays locked for the whole account. An archived conversation's frame is
+zeroed in its segment before the stub row goes; archive_conversations compacts
+the dead bytes away.
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.analytics import cache as analytics_cache
+from apps.chatbot.models import ChatbotFeedback, Conversation, DeletionJob, Message
+from apps.chatbot.services.archive_service import erase_frame
+from apps.users.services import stats_service
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _delete_batch(model, column, value, batch_size, via=None):
+    """
+    Delete up to batch_size rows of model where column = value and return the
+    row count. With via=(parent_model, parent_column) the rows are matched
+    through their parent instead: model.column IN (next batch of parent ids).
+    """
+    if via is None:
+        sql = (
+            f"DELETE FROM {_table(model)} WHERE id IN ("
+            f"SELECT id FROM {_table(model)} WHERE {column} = %s ORDER BY id LIMIT %s)"
+        )
+    else:
+        parent, parent_column = via
+        # ORDER BY id picks the same parent batch the parent delete will remove
+        sql = (
+            f"DELETE FROM {_table(model)} WHERE {column} IN ("
+            f"SELECT id FROM {_table(parent)} WHERE {parent_column} = %s ORDER BY id LIMIT %s)"
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value, batch_size])
+        return cursor.rowcount
+
+
+def _record_progress(job, rows):
+    if rows:
+        DeletionJob.objects.filter(id=job.id).update(rows_deleted=F('rows_deleted') + rows)
+        job.rows_deleted += rows
+
+
+def _purge_conversation(job, conversation_id, batch_size):
+    """Messages (with their feedback) in batches, then the conversation row"""
+    from apps.analytics.models import MessageFeedback
+
+    while True:
+        with transaction.atomic():
+            rows = _delete_batch(ChatbotFeedback, 'message_id', conversation_id, batch_size,
+                                 via=(Message, 'conversation_id'))
+            rows += _delete_batch(MessageFeedback, 'message_id', conversation_id, batch_size,
+                                  via=(Message, 'conversation_id'))
+            deleted = _delete_batch(Message, 'conversation_id', conversation_id, batch_size)
+        _record_progress(job, rows + deleted)
+        if deleted < batch_size:
+            break
+
+    with transaction.atomic():
+        # Locking the stub keeps compaction from moving the frame while it is erased
+        stub = Conversation.all_objects.select_for_update().filter(id=conversation_id).only(
+            'id', 'archive_segment', 'archive_offset', 'archive_length'
+        ).first()
+        if stub is not None:
+            erase_frame(stub)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {_table(Conversation)} WHERE id = %s", [conversation_id])
+            deleted = cursor.rowcount
+    _record_progress(job, deleted)
+
+
+def _purge_user(job, user_id, batch_size):
+    """Every conversation, then the per-user activity tables, then the user row"""
+    from apps.analytics.models import MessageFeedback, UserActivity
+
+    conversation_ids = list(
+        Conversation.all_objects.filter(user_id=user_id).order_by('id').values_list('id', flat=True)
+    )
+    for conversation_id in conversation_ids:
+        _purge_conversation(job, conversation_id, batch_size)
+
+    for model in (MessageFeedback, UserActivity):
+        while True:
+            with transaction.atomic():
+                deleted = _delete_batch(model, 'user_id', user_id, batch_size)
+            _record_progress(job, deleted)
+            if deleted < batch_size:
+                break
+
+    # What is left (profile, tokens, social accounts, ...) is a handful of
+    # rows, so the regular cascade is cheap now
+    with transaction.atomic():
+        deleted, _ = User.objects.filter(id=user_id).delete()
+    _record_progress(job, deleted)
+
+
+def run_deletion_job(job_id, batch_size=None):
+    """
+    Hard-delete the target of one pending job. Safe to call concurrently: only
+    the caller that moves the job from pending to running does the work.
+    Returns the job, or None if it was already claimed.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+
+    claimed = DeletionJob.objects.filter(id=job_id, status='pending').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        return None
+
+    job = DeletionJob.objects.get(id=job_id)
+    try:
+        if job.target_type == 'user':
+            _purge_user(job, job.target_id, batch_size)
+        else:
+            _purge_conversation(job, job.target_id, batch_size)
+    except Exception as e:
+        logger.exception(f"Deletion job {job.id} failed")
+        DeletionJob.objects.filter(id=job.id).update(
+            status='failed', error=str(e), finished_at=timezone.now()
+        )
+    else:
+        DeletionJob.objects.filter(id=job.id).update(status='done', finished_at=timezone.now())
+        analytics_cache.bump_version()
+        logger.info(f"Deletion job {job.id} removed {job.rows_deleted} rows")
+
+    job.refresh_from_db()
+    return job
+
+
+def _run_in_background(job_id):
+    try:
+        run_deletion_job(job_id)
+    finally:
+        connection.close()
+
+
+def _schedule(job):
+    """Start the job once the request's transaction commits"""
+    if not settings.DELETION_ASYNC:
+        transaction.on_commit(lambda: run_deletion_job(job.id))
+        return
+
+    def start():
+        threading.Thread(
+            target=_run_in_background, args=(job.id,), name=f'deletion-job-{job.id}', daemon=True
+        ).start()
+
+    transaction.on_commit(start)
+
+
+def request_conversation_deletion(conversation, requested_by=None):
+    """Hide a conversation immediately and queue its hard delete"""
+    with transaction.atomic():
+        Conversation.all_objects.filter(id=conversation.id).update(deleted_at=timezone.now())
+        stats_service.remove_conversation(conversation)
+        job = DeletionJob.objects.create(
+            target_type='conversation',
+            target_id=conversation.id,
+            label=conversation.title[:200],
+            requested_by=requested_by,
+        )
+        _schedule(job)
+    return job
+
+
+def request_user_deletion(user, requested_by=None):
+    """
+    Deactivate a user immediately (their tokens stop authenticating) and queue
+    the hard delete of the account and everything it owns
+    """
+    with transaction.atomic():
+        User.objects.filter(id=user.id).update(is_active=False)
+        job = DeletionJob.objects.create(
+            target_type='user',
+            target_id=user.id,
+            label=user.username,
+            requested_by=requested_by,
+        )
+        _schedule(job)
+    return job
+
+
+def pending_user_ids():
+    """Subquery of users queued for deletion, for excluding them from listings"""
+    return DeletionJob.objects.filter(
+        target_type='user', status__in=ACTIVE_STATUSES
+    ).values('target_id')
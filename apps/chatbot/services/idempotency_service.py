@@ -0,0 +1,139 @@
+"""
+Idempotency Service
+Lets clients retry a POST safely by sending an Idempotency-Key header.
+
+The first request with a key claims it (a 'processing' row, guarded by a
+unique constraint) and stores its response when done. Later requests with
+the same key replay that response; requests arriving while the first is
+still running are turned away at once (409 with Retry-After) rather than
+holding a worker while they wait. Keys expire after IDEMPOTENCY_KEY_TTL
+seconds; a key whose holder died is released after IDEMPOTENCY_LOCK_TIMEOUT
+seconds.
+
+Keys are scoped per user, so only authenticated requests can use them:
+anonymous callers have nothing stable to scope by (every client behind the
+proxy shares an address).
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from apps.chatbot.models import IdempotencyKey
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# Seconds a duplicate of an in-flight request is told to wait before retrying
+RETRY_AFTER_SECONDS = 1
+
+
+class IdempotencyError(Exception):
+    """Base class for idempotency key failures"""
+
+
+class IdempotencyKeyReused(IdempotencyError):
+    """The key was already used for a request with a different payload"""
+
+
+class IdempotencyInProgress(IdempotencyError):
+    """The original request is still running"""
+
+
+def request_owner(request):
+    """Namespace for keys: the authenticated user (None for anonymous calls)"""
+    if request.user.is_authenticated:
+        return f'user:{request.user.id}'
+    return None
+
+
+def request_fingerprint(data):
+    """Stable hash of the request payload, to reject a key reused for other input"""
+    payload = json.dumps(data, cls=JSONEncoder, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _to_json(body):
+    # Same encoder the response renderer uses, so a replay is byte-identical
+    return json.loads(json.dumps(body, cls=JSONEncoder))
+
+
+def _claim(owner, key, fingerprint):
+    """Create the 'processing' row; None if another request holds the key"""
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                owner=owner,
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+    except IntegrityError:
+        return None
+
+
+def begin(owner, key, fingerprint):
+    """
+    Start an idempotent request. Returns (record, replay):
+    replay=False means the caller owns the key and must call complete() or
+    abandon(); replay=True means record holds the stored response.
+    Raises IdempotencyKeyReused, or IdempotencyInProgress while the original
+    request is still running.
+    """
+    while True:
+        record = _claim(owner, key, fingerprint)
+        if record is not None:
+            return record, False
+
+        existing = IdempotencyKey.objects.filter(owner=owner, key=key).first()
+        if existing is None:
+            # The holder failed and released the key: try to take it over
+            continue
+
+        if existing.expires_at <= timezone.now():
+            IdempotencyKey.objects.filter(id=existing.id).delete()
+            continue
+
+        if existing.fingerprint != fingerprint:
+            raise IdempotencyKeyReused(f'Idempotency key {key} was used with a different request body')
+
+        if existing.status == 'completed':
+            return existing, True
+
+        lock_expired = existing.created_at + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+        if lock_expired <= timezone.now():
+            # The holder died without completing or abandoning the key
+            IdempotencyKey.objects.filter(id=existing.id, status='processing').delete()
+            continue
+
+        raise IdempotencyInProgress(f'Request with idempotency key {key} is still in progress')
+
+
+def complete(record, status_code, body):
+    """Store the response for replay"""
+    body = _to_json(body)
+    IdempotencyKey.objects.filter(id=record.id).update(
+        status='completed',
+        response_status=status_code,
+        response_body=body,
+    )
+    record.status = 'completed'
+    record.response_status = status_code
+    record.response_body = body
+
+
+def abandon(record):
+    """Release the key after a failure so a retry runs the request again"""
+    IdempotencyKey.objects.filter(id=record.id, status='processing').delete()
+
+
+def purge_expired():
+    """Delete expired keys; returns the number removed"""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
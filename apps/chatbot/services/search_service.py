@@ -0,0 +1,263 @@
+"""
+Message Search Service
+Full-text search over message content backed by the database's native index:
+a generated tsvector column with a GIN index on PostgreSQL, and an FTS5
+virtual table kept in sync by triggers on SQLite.
+
+Only live messages are indexed: archived conversations are not searchable
+until they are restored. Soft-deleted conversations are filtered inside the
+query, so they never take up the result limit.
+"""
+
+import html
+import logging
+import re
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+from apps.chatbot.models import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_TABLE = Message._meta.db_table
+CONVERSATION_TABLE = Conversation._meta.db_table
+FTS_TABLE = f'{MESSAGE_TABLE}_fts'
+SEARCH_VECTOR_INDEX = 'msg_search_vector_gin'
+
+SNIPPET_START = '<mark>'
+SNIPPET_END = '</mark>'
+SNIPPET_WORDS = 16
+
+# The database highlights with private-use characters; the snippet is escaped
+# before they are swapped for SNIPPET_START/SNIPPET_END, so only the markers
+# are markup and message content can never inject any
+_MARK_START = '\ue000'
+_MARK_END = '\ue001'
+
+POSTGRES_INSTALL = [
+    f"""ALTER TABLE {MESSAGE_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(content, ''))) STORED""",
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_VECTOR_INDEX} ON {MESSAGE_TABLE} USING GIN (search_vector)",
+]
+
+POSTGRES_UNINSTALL = [
+    f"DROP INDEX IF EXISTS {SEARCH_VECTOR_INDEX}",
+    f"ALTER TABLE {MESSAGE_TABLE} DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        content, content='{MESSAGE_TABLE}', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {MESSAGE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {MESSAGE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF content ON {MESSAGE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+    END""",
+]
+
+SQLITE_TRIGGERS = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+
+SQLITE_UNINSTALL = [f"DROP TRIGGER IF EXISTS {name}" for name in SQLITE_TRIGGERS] + [
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# Per-alias cache of whether the native index is usable
+_index_available = {}
+
+
+def install_search_index(connection):
+    """Create the native full-text index for this connection's backend"""
+    _index_available.pop(connection.alias, None)
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for sql in POSTGRES_INSTALL:
+                cursor.execute(sql)
+
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(SQLITE_INSTALL[0])
+            except OperationalError as e:
+                # SQLite builds without FTS5 fall back to LIKE scans
+                logger.warning(f"FTS5 unavailable, message search will not be indexed: {e}")
+                return
+            for sql in SQLITE_INSTALL[1:]:
+                cursor.execute(sql)
+            # Index rows that existed before the table (or that were written
+            # while triggers were missing after a table remake)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall_search_index(connection):
+    """Drop the native full-text index"""
+    _index_available.pop(connection.alias, None)
+
+    statements = {
+        'postgresql': POSTGRES_UNINSTALL,
+        'sqlite': SQLITE_UNINSTALL,
+    }.get(connection.vendor, [])
+
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def ensure_search_index(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate hook: SQLite drops triggers whenever a migration remakes the
+    message table, so reinstall them (and rebuild the index) if any are missing
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s",
+            [MESSAGE_TABLE]
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+
+    if not set(SQLITE_TRIGGERS) <= existing:
+        install_search_index(connection)
+
+
+def _has_native_index(connection):
+    if connection.alias not in _index_available:
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = 'search_vector'",
+                    [MESSAGE_TABLE]
+                )
+                _index_available[connection.alias] = cursor.fetchone() is not None
+        elif connection.vendor == 'sqlite':
+            _index_available[connection.alias] = FTS_TABLE in connection.introspection.table_names()
+        else:
+            _index_available[connection.alias] = False
+    return _index_available[connection.alias]
+
+
+def _fts5_query(query):
+    """
+    Turn free text into a safe FTS5 expression: every word is quoted (so
+    operators in user input are literals) and the last one matches as a prefix
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = ['"{}"'.format(word.replace('"', '""')) for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _search_postgres(cursor, user_id, query, limit):
+    cursor.execute(
+        f"""
+        WITH q AS (SELECT websearch_to_tsquery('english', %s) AS query),
+        hits AS (
+            SELECT m.id, m.conversation_id, m.content, m.timestamp,
+                   ts_rank_cd(m.search_vector, q.query) AS rank
+            FROM {MESSAGE_TABLE} m
+            JOIN {CONVERSATION_TABLE} c ON c.id = m.conversation_id, q
+            WHERE c.user_id = %s AND c.deleted_at IS NULL AND m.search_vector @@ q.query
+            ORDER BY rank DESC, m.timestamp DESC
+            LIMIT %s
+        )
+        SELECT hits.id, hits.conversation_id, hits.timestamp, hits.rank,
+               ts_headline('english', hits.content, q.query, %s)
+        FROM hits, q
+        ORDER BY hits.rank DESC, hits.timestamp DESC
+        """,
+        [
+            query, user_id, limit,
+            f'StartSel={_MARK_START}, StopSel={_MARK_END}, MaxWords={SNIPPET_WORDS}, MinWords=5',
+        ]
+    )
+    return cursor.fetchall()
+
+
+def _search_sqlite(cursor, user_id, query, limit):
+    match = _fts5_query(query)
+    if match is None:
+        return []
+
+    cursor.execute(
+        f"""
+        SELECT m.id, m.conversation_id, m.timestamp, -bm25({FTS_TABLE}) AS rank,
+               snippet({FTS_TABLE}, 0, %s, %s, '…', %s)
+        FROM {FTS_TABLE}
+        JOIN {MESSAGE_TABLE} m ON m.id = {FTS_TABLE}.rowid
+        JOIN {CONVERSATION_TABLE} c ON c.id = m.conversation_id
+        WHERE {FTS_TABLE} MATCH %s AND c.user_id = %s AND c.deleted_at IS NULL
+        ORDER BY bm25({FTS_TABLE})
+        LIMIT %s
+        """,
+        [_MARK_START, _MARK_END, SNIPPET_WORDS, match, user_id, limit]
+    )
+    return cursor.fetchall()
+
+
+def _search_fallback(user_id, query, limit):
+    """Unindexed substring scan for backends without a native index"""
+    messages = Message.objects.filter(
+        conversation__user_id=user_id,
+        conversation__deleted_at__isnull=True,
+        content__icontains=query
+    ).order_by('-timestamp').values_list('id', 'conversation_id', 'timestamp', 'content')[:limit]
+
+    return [
+        (message_id, conversation_id, timestamp, 0.0, content[:100])
+        for message_id, conversation_id, timestamp, content in messages
+    ]
+
+
+def _render_snippet(snippet):
+    """HTML-escaped snippet with the match markers turned into SNIPPET_START/SNIPPET_END"""
+    return (
+        html.escape(snippet or '')
+        .replace(_MARK_START, SNIPPET_START)
+        .replace(_MARK_END, SNIPPET_END)
+    )
+
+
+def search_messages(user, query, limit=50, using=DEFAULT_DB_ALIAS):
+    """
+    Ranked message hits for a user's conversations.
+    Returns dicts with message_id, conversation_id, timestamp, rank and a
+    highlighted snippet (HTML: escaped content, matches in <mark>), best
+    match first.
+    """
+    connection = connections[using]
+
+    if _has_native_index(connection):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                rows = _search_postgres(cursor, user.id, query, limit)
+            else:
+                rows = _search_sqlite(cursor, user.id, query, limit)
+    else:
+        rows = _search_fallback(user.id, query, limit)
+
+    timestamp_field = Message._meta.get_field('timestamp')
+    converters = connection.ops.get_db_converters(timestamp_field.get_col(Message._meta.db_table))
+
+    hits = []
+    for message_id, conversation_id, timestamp, rank, snippet in rows:
+        for converter in converters:
+            timestamp = converter(timestamp, timestamp_field, connection)
+        hits.append({
+            'message_id': message_id,
+            'conversation_id': conversation_id,
+            'timestamp': timestamp,
+            'rank': float(rank or 0.0),
+            'snippet': _render_snippet(snippet),
+        })
+    return hits
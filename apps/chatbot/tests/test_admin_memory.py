@@ -0,0 +1,40 @@
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.utils import memory
+
+
+class AdminMemoryTracingTests(TestCase):
+    def setUp(self):
+        staff = User.objects.create_user('ops', 'ops@example.com', 'pw', is_staff=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(staff).access_token}')
+        self.addCleanup(memory.stop_tracing)
+
+    def set_tracing(self, value, format='json'):
+        return self.client.post('/api/chatbot/admin/memory/', {'tracing': value, 'frames': 1}, format=format)
+
+    def test_string_false_stops_tracing(self):
+        self.assertTrue(self.set_tracing(True).data['tracing'])
+
+        for value in ('false', 'False', '0', 'off'):
+            memory.start_tracing(1)
+            response = self.set_tracing(value, format='multipart')
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(tracemalloc.is_tracing(), value)
+
+    def test_json_and_form_true_start_tracing(self):
+        for value, format in ((True, 'json'), ('true', 'multipart'), ('1', 'multipart')):
+            memory.stop_tracing()
+            self.assertEqual(self.set_tracing(value, format=format).status_code, 200)
+            self.assertTrue(tracemalloc.is_tracing(), value)
+
+    def test_unrecognised_value_is_rejected(self):
+        for value in ('maybe', ['true']):
+            self.assertEqual(self.set_tracing(value).status_code, 400)
+        self.assertEqual(self.client.post('/api/chatbot/admin/memory/', {}, format='json').status_code, 400)
+        self.assertFalse(tracemalloc.is_tracing())
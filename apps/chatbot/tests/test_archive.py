@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.analytics import exports, latency, rollups
+from apps.analytics.models import ChatAnalytics
+from apps.chatbot.models import Conversation, Message
+from apps.chatbot.services.archive_service import archive_conversation, read_archived_messages
+from apps.chatbot.services.search_service import search_messages
+from apps.users.models import UserProfile
+from apps.users.services import stats_service
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings_override = override_settings(ARCHIVE_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.sent_at = timezone.now() - timedelta(days=100)
+        self.conversation = Conversation.objects.create(user=self.user, title='Old')
+        Message.objects.create(
+            conversation=self.conversation, message_type='user',
+            content='where is my parcel', timestamp=self.sent_at,
+        )
+        Message.objects.create(
+            conversation=self.conversation, message_type='bot', content='It ships today',
+            intent='shipping', confidence=0.9, timestamp=self.sent_at + timedelta(seconds=1),
+            metadata=latency.turn_metadata({'total': 12.5}, 'ml'),
+        )
+        Conversation.objects.filter(id=self.conversation.id).update(
+            message_count=2, created_at=self.sent_at, updated_at=self.sent_at + timedelta(seconds=1)
+        )
+        self.idle_before = timezone.now() - timedelta(days=90)
+
+    def archive(self):
+        rollups.run_rollups(lag_seconds=0)
+        self.assertEqual(archive_conversation(self.conversation.id, self.idle_before), 2)
+        self.assertFalse(Message.objects.exists())
+
+    def test_waits_until_messages_are_rolled_up(self):
+        self.assertIsNone(archive_conversation(self.conversation.id, self.idle_before))
+        self.assertEqual(Message.objects.count(), 2)
+
+        self.archive()
+
+        messages = read_archived_messages(Conversation.objects.get(id=self.conversation.id))
+        self.assertEqual([message['content'] for message in messages], ['where is my parcel', 'It ships today'])
+
+    def test_rollups_keep_archived_history(self):
+        self.archive()
+
+        self.assertEqual(rollups.overall_totals(), {'messages': 2, 'conversations': 1})
+        day = ChatAnalytics.objects.get(date=timezone.localdate(self.sent_at))
+        self.assertEqual((day.total_messages, day.active_users), (2, 1))
+
+    def test_refolding_an_archived_day_keeps_archived_activity(self):
+        self.archive()
+        other = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        imported = Conversation.objects.create(user=other, title='Imported')
+        Message.objects.create(conversation=imported, content='hello', timestamp=self.sent_at)
+
+        rollups.run_rollups(lag_seconds=0)
+
+        day = ChatAnalytics.objects.get(date=timezone.localdate(self.sent_at))
+        self.assertEqual((day.total_messages, day.active_users), (3, 2))
+        self.assertEqual(day.avg_messages_per_conversation, 1.5)
+
+    def test_message_export_includes_archived_messages(self):
+        self.archive()
+
+        rows = list(exports.iter_rows('messages', user_id=self.user.id))
+
+        self.assertEqual([row[5] for row in rows], ['where is my parcel', 'It ships today'])
+        self.assertEqual({(row[1], row[3]) for row in rows}, {(self.conversation.id, 'alice')})
+
+    def test_export_date_range_filters_archived_messages(self):
+        self.archive()
+        day = timezone.localdate(self.sent_at)
+
+        self.assertEqual(len(list(exports.iter_rows('messages', start=day, end=day))), 2)
+        self.assertEqual(list(exports.iter_rows('messages', start=day + timedelta(days=1))), [])
+
+    def test_latency_window_includes_archived_turns(self):
+        self.archive()
+
+        turns, stages = latency.window_percentiles(self.sent_at - timedelta(hours=1), timezone.now())
+
+        self.assertEqual(turns, 1)
+        self.assertEqual(stages['total']['ml']['count'], 1)
+
+    def test_user_stats_rebuild_counts_archived_messages(self):
+        self.archive()
+
+        stats_service.rebuild([self.user.id])
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.total_messages, profile.total_conversations), (2, 1))
+
+    def test_archived_messages_are_not_searchable(self):
+        self.assertEqual(len(search_messages(self.user, 'parcel')), 1)
+
+        self.archive()
+
+        self.assertEqual(search_messages(self.user, 'parcel'), [])
@@ -0,0 +1,219 @@
+import shutil
+import sys
+import tempfile
+import types
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.analytics import rollups
+from apps.chatbot.models import Conversation, Message
+from apps.chatbot.services.archive_service import archive_conversation
+from apps.chatbot.services.chatbot_service import ChatbotService
+from apps.users.models import UserProfile
+from core.utils.testing import assert_view_query_budget
+from ml_models.chatbot_engine import ChatbotEngine
+
+
+class FakeGemini:
+    """Stands in for ml_models.gemini_engine.GeminiEngine: echoes, or fails on 'ask fail'"""
+    calls = []
+
+    def is_available(self):
+        return True
+
+    def chat(self, message, conversation_history=None):
+        self.calls.append((message, conversation_history))
+        if message == 'ask fail':
+            return {'response': 'Gemini is down', 'intent': 'error', 'confidence': 0.0, 'error_type': 'error'}
+        if message == 'ask crash':
+            raise RuntimeError('connection reset')
+        return {'response': f'AI: {message}', 'intent': 'ai_response', 'confidence': 0.95}
+
+
+@override_settings(ACTIVITY_ASYNC=False)
+@mock.patch.object(ChatbotService, 'needs_ai', staticmethod(lambda user_message, ml_result: user_message.startswith('ask')))
+@mock.patch.object(ChatbotEngine, 'preprocess_text', lambda self, text: text.lower())
+@mock.patch.dict(sys.modules, {'ml_models.gemini_engine': types.SimpleNamespace(GeminiEngine=FakeGemini)})
+class ChatBatchTests(TestCase):
+    def setUp(self):
+        FakeGemini.calls = []
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, *messages):
+        response = self.client.post('/api/chatbot/chat/batch/', {'messages': list(messages)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_results_follow_item_order(self):
+        data = self.post(
+            {'message': 'hello'}, {'message': 'ask about refunds'}, {'message': 'thanks'}, {'message': 'bye'},
+        )
+
+        self.assertEqual([result['index'] for result in data['results']], [0, 1, 2, 3])
+        self.assertEqual(
+            [result['user_message']['content'] for result in data['results']],
+            ['hello', 'ask about refunds', 'thanks', 'bye'],
+        )
+        self.assertEqual(data['results'][1]['bot_message']['content'], 'AI: ask about refunds')
+        # One shared conversation, read back as user/bot pairs in item order
+        [conversation] = Conversation.objects.all()
+        self.assertEqual(
+            list(conversation.messages.order_by('timestamp').values_list('message_type', 'content'))[::2],
+            [('user', 'hello'), ('user', 'ask about refunds'), ('user', 'thanks'), ('user', 'bye')],
+        )
+
+    def test_timestamps_strictly_increase(self):
+        before = timezone.now()
+        self.post({'message': 'hello'}, {'message': 'thanks'})
+
+        timestamps = list(Message.objects.order_by('id').values_list('timestamp', flat=True))
+        self.assertEqual(timestamps, sorted(set(timestamps)))
+        self.assertGreaterEqual(timestamps[0], before)
+        self.assertGreaterEqual(Conversation.objects.get().updated_at, timestamps[-1])
+
+    def test_groups_get_their_own_conversations(self):
+        existing = Conversation.objects.create(user=self.user, title='Existing')
+        data = self.post(
+            {'message': 'hello', 'group': 'ticket-1'},
+            {'message': 'hi', 'group': 'ticket-2'},
+            {'message': 'thanks', 'group': 'ticket-1'},
+            {'message': 'where is my order', 'conversation_id': existing.id},
+            {'message': 'bye'},
+            {'message': 'again'},
+        )
+
+        ids = [result['conversation_id'] for result in data['results']]
+        self.assertEqual(ids[0], ids[2])
+        self.assertEqual(ids[3], existing.id)
+        self.assertEqual(ids[4], ids[5])
+        self.assertEqual(len({ids[0], ids[1], ids[3], ids[4]}), 4)
+        self.assertEqual(Conversation.objects.get(id=ids[0]).title, 'Batch - ticket-1')
+        self.assertTrue(Conversation.objects.get(id=ids[4]).title.startswith('Batch - 20'))
+
+    def test_failed_items_do_not_stop_the_batch(self):
+        other = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        foreign = Conversation.objects.create(user=other, title='Not yours')
+
+        data = self.post(
+            {'message': 'hello'},
+            {'message': 'hi', 'conversation_id': foreign.id},
+            {'message': 'hi', 'conversation_id': 999999},
+            {'message': 'ask fail', 'group': 'doomed'},
+            {'message': 'thanks'},
+        )
+
+        self.assertEqual((data['processed'], data['failed'], data['success']), (2, 3, False))
+        errors = {result['index']: result.get('error') for result in data['results'] if not result['success']}
+        self.assertEqual(errors, {1: 'Conversation not found', 2: 'Conversation not found', 3: 'Gemini is down'})
+        self.assertFalse(Message.objects.filter(conversation=foreign).exists())
+        # The group whose only message failed gets no conversation
+        self.assertFalse(Conversation.objects.filter(title='Batch - doomed').exists())
+        self.assertEqual(Conversation.objects.filter(user=self.user).count(), 1)
+
+    def test_exception_during_ai_calls_leaves_no_empty_conversations(self):
+        with self.assertRaises(RuntimeError):
+            ChatbotService().process_batch([
+                {'message': 'hello', 'group': 'a'}, {'message': 'ask crash', 'group': 'b'},
+            ], self.user)
+
+        self.assertFalse(Conversation.objects.exists())
+
+    def test_counters_and_user_stats(self):
+        busy = Conversation.objects.create(user=self.user, title='Busy', message_count=4)
+        empty = Conversation.objects.create(user=self.user, title='Empty')
+        UserProfile.objects.filter(user=self.user).update(total_messages=4, total_conversations=1)
+
+        data = self.post(
+            {'message': 'hello', 'conversation_id': busy.id},
+            {'message': 'thanks', 'conversation_id': busy.id},
+            {'message': 'hi', 'conversation_id': empty.id},
+            {'message': 'bye', 'group': 'new'},
+        )
+
+        new = Conversation.objects.get(id=data['results'][3]['conversation_id'])
+        busy.refresh_from_db()
+        empty.refresh_from_db()
+        self.assertEqual((busy.message_count, empty.message_count, new.message_count), (8, 2, 2))
+        profile = UserProfile.objects.get(user=self.user)
+        # 8 new messages; the empty and the new conversation were started by this batch
+        self.assertEqual((profile.total_messages, profile.total_conversations), (12, 3))
+        self.assertIsNotNone(profile.last_message_at)
+
+    def test_ai_items_get_each_conversations_recent_history(self):
+        conversation = Conversation.objects.create(user=self.user, title='Long', message_count=12)
+        sent_at = timezone.now() - timedelta(hours=1)
+        for number in range(12):
+            Message.objects.create(
+                conversation=conversation, message_type='user' if number % 2 == 0 else 'bot',
+                content=f'message {number}', timestamp=sent_at + timedelta(seconds=number),
+            )
+        other = Conversation.objects.create(user=self.user, title='Short', message_count=1)
+        Message.objects.create(conversation=other, message_type='user', content='only one')
+
+        self.post(
+            {'message': 'ask long', 'conversation_id': conversation.id},
+            {'message': 'ask short', 'conversation_id': other.id},
+            {'message': 'ask new'},
+        )
+
+        history = dict(FakeGemini.calls)
+        self.assertEqual([turn['content'] for turn in history['ask long']], [f'message {n}' for n in range(2, 12)])
+        self.assertEqual(history['ask long'][0]['role'], 'user')
+        self.assertEqual(history['ask long'][1]['role'], 'assistant')
+        self.assertEqual(history['ask short'], [{'role': 'user', 'content': 'only one'}])
+        self.assertIsNone(history['ask new'])
+
+    def test_archived_conversations_are_restored(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        sent_at = timezone.now() - timedelta(days=100)
+        archived = []
+        with override_settings(ARCHIVE_ROOT=root):
+            for title in ('First', 'Second'):
+                conversation = Conversation.objects.create(user=self.user, title=title)
+                Message.objects.create(conversation=conversation, message_type='user',
+                                       content=f'{title} question', timestamp=sent_at)
+                Conversation.objects.filter(id=conversation.id).update(
+                    message_count=1, created_at=sent_at, updated_at=sent_at
+                )
+                archived.append(conversation)
+            rollups.run_rollups(lag_seconds=0)
+            for conversation in archived:
+                archive_conversation(conversation.id, timezone.now() - timedelta(days=90))
+
+            self.post(*[{'message': 'hello', 'conversation_id': conversation.id} for conversation in archived])
+
+        for conversation in archived:
+            conversation.refresh_from_db()
+            self.assertFalse(conversation.is_archived)
+            self.assertEqual(conversation.message_count, 3)
+            self.assertEqual(
+                list(conversation.messages.order_by('timestamp').values_list('content', flat=True))[:2],
+                [f'{conversation.title} question', 'hello'],
+            )
+
+    def test_query_count_does_not_grow_with_conversations(self):
+        conversations = Conversation.objects.bulk_create([
+            Conversation(user=self.user, title=f'Chat {number}', message_count=2) for number in range(40)
+        ])
+        Message.objects.bulk_create([
+            Message(conversation=conversation, message_type='user', content='earlier')
+            for conversation in conversations
+        ])
+
+        assert_view_query_budget(self.client, 'post', '/api/chatbot/chat/batch/', {'messages': [
+            {'message': 'ask again', 'conversation_id': conversation.id} for conversation in conversations
+        ] + [{'message': 'hello', 'group': f'new-{number}'} for number in range(10)]}, format='json')
+
+        self.assertEqual(Message.objects.count(), 40 + 100)
+        self.assertEqual(
+            set(Conversation.objects.filter(id__in=[c.id for c in conversations]).values_list('message_count', flat=True)),
+            {4},
+        )
@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.analytics import latency
+from apps.chatbot.models import Message
+from apps.chatbot.services.chatbot_service import ChatbotService
+from ml_models.chatbot_engine import ChatbotEngine
+
+
+@override_settings(ACTIVITY_ASYNC=False)
+@mock.patch.object(ChatbotService, 'needs_ai', staticmethod(lambda user_message, ml_result: False))
+@mock.patch.object(ChatbotEngine, 'preprocess_text', lambda self, text: text.lower())
+class TurnTimingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.started = timezone.now()
+
+    def stored_stages(self):
+        return [set(m.metadata['timings_ms']) for m in Message.objects.filter(message_type='bot')]
+
+    def test_single_turn_stores_insert_and_total(self):
+        self.assertEqual(self.client.post('/api/chatbot/chat/', {'message': 'hello'}, format='json').status_code, 200)
+
+        [stages] = self.stored_stages()
+        self.assertTrue({'bot_message_insert', 'total'} <= stages)
+
+        turns, percentiles = latency.window_percentiles(self.started, timezone.now())
+        self.assertEqual(turns, 1)
+        self.assertIn('bot_message_insert', percentiles)
+        self.assertIn('total', percentiles)
+
+    def test_batch_turns_store_insert_and_total(self):
+        response = self.client.post(
+            '/api/chatbot/chat/batch/', {'messages': [{'message': 'hello'}, {'message': 'thanks'}]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        stages = self.stored_stages()
+        self.assertEqual(len(stages), 2)
+        for turn in stages:
+            self.assertTrue({'message_insert', 'total'} <= turn)
@@ -0,0 +1,44 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.chatbot.models import Conversation
+
+
+class ConversationRevalidationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.older = Conversation.objects.create(user=self.user, title='Older', message_count=2)
+        self.latest = Conversation.objects.create(user=self.user, title='Latest', message_count=2)
+
+    def get(self, path, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(path, **headers)
+
+    def test_unchanged_list_is_not_modified(self):
+        first = self.get('/api/chatbot/conversations/')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('Last-Modified', first)
+        self.assertEqual(self.get('/api/chatbot/conversations/', first['ETag']).status_code, 304)
+
+    def test_deleting_the_latest_conversation_changes_the_list(self):
+        etag = self.get('/api/chatbot/conversations/')['ETag']
+
+        Conversation.objects.filter(id=self.latest.id).update(deleted_at=timezone.now())
+
+        self.assertEqual(self.get('/api/chatbot/conversations/', etag).status_code, 200)
+
+    def test_turn_within_the_same_second_changes_the_detail(self):
+        path = f'/api/chatbot/conversations/{self.latest.id}/'
+        etag = self.get(path)['ETag']
+
+        updated_at = self.latest.updated_at
+        Conversation.objects.filter(id=self.latest.id).update(
+            updated_at=updated_at.replace(microsecond=(updated_at.microsecond + 1) % 10**6)
+        )
+
+        self.assertEqual(self.get(path, etag).status_code, 200)
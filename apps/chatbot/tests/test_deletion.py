@@ -0,0 +1,186 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.analytics import rollups
+from apps.analytics.models import MessageFeedback, UserActivity
+from apps.chatbot.models import ChatbotFeedback, Conversation, DeletionJob, Message
+from apps.chatbot.services import deletion_service
+from apps.chatbot.services.archive_service import (
+    ArchiveError, SegmentStore, archive_conversation, compact_segments, read_archived_messages,
+)
+from apps.chatbot.services.deletion_service import (
+    request_conversation_deletion, request_user_deletion, run_deletion_job,
+)
+
+
+@override_settings(DELETION_ASYNC=False)
+class DeletionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.conversation = self.make_conversation('Order', turns=3)
+
+    def make_conversation(self, title, turns, user=None, sent_at=None):
+        conversation = Conversation.objects.create(user=user or self.user, title=title)
+        for turn in range(turns):
+            Message.objects.create(conversation=conversation, message_type='user', content='where is my order',
+                                   timestamp=sent_at or timezone.now())
+            bot = Message.objects.create(conversation=conversation, message_type='bot', content='It ships today',
+                                         timestamp=sent_at or timezone.now())
+            MessageFeedback.objects.create(message=bot, user=conversation.user, feedback_type='positive')
+        ChatbotFeedback.objects.create(message=bot, rating=5)
+        Conversation.objects.filter(id=conversation.id).update(message_count=turns * 2)
+        return conversation
+
+    def test_soft_delete_hides_conversation_until_purged(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = client.delete(f'/api/chatbot/conversations/{self.conversation.id}/')
+        self.assertIn(response.status_code, (200, 202, 204))
+
+        # Hidden at once, rows still there until the job runs
+        self.assertFalse(Conversation.objects.filter(id=self.conversation.id).exists())
+        self.assertEqual(client.get('/api/chatbot/conversations/').data, [])
+        self.assertEqual(client.get(f'/api/chatbot/conversations/{self.conversation.id}/').status_code, 404)
+        self.assertEqual(Message.objects.filter(conversation_id=self.conversation.id).count(), 6)
+        job = DeletionJob.objects.get(target_type='conversation', target_id=self.conversation.id)
+        self.assertEqual(job.status, 'pending')
+
+        for callback in callbacks:
+            callback()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertFalse(Conversation.all_objects.filter(id=self.conversation.id).exists())
+
+    def test_purge_runs_in_batches_and_counts_rows(self):
+        job = request_conversation_deletion(self.conversation)
+
+        with mock.patch.object(deletion_service, '_delete_batch', wraps=deletion_service._delete_batch) as batches:
+            job = run_deletion_job(job.id, batch_size=2)
+
+        self.assertEqual(job.status, 'done')
+        self.assertIsNotNone(job.finished_at)
+        # 6 messages, 3 user feedback rows, 1 rating, the conversation row
+        self.assertEqual(job.rows_deleted, 11)
+        self.assertTrue(all(call.args[3] == 2 for call in batches.call_args_list))
+        # 2 + 2 + 2 + a final empty pass over the three tables
+        self.assertEqual(batches.call_count, 12)
+        self.assertFalse(Message.objects.filter(conversation_id=self.conversation.id).exists())
+        self.assertFalse(MessageFeedback.objects.exists())
+        self.assertFalse(ChatbotFeedback.objects.exists())
+
+    def test_job_runs_once(self):
+        job = request_conversation_deletion(self.conversation)
+
+        self.assertEqual(run_deletion_job(job.id).status, 'done')
+        self.assertIsNone(run_deletion_job(job.id))
+
+    def test_failed_job_records_error(self):
+        job = request_conversation_deletion(self.conversation)
+
+        with mock.patch.object(deletion_service, '_purge_conversation', side_effect=RuntimeError('disk full')), \
+                self.assertLogs(deletion_service.logger, 'ERROR'):
+            job = run_deletion_job(job.id)
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error, 'disk full')
+        self.assertIsNotNone(job.finished_at)
+        self.assertTrue(Conversation.all_objects.filter(id=self.conversation.id).exists())
+
+    def test_user_purge_removes_everything_they_own(self):
+        self.make_conversation('Refund', turns=1)
+        UserActivity.objects.create(user=self.user, activity_type='login')
+        other = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        kept = self.make_conversation('Bob', turns=1, user=other)
+
+        job = request_user_deletion(self.user)
+        self.assertFalse(User.objects.get(id=self.user.id).is_active)
+        job = run_deletion_job(job.id, batch_size=3)
+
+        self.assertEqual(job.status, 'done')
+        self.assertFalse(User.objects.filter(id=self.user.id).exists())
+        self.assertFalse(Conversation.all_objects.filter(user_id=self.user.id).exists())
+        self.assertFalse(UserActivity.objects.filter(user_id=self.user.id).exists())
+        self.assertEqual(Message.objects.filter(conversation=kept).count(), 2)
+        self.assertEqual(MessageFeedback.objects.filter(user=other).count(), 1)
+
+
+@override_settings(DELETION_ASYNC=False)
+class ArchivedDeletionTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings_override = override_settings(ARCHIVE_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.idle_before = timezone.now() - timedelta(days=90)
+
+    def archived(self, title, store):
+        sent_at = timezone.now() - timedelta(days=100)
+        conversation = Conversation.objects.create(user=self.user, title=title)
+        Message.objects.create(conversation=conversation, message_type='user',
+                               content=f'{title} secret', timestamp=sent_at)
+        Conversation.objects.filter(id=conversation.id).update(
+            message_count=1, created_at=sent_at, updated_at=sent_at
+        )
+        rollups.run_rollups(lag_seconds=0)
+        self.assertEqual(archive_conversation(conversation.id, self.idle_before, store=store), 1)
+        return Conversation.objects.get(id=conversation.id)
+
+    def segment_bytes(self, name):
+        with open(SegmentStore().root / name, 'rb') as f:
+            return f.read()
+
+    def test_purge_erases_archived_frame(self):
+        store = SegmentStore()
+        doomed = self.archived('doomed', store)
+        kept = self.archived('kept', store)
+        frame = self.segment_bytes(doomed.archive_segment)[doomed.archive_offset:][:doomed.archive_length]
+        self.assertTrue(frame.strip(b'\0'))
+
+        run_deletion_job(request_conversation_deletion(doomed).id)
+
+        segment = self.segment_bytes(doomed.archive_segment)
+        self.assertEqual(segment[doomed.archive_offset:][:doomed.archive_length], b'\0' * doomed.archive_length)
+        self.assertEqual(read_archived_messages(kept)[0]['content'], 'kept secret')
+        with self.assertRaisesMessage(ArchiveError, 'erased'):
+            store.read(doomed.archive_segment, doomed.archive_offset, doomed.archive_length)
+
+    def test_compaction_drops_dead_frames(self):
+        doomed = self.archived('doomed', SegmentStore())
+        kept = self.archived('kept', SegmentStore())
+        sealed = kept.archive_segment
+        # Tiny segments: the next archive starts a new one and seals the first
+        latest = self.archived('latest', SegmentStore(max_bytes=1))
+        self.assertNotEqual(latest.archive_segment, sealed)
+        run_deletion_job(request_conversation_deletion(doomed).id)
+
+        self.assertEqual(compact_segments(min_dead_ratio=0.99), (0, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            compacted, reclaimed = compact_segments(min_dead_ratio=0.1)
+
+        self.assertEqual((compacted, reclaimed), (1, doomed.archive_length))
+        kept.refresh_from_db()
+        self.assertNotIn(kept.archive_segment, (sealed, latest.archive_segment))
+        self.assertEqual(kept.archive_offset, 0)
+        self.assertEqual(read_archived_messages(kept)[0]['content'], 'kept secret')
+        self.assertEqual(read_archived_messages(latest)[0]['content'], 'latest secret')
+        root = SegmentStore().root
+        self.assertFalse((root / sealed).exists())
+        self.assertTrue((root / f'{sealed}.retired').exists())
+
+        # The next run removes retired segments
+        compact_segments()
+        self.assertFalse((root / f'{sealed}.retired').exists())
@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.chatbot.models import IdempotencyKey
+from apps.chatbot.services import idempotency_service
+
+
+class IdempotencyServiceTests(TestCase):
+    def setUp(self):
+        self.fingerprint = idempotency_service.request_fingerprint({'message': 'hi'})
+
+    def test_first_request_claims_the_key(self):
+        record, replay = idempotency_service.begin('user:1', 'k1', self.fingerprint)
+
+        self.assertFalse(replay)
+        self.assertEqual(record.status, 'processing')
+
+    def test_duplicate_of_in_flight_request_is_rejected_without_waiting(self):
+        idempotency_service.begin('user:1', 'k1', self.fingerprint)
+
+        with self.assertRaises(idempotency_service.IdempotencyInProgress):
+            idempotency_service.begin('user:1', 'k1', self.fingerprint)
+
+    def test_completed_request_is_replayed(self):
+        record, _ = idempotency_service.begin('user:1', 'k1', self.fingerprint)
+        idempotency_service.complete(record, 200, {'response': 'hello'})
+
+        replayed, replay = idempotency_service.begin('user:1', 'k1', self.fingerprint)
+
+        self.assertTrue(replay)
+        self.assertEqual((replayed.response_status, replayed.response_body), (200, {'response': 'hello'}))
+
+    def test_key_reused_with_other_payload_is_rejected(self):
+        idempotency_service.begin('user:1', 'k1', self.fingerprint)
+
+        with self.assertRaises(idempotency_service.IdempotencyKeyReused):
+            idempotency_service.begin('user:1', 'k1', idempotency_service.request_fingerprint({'message': 'bye'}))
+
+    def test_keys_are_scoped_per_owner(self):
+        idempotency_service.begin('user:1', 'k1', self.fingerprint)
+
+        _, replay = idempotency_service.begin('user:2', 'k1', self.fingerprint)
+
+        self.assertFalse(replay)
+
+
+class ChatIdempotencyViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.client = APIClient()
+
+    def test_anonymous_requests_cannot_use_keys(self):
+        response = self.client.post(
+            '/api/chatbot/chat/', {'message': 'hi'}, format='json', HTTP_IDEMPOTENCY_KEY='k1'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_in_flight_duplicate_gets_409_with_retry_after(self):
+        self.client.force_authenticate(self.user)
+        idempotency_service.begin(
+            f'user:{self.user.id}', 'k1', idempotency_service.request_fingerprint({'message': 'hi'})
+        )
+
+        response = self.client.post(
+            '/api/chatbot/chat/', {'message': 'hi'}, format='json', HTTP_IDEMPOTENCY_KEY='k1'
+        )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], str(idempotency_service.RETRY_AFTER_SECONDS))
@@ -0,0 +1,105 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.chatbot.models import Conversation, Message
+from apps.users.models import UserProfile
+
+
+def line(key, content, **fields):
+    return json.dumps({'conversation_id': key, 'content': content, **fields})
+
+
+class ImportTranscriptsTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+
+    def write(self, name, lines):
+        path = os.path.join(self.directory, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        return path
+
+    def run_import(self, *paths, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_transcripts', *paths, stdout=out, stderr=err, no_copy=True, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_batches_group_lines_into_conversations(self):
+        lines = [
+            line('a', f'message {number}', username='alice', message_type='user' if number % 2 == 0 else 'bot',
+                 timestamp=f'2025-01-01T10:00:0{number}Z')
+            for number in range(5)
+        ] + [line('b', 'other chat', username='alice', timestamp='2025-01-02T09:00:00Z')]
+
+        out, _ = self.run_import(self.write('dump.jsonl', lines), batch_size=2)
+
+        self.assertIn('Imported 6 messages into 2 conversations', out)
+        first = Conversation.objects.get(title='Imported chat a')
+        self.assertEqual(first.message_count, 5)
+        self.assertEqual(first.created_at.isoformat(), '2025-01-01T10:00:00+00:00')
+        self.assertEqual(first.updated_at.isoformat(), '2025-01-01T10:00:04+00:00')
+        self.assertEqual(
+            list(first.messages.order_by('timestamp').values_list('content', flat=True)),
+            [f'message {number}' for number in range(5)],
+        )
+        profile = UserProfile.objects.get(user=self.alice)
+        self.assertEqual((profile.total_messages, profile.total_conversations), (6, 2))
+
+    def test_reads_gzipped_files(self):
+        self.run_import(self.write('dump.jsonl.gz', [line('a', 'hello', username='alice')]))
+
+        self.assertEqual(Message.objects.get().content, 'hello')
+
+    def test_malformed_lines_are_skipped(self):
+        lines = [
+            'not json',
+            json.dumps({'content': 'no conversation id'}),
+            line('a', 'bad confidence', confidence='high'),
+            line('a', 'bad timestamp', timestamp='yesterday'),
+            line('a', 'numeric timestamp', timestamp=1700000000),
+            line('a', 'bad type', message_type='assistant-reply'),
+            line('a', {'not': 'text'}),
+            line('a', 'kept', username='alice'),
+        ]
+
+        out, err = self.run_import(self.write('dump.jsonl', lines))
+
+        self.assertIn('skipped 7 lines', out)
+        self.assertEqual(err.count('skipped'), 7)
+        self.assertEqual(list(Message.objects.values_list('content', flat=True)), ['kept'])
+
+    def test_owner_resolution(self):
+        User.objects.create_user('bob', 'bob@example.com', 'pw')
+        path = self.write('dump.jsonl', [
+            line('a', 'from alice', username='alice'),
+            line('b', 'from bob', username='bob'),
+            line('c', 'from a stranger', username='mallory'),
+            line('d', 'no owner'),
+        ])
+
+        out, err = self.run_import(path)
+
+        self.assertIn("Unknown user 'mallory'", err)
+        self.assertIn('skipped 1 lines', out)
+        owners = dict(Conversation.objects.values_list('title', 'user__username'))
+        self.assertEqual(owners, {
+            'Imported chat a': 'alice', 'Imported chat b': 'bob', 'Imported chat d': None,
+        })
+
+    def test_user_option_assigns_every_conversation(self):
+        path = self.write('dump.jsonl', [line('a', 'one', username='mallory'), line('b', 'two')])
+
+        self.run_import(path, user='alice')
+
+        self.assertEqual(set(Conversation.objects.values_list('user__username', flat=True)), {'alice'})
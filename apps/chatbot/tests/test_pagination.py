@@ -0,0 +1,96 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.chatbot.api.pagination import MessagePagination
+from apps.chatbot.models import Conversation, Message
+
+
+def cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.conversation = Conversation.objects.create(user=cls.user, title='Long')
+        start = timezone.now() - timedelta(hours=1)
+        # Pairs share a timestamp, so only the id keeps their order stable
+        cls.messages = [
+            Message.objects.create(
+                conversation=cls.conversation, content=f'message {number}',
+                timestamp=start + timedelta(seconds=number // 2),
+            )
+            for number in range(7)
+        ]
+        cls.path = f'/api/chatbot/conversations/{cls.conversation.id}/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def page(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def contents(self, page):
+        return [message['content'] for message in page['messages']]
+
+    def test_pages_back_through_history_and_forward_again(self):
+        newest = self.page(self.path, limit=3)
+        self.assertEqual(self.contents(newest), ['message 4', 'message 5', 'message 6'])
+        self.assertIsNone(newest['previous'])
+
+        older = self.page(newest['next'])
+        self.assertEqual(self.contents(older), ['message 1', 'message 2', 'message 3'])
+
+        oldest = self.page(older['next'])
+        self.assertEqual(self.contents(oldest), ['message 0'])
+        self.assertIsNone(oldest['next'])
+
+        self.assertEqual(self.contents(self.page(oldest['previous'])), ['message 1', 'message 2', 'message 3'])
+        self.assertEqual(self.contents(self.page(older['previous'])), ['message 4', 'message 5', 'message 6'])
+
+    def test_equal_timestamps_split_across_pages_keep_every_row_once(self):
+        seen = []
+        url, params = self.path, {'limit': 1}
+        while url:
+            page = self.page(url, **params)
+            seen.extend(self.contents(page))
+            url, params = page['next'], {}
+
+        self.assertEqual(seen, [f'message {number}' for number in reversed(range(7))])
+
+    def test_limit_is_capped(self):
+        Message.objects.bulk_create([
+            Message(conversation=self.conversation, content='bulk') for _ in range(MessagePagination.max_page_size)
+        ])
+
+        page = self.page(self.path, limit=10 ** 6)
+
+        self.assertEqual(len(page['messages']), MessagePagination.max_page_size)
+        self.assertIsNotNone(page['next'])
+
+    def test_tampered_cursors_are_not_found(self):
+        now = timezone.now().isoformat()
+        for token in (
+            'not base64!',
+            cursor({'p': ['garbage', 1], 'r': 0}),
+            cursor({'p': [now, 'garbage'], 'r': 0}),
+            cursor({'p': [1, 1], 'r': 0}),
+            cursor({'p': [now, True], 'r': 0}),
+            cursor({'p': [now, 2 ** 70], 'r': 0}),
+            cursor({'p': [now], 'r': 0}),
+            cursor({'p': [now, 1], 'r': 'sideways'}),
+            cursor({'p': {'a': 1}}),
+            cursor([1, 2]),
+        ):
+            response = self.client.get(self.path, {'cursor': token})
+            self.assertEqual(response.status_code, 404, token)
@@ -0,0 +1,83 @@
+"""
+EXPLAIN the hot queries and fail if any of them falls back to a full table scan
+"""
+
+import re
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.analytics.utils import local_day_range
+from apps.chatbot.models import Conversation, Message
+
+
+def hot_queries():
+    """
+    (name, queryset) pairs mirroring the query shapes served in production.
+    Counted querysets drop their ordering here, as .count() does.
+    """
+    today_start, today_end = local_day_range(timezone.localdate())
+    now = timezone.now()
+
+    return [
+        ('conversation list page', Conversation.objects.filter(
+            user_id=1
+        ).order_by('-updated_at', '-id')[:51]),
+        ('message history page', Message.objects.filter(
+            conversation_id=1
+        ).order_by('-timestamp', '-id')[:101]),
+        ('active conversation lookup', Conversation.objects.filter(
+            user_id=1, is_active=True
+        ).order_by('-updated_at')[:1]),
+        ('messages today', Message.objects.filter(
+            timestamp__gte=today_start, timestamp__lt=today_end
+        ).order_by().values('id')),
+        ('top intents today', Message.objects.filter(
+            timestamp__gte=today_start, timestamp__lt=today_end, message_type='bot'
+        ).exclude(intent__isnull=True).order_by().values('intent').annotate(count=Count('id'))),
+        ('conversations created today', Conversation.objects.filter(
+            created_at__gte=today_start, created_at__lt=today_end
+        ).order_by().values('id')),
+        ('active users today', Conversation.objects.filter(
+            updated_at__gte=today_start, updated_at__lt=today_end
+        ).order_by().values('user').distinct()),
+        ('messages this week', Message.objects.filter(
+            timestamp__gte=now - timedelta(days=7)
+        ).order_by().values('conversation').annotate(count=Count('id'))),
+    ]
+
+
+def full_scans(plan, vendor):
+    """Tables the plan reads with a sequential/full scan"""
+    if vendor == 'postgresql':
+        return re.findall(r'Seq Scan on (\w+)', plan)
+    if vendor == 'sqlite':
+        # "SCAN t USING INDEX i" walks an index; a bare "SCAN t" reads the table
+        return [
+            match.group(1)
+            for match in re.finditer(r'\bSCAN (\w+)(?: AS \w+)?(.*)$', plan, re.MULTILINE)
+            if 'USING' not in match.group(2)
+        ]
+    return []
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_are_index_backed(self):
+        vendor = connection.vendor
+        if vendor not in ('postgresql', 'sqlite'):
+            self.skipTest(f'Plan checks are not implemented for {vendor}')
+
+        if vendor == 'postgresql':
+            # Small test tables make seq scans the cheapest plan; with them
+            # disabled, a Seq Scan can only mean there is no usable index
+            # (the test's transaction scopes the SET LOCAL)
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        for name, queryset in hot_queries():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertEqual(full_scans(plan, vendor), [], f'{name} needs a full scan:\n{plan}')
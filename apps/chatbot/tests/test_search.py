@@ -0,0 +1,47 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.chatbot.models import Conversation, Message
+from apps.chatbot.services.search_service import search_messages
+
+
+class SearchSnippetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        conversation = Conversation.objects.create(user=cls.user, title='Markup')
+        Message.objects.create(
+            conversation=conversation,
+            content='<img src=x onerror=alert(1)> please reset my password',
+        )
+
+    def test_snippet_escapes_content_and_marks_match(self):
+        hits = search_messages(self.user, 'password')
+
+        self.assertEqual(len(hits), 1)
+        snippet = hits[0]['snippet']
+        self.assertNotIn('<img', snippet)
+        self.assertIn('&lt;img src=x onerror=alert(1)&gt;', snippet)
+        self.assertIn('<mark>password</mark>', snippet)
+
+    def test_markup_in_query_is_not_reflected(self):
+        hits = search_messages(self.user, '<img')
+
+        for hit in hits:
+            self.assertNotIn('<img', hit['snippet'])
+
+    def test_other_users_messages_are_not_searched(self):
+        other = User.objects.create_user('bob', 'bob@example.com', 'pw')
+
+        self.assertEqual(search_messages(other, 'password'), [])
+
+    def test_soft_deleted_conversations_do_not_use_up_the_limit(self):
+        deleted = Conversation.objects.create(user=self.user, title='Deleted', deleted_at=timezone.now())
+        for _ in range(3):
+            Message.objects.create(conversation=deleted, content='reset my password again')
+
+        hits = search_messages(self.user, 'password', limit=2)
+
+        self.assertEqual(len(hits), 1)
+        self.assertNotEqual(hits[0]['conversation_id'], deleted.id)
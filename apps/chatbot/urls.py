@@ -1,6 +1,7 @@
 from django.urls import path
 from apps.chatbot.api.views.chat_views import (
     ChatAPIView,
+    ChatBatchAPIView,
     ConversationListAPIView,
     ConversationDetailAPIView,
     HealthCheckAPIView,
@@ -12,7 +13,13 @@ from apps.chatbot.api.views.admin_views import (
     admin_user_detail,
     admin_toggle_user_status,
     admin_delete_user,
-    admin_system_health
+    admin_deletion_status,
+    admin_system_health,
+    admin_profiles_list,
+    admin_profile_download,
+    admin_memory,
+    admin_memory_snapshots,
+    admin_memory_snapshot
 )
 
 app_name = 'chatbot'
@@ -23,6 +30,7 @@ urlpatterns = [
 
     # Chat endpoints
     path('chat/', ChatAPIView.as_view(), name='chat'),
+    path('chat/batch/', ChatBatchAPIView.as_view(), name='chat-batch'),
 
     # Conversation endpoints
     path('conversations/', ConversationListAPIView.as_view(), name='conversation-list'),
@@ -37,5 +45,11 @@ urlpatterns = [
     path('admin/users/<int:user_id>/', admin_user_detail, name='admin-user-detail'),
     path('admin/users/<int:user_id>/toggle/', admin_toggle_user_status, name='admin-toggle-user'),
     path('admin/users/<int:user_id>/delete/', admin_delete_user, name='admin-delete-user'),
+    path('admin/deletions/<int:job_id>/', admin_deletion_status, name='admin-deletion-status'),
     path('admin/health/', admin_system_health, name='admin-health'),
+    path('admin/profiles/', admin_profiles_list, name='admin-profiles'),
+    path('admin/profiles/<str:profile_id>/', admin_profile_download, name='admin-profile-download'),
+    path('admin/memory/', admin_memory, name='admin-memory'),
+    path('admin/memory/snapshots/', admin_memory_snapshots, name='admin-memory-snapshots'),
+    path('admin/memory/snapshots/<int:snapshot_id>/', admin_memory_snapshot, name='admin-memory-snapshot'),
 ]
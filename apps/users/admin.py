@@ -3,12 +3,26 @@ Users Admin Configuration
 """
 
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.contrib.auth.models import User
+from core.utils.counts import EstimatedCountPaginator
 from .models import UserProfile
 
 
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    # Large tables: no exact COUNT(*) per changelist page
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
-    list_display = ['user', 'phone_number', 'preferred_language', 'total_conversations', 'total_messages', 'created_at']
+    list_display = ['user', 'phone_number', 'preferred_language', 'total_conversations', 'total_messages', 'last_message_at', 'created_at']
     list_filter = ['preferred_language', 'theme', 'created_at']
     search_fields = ['user__username', 'user__email', 'phone_number']
-    readonly_fields = ['total_conversations', 'total_messages']
+    readonly_fields = ['total_conversations', 'total_messages', 'last_message_at']
+    list_select_related = ['user']
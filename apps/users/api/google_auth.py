@@ -5,8 +5,7 @@ from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from apps.users.api.serializers import UserSerializer
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+from apps.users.services import google_auth_service
 import sys
 
 
@@ -35,13 +34,8 @@ class GoogleLoginView(APIView):
         try:
             print("🔐 Verifying Google token...", file=sys.stderr)
 
-            # FIXED: Updated to new Client ID
-            idinfo = id_token.verify_oauth2_token(
-                credential,
-                google_requests.Request(),
-                '89771009227-e4ca190m73gj3nkb4qboeqovauno5koi.apps.googleusercontent.com'
-
-            )
+            # Cached certificates and verified tokens, shared HTTP session (GOOGLE_CLIENT_ID)
+            idinfo = google_auth_service.verify_credential(credential)
 
             # Get user info from token
             email = idinfo.get('email')
@@ -66,20 +60,7 @@ class GoogleLoginView(APIView):
             except User.DoesNotExist:
                 # Create new user
                 print(f"🆕 Creating new user for {email}", file=sys.stderr)
-                username = email.split('@')[0]
-                base_username = username
-                counter = 1
-
-                while User.objects.filter(username=username).exists():
-                    username = f"{base_username}{counter}"
-                    counter += 1
-
-                user = User.objects.create(
-                    username=username,
-                    email=email,
-                    first_name=first_name,
-                    last_name=last_name
-                )
+                user = google_auth_service.create_google_user(email, first_name, last_name)
                 print(f"✅ Created user: {user.username}", file=sys.stderr)
 
             # Generate JWT tokens
@@ -129,14 +129,12 @@ class GoogleLoginView(APIView):
 
         try:
             # Import here to catch import errors
-            from google.oauth2 import id_token
-            from google.auth.transport import requests as google_requests
+            from apps.users.services import google_auth_service
 
-            # Verify Google token
-            idinfo = id_token.verify_oauth2_token(
+            # Verify Google token (cached certificates and verified tokens)
+            idinfo = google_auth_service.verify_credential(
                 credential,
-                google_requests.Request(),
-                '329644175819-3f0cqiaqq4vnrrtuhcv7n2beh40t9t5v.apps.googleusercontent.com'
+                audience='329644175819-3f0cqiaqq4vnrrtuhcv7n2beh40t9t5v.apps.googleusercontent.com'
             )
 
             print(f"✅ Token verified! Email: {idinfo.get('email')}")
@@ -147,14 +145,10 @@ class GoogleLoginView(APIView):
             last_name = idinfo.get('family_name', '')
 
             # Check if user exists
-            user, created = User.objects.get_or_create(
-                email=email,
-                defaults={
-                    'username': email.split('@')[0],
-                    'first_name': first_name,
-                    'last_name': last_name,
-                }
-            )
+            user = User.objects.filter(email=email).first()
+            created = user is None
+            if created:
+                user = google_auth_service.create_google_user(email, first_name, last_name)
 
             print(f"{'🆕 Created' if created else '👤 Found'} user: {user.username}")
 
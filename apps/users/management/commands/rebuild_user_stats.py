@@ -0,0 +1,38 @@
+"""
+Recompute every user's message/conversation totals from the conversation
+counters. Run once after deploying the stats columns, and whenever the
+totals may have drifted (e.g. after a manual data fix):
+python manage.py rebuild_user_stats [--user alice]
+"""
+
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.services import stats_service
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user stats on UserProfile (totals and last activity)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', default=None,
+                            help='Only rebuild this username (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Users updated per statement')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['user']:
+            found = dict(User.objects.filter(username__in=options['user']).values_list('username', 'id'))
+            missing = sorted(set(options['user']) - set(found))
+            if missing:
+                raise CommandError(f'Unknown user(s): {", ".join(missing)}')
+            user_ids = list(found.values())
+
+        started = time.monotonic()
+        updated = stats_service.rebuild(user_ids=user_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stats for {updated} users in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,46 @@
+from django.db import migrations
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def rebuild_user_stats(apps, schema_editor):
+    # Backfills the counters 0002 added, computed like manage.py
+    # rebuild_user_stats but on the historical models, so later schema
+    # changes cannot break it
+    User = apps.get_model("auth", "User")
+    UserProfile = apps.get_model("users", "UserProfile")
+    Conversation = apps.get_model("chatbot", "Conversation")
+
+    def per_user(aggregate):
+        # Historical managers do not hide soft-deleted conversations
+        return Subquery(
+            Conversation.objects.filter(
+                user_id=OuterRef("user_id"), message_count__gt=0, deleted_at__isnull=True
+            )
+            .order_by()
+            .values("user_id")
+            .annotate(value=aggregate)
+            .values("value")[:1]
+        )
+
+    user_ids = list(User.objects.values_list("id", flat=True))
+    UserProfile.objects.bulk_create(
+        [UserProfile(user_id=user_id) for user_id in user_ids], ignore_conflicts=True
+    )
+    UserProfile.objects.update(
+        total_messages=Coalesce(per_user(Sum("message_count")), 0, output_field=IntegerField()),
+        total_conversations=Coalesce(per_user(Count("id")), 0, output_field=IntegerField()),
+        last_message_at=per_user(Max("updated_at")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_user_stats_indexes"),
+        ("chatbot", "0007_idempotency_keys"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_user_stats, migrations.RunPython.noop),
+    ]
@@ -31,9 +31,10 @@ class UserProfile(models.Model):
         default='light'
     )
 
-    # Stats
+    # Stats, kept in step by the chat write path (apps.users.services.stats_service)
     total_conversations = models.IntegerField(default=0)
     total_messages = models.IntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True, blank=True)
 
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -42,6 +43,11 @@ class UserProfile(models.Model):
     class Meta:
         verbose_name = 'User Profile'
         verbose_name_plural = 'User Profiles'
+        indexes = [
+            # Keyset pagination of the admin user list, sorted by a stat
+            models.Index(fields=['total_messages', 'user'], name='profile_messages_idx'),
+            models.Index(fields=['total_conversations', 'user'], name='profile_conversations_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
@@ -0,0 +1,196 @@
+"""
+Google Sign-In Service
+Verifies Google ID tokens (the `credential` from Google Identity Services)
+without per-login network setup, and picks usernames for new accounts.
+
+  * One google-auth transport (one requests.Session) is shared by every
+    verification, so certificate fetches reuse pooled connections.
+  * Google's signing certificates are cached in-process until the expiry
+    their Cache-Control: max-age announces, and refetched early only when a
+    token is signed with a key id the cache does not know (key rotation).
+  * Verified tokens are cached for GOOGLE_TOKEN_CACHE_SECONDS (never past
+    the token's own exp), so a client retrying a login does not pay again.
+
+Tests (or offline environments) swap the certificate source for a local key
+set with set_cert_source(lambda: ({'kid': '<PEM certificate>'}, 3600)).
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from google.auth import jwt
+from google.auth.transport import requests as google_requests
+
+logger = logging.getLogger(__name__)
+
+CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+DEFAULT_CERT_MAX_AGE = 300
+# Refetch for an unknown key id at most this often, so forged kids cannot hammer Google
+UNKNOWN_KID_REFETCH_SECONDS = 60
+CLOCK_SKEW_SECONDS = 10
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+_transport = None
+_transport_pid = None
+_transport_lock = threading.Lock()
+
+_cert_source = None
+_certs = None
+_certs_expire_at = 0.0
+_certs_fetched_at = 0.0
+_certs_lock = threading.Lock()
+
+_verified = None
+_verified_lock = threading.Lock()
+
+
+def get_transport():
+    """Shared google-auth transport (one pooled requests.Session)"""
+    global _transport, _transport_pid
+    # A forked worker must not share the parent's pooled sockets
+    if _transport is None or _transport_pid != os.getpid():
+        with _transport_lock:
+            if _transport is None or _transport_pid != os.getpid():
+                _transport = google_requests.Request()
+                _transport_pid = os.getpid()
+    return _transport
+
+
+def _fetch_google_certs():
+    """Google's {key id: PEM certificate} and how long they may be cached"""
+    response = get_transport()(CERTS_URL, method='GET', timeout=settings.GOOGLE_CERTS_TIMEOUT)
+    if response.status != 200:
+        raise ValueError(f'Could not fetch Google certificates (HTTP {response.status})')
+    match = _MAX_AGE.search(response.headers.get('cache-control', ''))
+    max_age = int(match.group(1)) if match else DEFAULT_CERT_MAX_AGE
+    return json.loads(response.data.decode('utf-8')), max_age
+
+
+def set_cert_source(source):
+    """
+    Replace where certificates come from: a callable returning
+    ({key id: PEM certificate}, max age in seconds), or None for Google.
+    Drops cached certificates and verified tokens.
+    """
+    global _cert_source, _certs, _certs_expire_at, _certs_fetched_at
+    with _certs_lock:
+        _cert_source = source
+        _certs, _certs_expire_at, _certs_fetched_at = None, 0.0, 0.0
+    clear_verified()
+
+
+def _refresh_certs():
+    global _certs, _certs_expire_at, _certs_fetched_at
+    certs, max_age = (_cert_source or _fetch_google_certs)()
+    now = time.monotonic()
+    _certs, _certs_expire_at, _certs_fetched_at = certs, now + max_age, now
+
+
+def get_certs(kid=None):
+    """Cached signing certificates; refreshed when expired or missing `kid`"""
+    with _certs_lock:
+        now = time.monotonic()
+        if _certs is None or now >= _certs_expire_at:
+            _refresh_certs()
+        elif kid and kid not in _certs and now - _certs_fetched_at >= UNKNOWN_KID_REFETCH_SECONDS:
+            _refresh_certs()
+        return _certs
+
+
+def _token_kid(token):
+    """Key id from the (unverified) JWT header, or None"""
+    try:
+        header = token.split('.', 1)[0]
+        return json.loads(base64.urlsafe_b64decode(header + '=' * (-len(header) % 4))).get('kid')
+    except (ValueError, AttributeError):
+        return None
+
+
+def _verified_cache():
+    global _verified
+    if _verified is None:
+        _verified = TTLCache(maxsize=settings.GOOGLE_TOKEN_CACHE_SIZE, ttl=settings.GOOGLE_TOKEN_CACHE_SECONDS)
+    return _verified
+
+
+def clear_verified():
+    with _verified_lock:
+        _verified_cache().clear()
+
+
+def verify_credential(credential, audience=None):
+    """
+    Verified claims of a Google ID token for our client id (or `audience`).
+    Raises ValueError for invalid, expired or foreign tokens.
+    """
+    audience = audience or settings.GOOGLE_CLIENT_ID
+    if isinstance(credential, bytes):
+        credential = credential.decode('utf-8')
+    key = hashlib.sha256(f'{audience}\0{credential}'.encode()).hexdigest()
+
+    with _verified_lock:
+        claims = _verified_cache().get(key)
+    if claims is not None and claims.get('exp', 0) > time.time():
+        return claims
+
+    claims = jwt.decode(
+        credential,
+        certs=get_certs(_token_kid(credential)),
+        audience=audience,
+        clock_skew_in_seconds=CLOCK_SKEW_SECONDS,
+    )
+    if claims.get('iss') not in ISSUERS:
+        raise ValueError(f"Wrong issuer: {claims.get('iss')}")
+
+    with _verified_lock:
+        _verified_cache()[key] = claims
+    return claims
+
+
+# ---------- accounts ----------
+
+def allocate_username(email):
+    """
+    First free username derived from an email (alice, alice1, alice2, ...),
+    found with one query over the usernames sharing the prefix
+    """
+    base = re.sub(r'[^\w.@+-]', '', email.split('@')[0])[:140] or 'user'
+    taken = set(User.objects.filter(
+        username__startswith=base,  # index range scan; the regex only filters within it
+        username__regex=rf'^{re.escape(base)}[0-9]*$',
+    ).values_list('username', flat=True))
+    if base not in taken:
+        return base
+    suffix = 1
+    while f'{base}{suffix}' in taken:
+        suffix += 1
+    return f'{base}{suffix}'
+
+
+def create_google_user(email, first_name='', last_name='', attempts=3):
+    """Create the account for a first Google login, retrying if a concurrent login took the username"""
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                return User.objects.create(
+                    username=allocate_username(email),
+                    email=email,
+                    first_name=first_name,
+                    last_name=last_name
+                )
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
+            logger.info(f"Username for {email} was taken concurrently, retrying")
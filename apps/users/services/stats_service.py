@@ -0,0 +1,81 @@
+"""
+User Stats Service
+Keeps the per-user counters on UserProfile (total_messages,
+total_conversations, last_message_at) so listings never aggregate over the
+message tables.
+
+The chat write path bumps them with one UPDATE per turn or batch; soft
+deleting a conversation takes its messages back out. rebuild() recomputes
+them from Conversation.message_count in batches of users, which repairs any
+drift and backfills existing data (manage.py rebuild_user_stats).
+
+A conversation counts once it has messages, so the empty conversation a
+failed first turn may leave behind is not included.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.chatbot.models import Conversation
+from apps.users.models import UserProfile
+
+
+def record_messages(user_id, messages, conversations=0, at=None):
+    """Add a turn's (or batch's) messages and newly started conversations"""
+    if not user_id or not (messages or conversations):
+        return
+    UserProfile.objects.filter(user_id=user_id).update(
+        total_messages=F('total_messages') + messages,
+        total_conversations=F('total_conversations') + conversations,
+        last_message_at=at or timezone.now(),
+    )
+
+
+def remove_conversation(conversation):
+    """Take a deleted conversation's messages out of its owner's totals"""
+    if not conversation.user_id or not conversation.message_count:
+        return
+    UserProfile.objects.filter(user_id=conversation.user_id).update(
+        total_messages=F('total_messages') - conversation.message_count,
+        total_conversations=F('total_conversations') - 1,
+    )
+
+
+def _per_user(aggregate):
+    """Correlated subquery: one aggregate over the profile owner's live conversations"""
+    return Subquery(
+        Conversation.objects.filter(user_id=OuterRef('user_id'), message_count__gt=0)
+        .order_by()
+        .values('user_id')
+        .annotate(value=aggregate)
+        .values('value')[:1]
+    )
+
+
+def rebuild(user_ids=None, batch_size=1000):
+    """
+    Recompute the stats of the given users (default: everyone), creating
+    missing profiles. Returns the number of profiles updated.
+    """
+    users = User.objects.order_by('id')
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+
+    updated = 0
+    last_id = 0
+    while True:
+        batch = list(users.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not batch:
+            return updated
+        last_id = batch[-1]
+
+        UserProfile.objects.bulk_create(
+            [UserProfile(user_id=user_id) for user_id in batch], ignore_conflicts=True
+        )
+        updated += UserProfile.objects.filter(user_id__in=batch).update(
+            total_messages=Coalesce(_per_user(Sum('message_count')), 0, output_field=IntegerField()),
+            total_conversations=Coalesce(_per_user(Count('id')), 0, output_field=IntegerField()),
+            last_message_at=_per_user(Max('updated_at')),
+        )
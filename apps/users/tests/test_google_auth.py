@@ -0,0 +1,141 @@
+import datetime
+import time
+from unittest import mock
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.test import TestCase
+from google.auth import crypt, jwt
+
+from apps.users.services import google_auth_service
+
+
+def signing_key(kid):
+    """(signer, PEM certificate) for a fresh RSA key"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'test')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key()).serial_number(1)
+        .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    return crypt.RSASigner.from_string(private, kid), certificate.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class GoogleCredentialTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.signer, cls.certificate = signing_key('k1')
+        cls.rotated_signer, cls.rotated_certificate = signing_key('k2')
+
+    def setUp(self):
+        self.published = {'k1': self.certificate}
+        self.fetches = 0
+        google_auth_service.set_cert_source(self.cert_source)
+        google_auth_service.clear_verified()
+        self.addCleanup(google_auth_service.set_cert_source, None)
+        self.addCleanup(google_auth_service.clear_verified)
+
+    def cert_source(self):
+        self.fetches += 1
+        return dict(self.published), 3600
+
+    def token(self, signer=None, expires_in=600, **claims):
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com', 'aud': settings.GOOGLE_CLIENT_ID, 'sub': '123',
+            'email': 'alice@example.com', 'iat': now, 'exp': now + expires_in, **claims,
+        }
+        return jwt.encode(signer or self.signer, payload).decode()
+
+    def test_valid_token(self):
+        claims = google_auth_service.verify_credential(self.token())
+
+        self.assertEqual(claims['email'], 'alice@example.com')
+        self.assertEqual(self.fetches, 1)
+
+    def test_rejects_wrong_audience_expired_and_wrong_issuer(self):
+        for credential in (
+            self.token(aud='someone-else.apps.googleusercontent.com'),
+            self.token(expires_in=-60),
+            self.token(iss='https://evil.example.com'),
+        ):
+            with self.assertRaises(ValueError):
+                google_auth_service.verify_credential(credential)
+
+    def test_unknown_kid_refetches_after_the_floor(self):
+        google_auth_service.verify_credential(self.token())
+        self.published['k2'] = self.rotated_certificate
+        rotated = self.token(self.rotated_signer)
+
+        # Right after a fetch an unknown kid is not worth another round trip
+        with self.assertRaises(ValueError):
+            google_auth_service.verify_credential(rotated)
+        self.assertEqual(self.fetches, 1)
+
+        later = time.monotonic() + google_auth_service.UNKNOWN_KID_REFETCH_SECONDS + 1
+        with mock.patch('time.monotonic', return_value=later):
+            claims = google_auth_service.verify_credential(rotated)
+        self.assertEqual(claims['sub'], '123')
+        self.assertEqual(self.fetches, 2)
+
+    def test_verified_token_is_served_from_cache(self):
+        credential = self.token()
+        google_auth_service.verify_credential(credential)
+
+        with mock.patch.object(google_auth_service.jwt, 'decode') as decode:
+            claims = google_auth_service.verify_credential(credential)
+
+        decode.assert_not_called()
+        self.assertEqual(claims['email'], 'alice@example.com')
+
+    def test_cached_token_expires_at_exp(self):
+        credential = self.token(expires_in=30)
+        exp = google_auth_service.verify_credential(credential)['exp']
+
+        after_exp = datetime.datetime.fromtimestamp(exp + 60, datetime.timezone.utc).replace(tzinfo=None)
+        with mock.patch('time.time', return_value=exp + 1), \
+                mock.patch('google.auth._helpers.utcnow', return_value=after_exp):
+            with self.assertRaises(ValueError):
+                google_auth_service.verify_credential(credential)
+
+
+class GoogleAccountTests(TestCase):
+    def test_allocate_username_skips_taken_names(self):
+        for username in ('alice', 'alice1', 'alicex'):
+            User.objects.create(username=username)
+
+        self.assertEqual(google_auth_service.allocate_username('alice@example.com'), 'alice2')
+        self.assertEqual(google_auth_service.allocate_username('bob@example.com'), 'bob')
+
+    def test_create_retries_when_a_concurrent_login_takes_the_username(self):
+        allocate = google_auth_service.allocate_username
+        # The first pick was made before another login committed 'alice'
+        User.objects.create(username='alice')
+        stale = iter(['alice'])
+
+        def lose_first_race(email):
+            return next(stale, None) or allocate(email)
+
+        with mock.patch.object(google_auth_service, 'allocate_username', side_effect=lose_first_race) as allocated:
+            user = google_auth_service.create_google_user('alice@example.com', 'Alice')
+
+        self.assertEqual(user.username, 'alice1')
+        self.assertEqual(allocated.call_count, 2)
+
+    def test_create_gives_up_after_its_attempts(self):
+        User.objects.create(username='alice')
+
+        with mock.patch.object(google_auth_service, 'allocate_username', return_value='alice') as allocated:
+            with self.assertRaises(IntegrityError):
+                google_auth_service.create_google_user('alice@example.com', attempts=2)
+        self.assertEqual(allocated.call_count, 2)
@@ -0,0 +1,70 @@
+from importlib import import_module
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.chatbot.models import Conversation, Message
+from apps.chatbot.services import chatbot_service
+from apps.chatbot.services.chatbot_service import ChatbotService
+from apps.users.models import UserProfile
+from ml_models.chatbot_engine import ChatbotEngine
+
+
+@override_settings(ACTIVITY_ASYNC=False)
+@mock.patch.object(ChatbotService, 'needs_ai', staticmethod(lambda user_message, ml_result: False))
+@mock.patch.object(ChatbotEngine, 'preprocess_text', lambda self, text: text.lower())
+class UserStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        UserProfile.objects.get_or_create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def totals(self):
+        profile = UserProfile.objects.get(user=self.user)
+        return profile.total_messages, profile.total_conversations
+
+    def test_concurrent_first_turns_start_the_conversation_once(self):
+        conversation = Conversation.objects.create(user=self.user)
+        # Both turns loaded the conversation before either counted its messages
+        first, second = Conversation.objects.get(id=conversation.id), Conversation.objects.get(id=conversation.id)
+
+        started = [chatbot_service._add_messages(turn, 2, conversation.updated_at) for turn in (first, second)]
+
+        self.assertEqual(started, [1, 0])
+        self.assertEqual(Conversation.objects.get(id=conversation.id).message_count, 4)
+
+    def test_turns_and_batches_count_conversations_once(self):
+        reply = self.client.post('/api/chatbot/chat/', {'message': 'hello'}, format='json').data
+        self.client.post('/api/chatbot/chat/', {
+            'message': 'thanks', 'conversation_id': reply['conversation_id'],
+        }, format='json')
+        self.assertEqual(self.totals(), (4, 1))
+
+        self.client.post('/api/chatbot/chat/batch/', {'messages': [
+            {'message': 'hello', 'group': 'a'},
+            {'message': 'thanks', 'group': 'a'},
+            {'message': 'bye', 'conversation_id': reply['conversation_id']},
+        ]}, format='json')
+        self.assertEqual(self.totals(), (10, 2))
+
+    def test_migration_backfills_existing_users(self):
+        conversation = Conversation.objects.create(user=self.user, message_count=2)
+        Message.objects.create(conversation=conversation, content='hello')
+        Conversation.objects.create(user=self.user, message_count=6, deleted_at=timezone.now())
+        bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        UserProfile.objects.filter(user=self.user).update(total_messages=0, total_conversations=0)
+        UserProfile.objects.filter(user=bob).delete()
+
+        # Run it on the models as of the migration, the way migrate does
+        state = MigrationLoader(connection).project_state(('users', '0003_rebuild_user_stats'))
+        migration = import_module('apps.users.migrations.0003_rebuild_user_stats')
+        migration.rebuild_user_stats(state.apps, None)
+
+        self.assertEqual(self.totals(), (2, 1))
+        self.assertEqual(UserProfile.objects.get(user=bob).total_messages, 0)
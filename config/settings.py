@@ -37,13 +37,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.metrics.RequestMetricsMiddleware',  # First, so it times the whole stack
+    'core.middleware.query_budget.QueryBudgetMiddleware',
+    'core.middleware.replica.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.compression.JSONGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Must be BEFORE CommonMiddleware
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -77,6 +82,17 @@ DATABASES = {
     )
 }
 
+# Read replica (optional): GET requests to read-only views (analytics, admin
+# listings) read from it; a client that wrote stays on the primary for
+# REPLICA_PIN_SECONDS (pins live in the cache, so share it across workers).
+# Test runs mirror it to the default database
+DATABASE_REPLICA_URL = config('DATABASE_REPLICA_URL', default='')
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = dj_database_url.parse(DATABASE_REPLICA_URL, conn_max_age=600)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['core.utils.replica.ReplicaRouter']
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -116,12 +132,21 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
+    'if-none-match',
     'origin',
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
 ]
 
+# Let browser clients read paging links and cache validators
+CORS_EXPOSE_HEADERS = [
+    'etag',
+    'last-modified',
+    'link',
+]
+
 CORS_ALLOW_METHODS = [
     'DELETE',
     'GET',
@@ -183,9 +208,123 @@ SOCIALACCOUNT_PROVIDERS = {
     }
 }
 
+# Google Sign-In: OAuth client id ID tokens must be issued for, timeout for
+# fetching Google's signing certificates, and how long / how many verified
+# tokens are remembered per process
+GOOGLE_CLIENT_ID = config(
+    'GOOGLE_CLIENT_ID', default='89771009227-e4ca190m73gj3nkb4qboeqovauno5koi.apps.googleusercontent.com'
+)
+GOOGLE_CERTS_TIMEOUT = config('GOOGLE_CERTS_TIMEOUT', default=5, cast=float)
+GOOGLE_TOKEN_CACHE_SECONDS = config('GOOGLE_TOKEN_CACHE_SECONDS', default=300, cast=int)
+GOOGLE_TOKEN_CACHE_SIZE = config('GOOGLE_TOKEN_CACHE_SIZE', default=10000, cast=int)
+
 # ✅ GEMINI API KEY - FIXED (use environment variable!)
 GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
 
+# Cache: Redis when REDIS_URL is set (shared by all workers), else per-process memory
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Analytics payload cache: seconds a payload is served while no messages are
+# written, and seconds it is served regardless of writes
+ANALYTICS_CACHE_TTL = config('ANALYTICS_CACHE_TTL', default=30, cast=int)
+ANALYTICS_CACHE_MIN_FRESHNESS = config('ANALYTICS_CACHE_MIN_FRESHNESS', default=5, cast=int)
+
+# Conversation archival (cold conversations move to compressed segment files)
+ARCHIVE_ROOT = config('ARCHIVE_ROOT', default=str(BASE_DIR / 'archive'))
+ARCHIVE_IDLE_DAYS = config('ARCHIVE_IDLE_DAYS', default=90, cast=int)
+ARCHIVE_SEGMENT_MAX_BYTES = config('ARCHIVE_SEGMENT_MAX_BYTES', default=64 * 1024 * 1024, cast=int)
+
+# Bulk exports: rows fetched per server-side cursor round trip
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Background deletes: rows removed per transaction, and whether jobs start on
+# a thread right after the request (otherwise they run inline on commit)
+DELETION_BATCH_SIZE = config('DELETION_BATCH_SIZE', default=1000, cast=int)
+DELETION_ASYNC = config('DELETION_ASYNC', default=True, cast=bool)
+
+# Idempotency-Key support on chat POSTs: how long responses are kept for
+# replay, and when an unfinished key is considered abandoned
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=24 * 60 * 60, cast=int)
+IDEMPOTENCY_LOCK_TIMEOUT = config('IDEMPOTENCY_LOCK_TIMEOUT', default=120, cast=int)
+
+# Hot read endpoints: values() rows mapped straight to dicts and rendered
+# with orjson (when installed) instead of ModelSerializers + stdlib json
+FAST_READ_SERIALIZATION = config('FAST_READ_SERIALIZATION', default=False, cast=bool)
+
+# Batch chat endpoint: max messages per request and concurrent Gemini calls
+CHAT_BATCH_MAX_MESSAGES = config('CHAT_BATCH_MAX_MESSAGES', default=100, cast=int)
+CHAT_BATCH_AI_CONCURRENCY = config('CHAT_BATCH_AI_CONCURRENCY', default=4, cast=int)
+
+# Analytics rollups: source rows folded per transaction, how recent rows
+# must be before they are folded (younger rows are read from the live tail),
+# and how long skipped ids are watched for a late commit (longer than the
+# longest transaction, e.g. a transcript import)
+ROLLUP_BATCH_SIZE = config('ROLLUP_BATCH_SIZE', default=50000, cast=int)
+ROLLUP_LAG_SECONDS = config('ROLLUP_LAG_SECONDS', default=60, cast=int)
+ROLLUP_GAP_SECONDS = config('ROLLUP_GAP_SECONDS', default=24 * 60 * 60, cast=int)
+
+# UserActivity ingestion: events are queued in-process and written in batches
+# by a background thread (flushed at this size or this many seconds after the
+# first queued event); when the queue is full new events are dropped
+ACTIVITY_ASYNC = config('ACTIVITY_ASYNC', default=True, cast=bool)
+ACTIVITY_QUEUE_SIZE = config('ACTIVITY_QUEUE_SIZE', default=10000, cast=int)
+ACTIVITY_BATCH_SIZE = config('ACTIVITY_BATCH_SIZE', default=500, cast=int)
+ACTIVITY_FLUSH_INTERVAL = config('ACTIVITY_FLUSH_INTERVAL', default=2.0, cast=float)
+
+# Prometheus /metrics: directory where each worker process writes its metrics
+# snapshot so a scrape sees all workers (empty: this process only; clear it on
+# deploy), seconds between snapshots, and the Bearer token scrapers send
+# (without one only staff users can read it, or anyone when DEBUG is on)
+METRICS_MULTIPROC_DIR = config('METRICS_MULTIPROC_DIR', default='')
+METRICS_SNAPSHOT_INTERVAL = config('METRICS_SNAPSHOT_INTERVAL', default=5, cast=int)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Query budgets: queries a view may run per request unless it declares its
+# own, how often one SQL shape may repeat before it is reported as an N+1,
+# and whether X-Query-Count / X-Query-Time-Ms headers are sent
+QUERY_BUDGET_ENABLED = config('QUERY_BUDGET_ENABLED', default=True, cast=bool)
+QUERY_BUDGET_DEFAULT = config('QUERY_BUDGET_DEFAULT', default=20, cast=int)
+QUERY_REPEAT_THRESHOLD = config('QUERY_REPEAT_THRESHOLD', default=5, cast=int)
+QUERY_BUDGET_HEADERS = config('QUERY_BUDGET_HEADERS', default=DEBUG, cast=bool)
+
+# On-demand request profiling: staff requests with this header (or ?_profile=1)
+# are profiled, plus 1 in PROFILER_SAMPLE_RATE requests (0: off). Profiles
+# are kept PROFILER_TTL seconds in PROFILER_DIR, which every worker must see
+# (a volume shared across hosts); an empty PROFILER_DIR turns profiling off
+PROFILER_HEADER = config('PROFILER_HEADER', default='X-Profile')
+PROFILER_SAMPLE_RATE = config('PROFILER_SAMPLE_RATE', default=0, cast=int)
+PROFILER_INTERVAL_MS = config('PROFILER_INTERVAL_MS', default=5, cast=float)
+PROFILER_MAX_CONCURRENT = config('PROFILER_MAX_CONCURRENT', default=2, cast=int)
+PROFILER_DIR = config('PROFILER_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILER_TTL = config('PROFILER_TTL', default=24 * 60 * 60, cast=int)
+
+# Memory introspection: traceback depth recorded by tracemalloc, and the leak
+# detector's period in seconds (0: off; it traces for as long as it runs) and
+# how many growing allocation sites it logs
+MEMORY_TRACE_FRAMES = config('MEMORY_TRACE_FRAMES', default=10, cast=int)
+MEMORY_LEAK_CHECK_INTERVAL = config('MEMORY_LEAK_CHECK_INTERVAL', default=0, cast=int)
+MEMORY_LEAK_TOP_SITES = config('MEMORY_LEAK_TOP_SITES', default=10, cast=int)
+
+# Dashboard totals and admin pagination use planner estimates (PostgreSQL)
+# for tables larger than this; smaller ones are counted exactly
+ESTIMATED_COUNT_THRESHOLD = config('ESTIMATED_COUNT_THRESHOLD', default=100000, cast=int)
+
+# JSON responses smaller than this are sent uncompressed
+GZIP_MIN_BYTES = config('GZIP_MIN_BYTES', default=1024, cast=int)
+
 # Security Settings for Production
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
@@ -8,6 +8,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
+from core.views import metrics_view
 
 
 @require_http_methods(["GET"])
@@ -31,6 +32,9 @@ urlpatterns = [
     # Root endpoint
     path('', root_health_check, name='root'),
 
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
+
     # Django admin
     path('admin/', admin.site.urls),
 
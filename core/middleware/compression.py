@@ -0,0 +1,22 @@
+"""
+Response compression for API JSON.
+"""
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware restricted to JSON bodies of at least GZIP_MIN_BYTES.
+    Small payloads are not worth the CPU, and other content types (static
+    files, exports that compress themselves) are left alone.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith('application/json'):
+            return response
+        if not response.streaming and len(response.content) < settings.GZIP_MIN_BYTES:
+            return response
+        return super().process_response(request, response)
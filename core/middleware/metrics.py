@@ -0,0 +1,53 @@
+"""
+Request metrics middleware
+Counts requests and records their latency and database query count per
+route. The route is the URL pattern (e.g. api/chatbot/conversations/<int:pk>/),
+not the path, so label cardinality stays bounded.
+"""
+
+import time
+
+from core.utils import memory, metrics, prometheus
+from core.utils.query_budget import all_connections
+
+requests_total = metrics.counter(
+    'http_requests_total', 'HTTP requests by route, method and status'
+)
+request_duration = metrics.histogram(
+    'http_request_duration_ms', description='HTTP request latency in milliseconds'
+)
+request_queries = metrics.histogram(
+    'http_request_db_queries', metrics.COUNT_BUCKETS, 'Database queries per HTTP request'
+)
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None and match.route else '<unmatched>'
+
+
+class RequestMetricsMiddleware:
+    """Put it first so the timing covers every other middleware"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        prometheus.ensure_writer()
+        memory.ensure_leak_detector()
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with all_connections(count_query):
+            response = self.get_response(request)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        route = _route(request)
+        requests_total.inc(route=route, method=request.method, status=response.status_code)
+        request_duration.observe(elapsed, route=route, method=request.method)
+        request_queries.observe(queries[0], route=route)
+        return response
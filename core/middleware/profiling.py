@@ -0,0 +1,72 @@
+"""
+Request profiling middleware
+Runs the sampling profiler (core.utils.profiler) for
+  * a request from a staff user carrying the PROFILER_HEADER header or the
+    ?_profile=1 flag, and
+  * 1 in PROFILER_SAMPLE_RATE requests when that is set (0 turns it off).
+The stored profile's id is returned in the X-Profile-Id header; admins
+download it from /api/chatbot/admin/profiles/<id>/.
+
+Every other request costs one header lookup and, with sampling on, one
+random number. Nothing is profiled while PROFILER_DIR is unset, since the
+profiles could not be stored where every worker can serve them.
+"""
+
+import logging
+import random
+import threading
+
+from django.conf import settings
+
+from core.utils import profiler
+from core.utils.auth import is_staff_request
+
+logger = logging.getLogger(__name__)
+
+QUERY_FLAG = '_profile'
+
+
+class ProfilingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = 'HTTP_' + settings.PROFILER_HEADER.upper().replace('-', '_')
+        self.slots = threading.BoundedSemaphore(settings.PROFILER_MAX_CONCURRENT)
+
+    def __call__(self, request):
+        requested = self.header in request.META or QUERY_FLAG in request.GET
+        sampled = (
+            not requested and settings.PROFILER_SAMPLE_RATE
+            and random.random() * settings.PROFILER_SAMPLE_RATE < 1
+        )
+        if not (requested or sampled) or not profiler.enabled():
+            return self.get_response(request)
+
+        if requested and not is_staff_request(request):
+            return self.get_response(request)
+        # Bounded so a burst of flagged requests cannot pile up sampler threads
+        if not self.slots.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            sampler = profiler.SamplingProfiler().start()
+            try:
+                response = self.get_response(request)
+            finally:
+                sampler.stop()
+
+            try:
+                profile_id = profiler.save_profile(
+                    sampler,
+                    method=request.method,
+                    path=request.path,
+                    status=response.status_code,
+                    trigger='sampled' if sampled else 'requested',
+                )
+            except Exception as e:
+                logger.warning(f"Could not store profile for {request.path}: {e}")
+            else:
+                response['X-Profile-Id'] = profile_id
+            return response
+        finally:
+            self.slots.release()
@@ -0,0 +1,56 @@
+"""
+Query budget middleware
+Counts the database queries of every request and their total time, and logs
+  * requests over their view's query budget (core.utils.query_budget), and
+  * requests that run one SQL shape QUERY_REPEAT_THRESHOLD times or more,
+    which is how an N+1 shows up,
+with the most repeated SQL shapes. With QUERY_BUDGET_HEADERS the counts are
+also sent as X-Query-Count / X-Query-Time-Ms response headers.
+"""
+
+import logging
+
+from django.conf import settings
+from core.utils.query_budget import QueryLog, all_connections, budget_for, view_name
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_BUDGET_ENABLED:
+            return self.get_response(request)
+
+        log = QueryLog()
+        with all_connections(log):
+            response = self.get_response(request)
+
+        if settings.QUERY_BUDGET_HEADERS:
+            response['X-Query-Count'] = str(log.count)
+            response['X-Query-Time-Ms'] = f'{log.milliseconds:.1f}'
+
+        view = getattr(request, '_query_budget_view', None)
+        if view is None:
+            return response  # not routed to a view (404, middleware response)
+
+        budget = budget_for(view)
+        repeated = log.repeated(settings.QUERY_REPEAT_THRESHOLD)
+        if log.count > budget:
+            logger.warning(
+                f"{request.method} {request.path} ({view_name(view)}) ran {log.count} queries "
+                f"in {log.milliseconds:.1f} ms, over its budget of {budget}:\n{log.report()}"
+            )
+        elif repeated:
+            logger.warning(
+                f"{request.method} {request.path} ({view_name(view)}) ran one query {repeated[0][0]} times, "
+                f"possible N+1:\n{log.report()}"
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget_view = view_func
+        return None
@@ -0,0 +1,59 @@
+"""
+Read replica middleware
+Sets up routing (core.utils.replica) for every request: GET/HEAD requests to
+views that opted in read from the replica unless the client is pinned to
+the primary. A request that wrote anything pins its client for
+REPLICA_PIN_SECONDS, so it reads its own writes back: an authenticated user
+by id in the cache (JWT clients send no cookies), anyone with a cookie.
+Streamed bodies keep the request's routing while they are read.
+
+Removed from the stack (MiddlewareNotUsed) when no replica is configured.
+"""
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.utils import replica
+from core.utils.auth import request_user_id
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaMiddleware:
+
+    def __init__(self, get_response):
+        if replica.REPLICA_ALIAS not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with replica.routing() as state:
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = replica.routed(response.streaming_content, state)
+
+        if state.wrote or request.method not in SAFE_METHODS:
+            # DRF has set request.user by now, for token-authenticated calls too
+            user_id = request_user_id(request)
+            if user_id is not None:
+                replica.pin_user(user_id)
+            response.set_cookie(
+                replica.PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+                secure=request.is_secure(),
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        use_replica = (
+            request.method in ('GET', 'HEAD')
+            and replica.PIN_COOKIE not in request.COOKIES
+            and replica.replica_allowed(view_func)
+        )
+        if use_replica:
+            user_id = request_user_id(request)
+            use_replica = user_id is None or not replica.user_pinned(user_id)
+        replica.current().use_replica = use_replica
+        return None
@@ -0,0 +1,66 @@
+from contextlib import ExitStack
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.chatbot.models import Conversation
+from core.utils import counts
+from core.utils.counts import EstimatedCountPaginator, estimated_count
+
+
+@override_settings(ESTIMATED_COUNT_THRESHOLD=1000)
+class EstimatedCountTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        for number in range(3):
+            Conversation.objects.create(user=user, title=f'Chat {number}')
+        Conversation.objects.create(user=user, title='Gone', deleted_at=timezone.now())
+
+    def postgres(self, table=None, plan=None):
+        """Pretend to be PostgreSQL with the given planner estimates"""
+        stack = ExitStack()
+        stack.enter_context(mock.patch.object(connections['default'], 'vendor', 'postgresql'))
+        stack.enter_context(mock.patch.object(counts, '_table_estimate', return_value=table))
+        stack.enter_context(mock.patch.object(counts, '_plan_estimate', return_value=plan))
+        return stack
+
+    def test_sqlite_counts_exactly_through_the_default_manager(self):
+        self.assertEqual(estimated_count(Conversation), (3, False))
+        self.assertEqual(estimated_count(Conversation.objects.filter(title='Chat 1')), (1, False))
+
+    def test_large_table_uses_planner_statistics(self):
+        with self.postgres(table=250_000):
+            self.assertEqual(estimated_count(User), (250_000, True))
+            self.assertEqual(counts.total(User), {'total': 250_000, 'estimated': True})
+
+    def test_filtered_queryset_uses_plan_estimate(self):
+        with self.postgres(table=1, plan=40_000):
+            self.assertEqual(estimated_count(Conversation.objects.filter(user__username='alice')), (40_000, True))
+            counts._plan_estimate.assert_called_once()
+            counts._table_estimate.assert_not_called()
+
+    def test_small_or_missing_estimates_fall_back_to_exact_count(self):
+        for estimate in (999, None):
+            with self.subTest(estimate=estimate), self.postgres(table=estimate, plan=estimate):
+                self.assertEqual(estimated_count(User), (1, False))
+                self.assertEqual(estimated_count(Conversation), (3, False))
+
+    def test_threshold_is_inclusive(self):
+        with self.postgres(table=1000):
+            self.assertEqual(estimated_count(User), (1000, True))
+
+    def test_paginator_count_comes_from_the_estimate(self):
+        paginator = EstimatedCountPaginator(Conversation.objects.order_by('id'), 25)
+
+        # The default manager hides soft-deleted rows: a filtered query, so the plan estimate
+        with self.postgres(plan=5_000):
+            self.assertEqual(paginator.count, 5_000)
+        self.assertEqual(paginator.num_pages, 200)
+        self.assertEqual(len(paginator.page(1)), 3)
+
+    def test_paginator_counts_plain_lists(self):
+        with self.postgres(table=5_000, plan=5_000):
+            self.assertEqual(EstimatedCountPaginator(list(range(7)), 5).count, 7)
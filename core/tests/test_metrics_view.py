@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class MetricsViewTests(TestCase):
+    def scrape(self, **headers):
+        return self.client.get('/metrics', **headers)
+
+    def bearer(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_closed_without_token_outside_debug(self):
+        self.assertEqual(self.scrape().status_code, 401)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=True)
+    def test_open_in_debug_without_token(self):
+        self.assertEqual(self.scrape().status_code, 200)
+
+    @override_settings(METRICS_TOKEN='s3cret', DEBUG=True)
+    def test_token_is_required_once_set(self):
+        self.assertEqual(self.scrape().status_code, 401)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='s3cret', DEBUG=False)
+    def test_staff_users_may_scrape(self):
+        staff = User.objects.create_user('ops', 'ops@example.com', 'pw', is_staff=True)
+        member = User.objects.create_user('alice', 'alice@example.com', 'pw')
+
+        self.assertEqual(self.scrape(**self.bearer(staff)).status_code, 200)
+        self.assertEqual(self.scrape(**self.bearer(member)).status_code, 401)
@@ -0,0 +1,40 @@
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.utils import profiler
+
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        staff = User.objects.create_user('ops', 'ops@example.com', 'pw', is_staff=True)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(staff).access_token}'}
+
+    def profiled_request(self):
+        return self.client.get('/api/chatbot/health/', HTTP_X_PROFILE='1', **self.auth)
+
+    def test_profile_is_stored_in_the_directory_and_served(self):
+        with override_settings(PROFILER_DIR=self.directory):
+            profile_id = self.profiled_request()['X-Profile-Id']
+
+            listed = self.client.get('/api/chatbot/admin/profiles/', **self.auth).json()['profiles']
+            download = self.client.get(f'/api/chatbot/admin/profiles/{profile_id}/', **self.auth)
+
+        self.assertEqual([meta['id'] for meta in listed], [profile_id])
+        self.assertEqual(listed[0]['path'], '/api/chatbot/health/')
+        self.assertEqual(download.status_code, 200)
+
+    @override_settings(PROFILER_DIR='')
+    def test_nothing_is_profiled_without_a_directory(self):
+        response = self.profiled_request()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(profiler.list_profiles(), [])
+        with self.assertRaises(RuntimeError):
+            profiler.save_profile(profiler.SamplingProfiler().start().stop())
@@ -0,0 +1,223 @@
+"""
+Every routed API view runs within its declared query budget
+(core.utils.query_budget) against a few users, conversations and messages,
+so a view that grows an N+1 or outgrows its budget fails here.
+"""
+
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import URLPattern, get_resolver
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.analytics import rollups
+from apps.analytics.models import MessageFeedback
+from apps.chatbot.models import Conversation, DeletionJob, Message
+from apps.chatbot.services.chatbot_service import ChatbotService
+from apps.users.services import google_auth_service
+from core.utils import memory, profiler
+from core.utils.testing import assert_view_query_budget
+from ml_models.chatbot_engine import ChatbotEngine
+
+API_NAMESPACES = ('chatbot', 'analytics', 'users')
+
+
+@override_settings(ACTIVITY_ASYNC=False)
+@mock.patch.object(ChatbotService, 'needs_ai', staticmethod(lambda user_message, ml_result: False))
+@mock.patch.object(ChatbotEngine, 'preprocess_text', lambda self, text: text.lower())
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('ops', 'ops@example.com', 'pw', is_staff=True)
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        for user in (cls.alice, cls.bob):
+            for number in range(3):
+                conversation = Conversation.objects.create(user=user, title=f'Order {number}', message_count=4)
+                for turn in range(2):
+                    Message.objects.create(conversation=conversation, message_type='user', content='where is my order')
+                    Message.objects.create(
+                        conversation=conversation, message_type='bot', content='It ships today',
+                        intent='shipping', confidence=0.8,
+                        metadata={'engine': 'ml', 'timings_ms': {'ml_predict': 1.5, 'total': 4.0}},
+                    )
+        cls.conversation = Conversation.objects.filter(user=cls.alice).first()
+        cls.bot_message = Message.objects.filter(conversation=cls.conversation, message_type='bot').first()
+        MessageFeedback.objects.create(message=cls.bot_message, user=cls.alice, feedback_type='positive')
+        rollups.run_rollups(lag_seconds=0)
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client
+
+    def check(self, user, method, path, data=None, status=200, **extra):
+        if method in ('post', 'put', 'patch'):
+            extra.setdefault('format', 'json')
+        response = assert_view_query_budget(self.client_for(user), method, path, data, **extra)
+        self.assertEqual(response.status_code, status, getattr(response, 'data', response))
+        return response
+
+    # ---------- chatbot ----------
+
+    def test_health(self):
+        self.check(None, 'get', '/api/chatbot/health/')
+
+    def test_chat(self):
+        self.check(self.alice, 'post', '/api/chatbot/chat/', {'message': 'hello'})
+        self.check(self.alice, 'post', '/api/chatbot/chat/', {
+            'message': 'thanks', 'conversation_id': self.conversation.id,
+        })
+        self.check(None, 'post', '/api/chatbot/chat/', {'message': 'hello'})
+
+    def test_chat_batch(self):
+        self.check(self.alice, 'post', '/api/chatbot/chat/batch/', {'messages': [
+            {'message': 'hello'},
+            {'message': 'where is my order', 'conversation_id': self.conversation.id},
+            {'message': 'thanks', 'group': 'ticket-1'},
+            {'message': 'bye', 'group': 'ticket-1'},
+        ]})
+
+    def test_conversation_list(self):
+        etag = self.check(self.alice, 'get', '/api/chatbot/conversations/')['ETag']
+        self.check(self.alice, 'get', '/api/chatbot/conversations/', status=304, HTTP_IF_NONE_MATCH=etag)
+
+    def test_conversation_detail(self):
+        path = f'/api/chatbot/conversations/{self.conversation.id}/'
+        etag = self.check(self.alice, 'get', path)['ETag']
+        self.check(self.alice, 'get', path, status=304, HTTP_IF_NONE_MATCH=etag)
+        self.check(self.alice, 'delete', path)
+
+    def test_search(self):
+        self.check(self.alice, 'get', '/api/chatbot/search/', {'q': 'order'})
+
+    def test_admin_dashboard(self):
+        self.check(self.staff, 'get', '/api/chatbot/admin/dashboard/')
+
+    def test_admin_users_list(self):
+        for sort in ('joined', 'messages', 'conversations'):
+            self.check(self.staff, 'get', '/api/chatbot/admin/users/', {'sort': sort})
+
+    def test_admin_user_detail(self):
+        self.check(self.staff, 'get', f'/api/chatbot/admin/users/{self.alice.id}/')
+
+    def test_admin_toggle_user(self):
+        self.check(self.staff, 'post', f'/api/chatbot/admin/users/{self.bob.id}/toggle/', {'activate': False})
+
+    def test_admin_delete_user(self):
+        self.check(self.staff, 'delete', f'/api/chatbot/admin/users/{self.bob.id}/delete/', status=202)
+
+    def test_admin_deletion_status(self):
+        job = DeletionJob.objects.create(target_type='user', target_id=self.bob.id, label='bob')
+        self.check(self.staff, 'get', f'/api/chatbot/admin/deletions/{job.id}/')
+
+    def test_admin_health(self):
+        self.check(self.staff, 'get', '/api/chatbot/admin/health/')
+
+    def test_admin_profiles(self):
+        self.check(self.staff, 'get', '/api/chatbot/admin/profiles/')
+
+    def test_admin_profile_download(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with override_settings(PROFILER_DIR=directory):
+            profile_id = profiler.save_profile(profiler.SamplingProfiler().start().stop())
+            self.check(self.staff, 'get', f'/api/chatbot/admin/profiles/{profile_id}/')
+
+    def test_admin_memory(self):
+        self.addCleanup(memory.stop_tracing)
+        self.check(self.staff, 'get', '/api/chatbot/admin/memory/')
+        self.check(self.staff, 'post', '/api/chatbot/admin/memory/', {'tracing': True, 'frames': 1})
+
+    def test_admin_memory_snapshots(self):
+        self.addCleanup(memory.stop_tracing)
+        memory.start_tracing(1)
+        self.check(self.staff, 'post', '/api/chatbot/admin/memory/snapshots/', {'label': 'test'}, status=201)
+        self.check(self.staff, 'get', '/api/chatbot/admin/memory/snapshots/')
+
+    def test_admin_memory_snapshot(self):
+        self.addCleanup(memory.stop_tracing)
+        memory.start_tracing(1)
+        snapshot_id = memory.take_snapshot('test')
+        self.check(self.staff, 'get', f'/api/chatbot/admin/memory/snapshots/{snapshot_id}/')
+
+    # ---------- analytics ----------
+
+    def test_dashboard(self):
+        self.check(self.staff, 'get', '/api/analytics/dashboard/')
+
+    def test_weekly_chart(self):
+        self.check(self.staff, 'get', '/api/analytics/weekly-chart/')
+
+    def test_timeseries(self):
+        for granularity in ('hour', 'day', 'month'):
+            self.check(self.staff, 'get', '/api/analytics/timeseries/', {
+                'metrics': 'messages,user_messages,bot_messages,conversations,active_users,'
+                           'failed_responses,activity',
+                'granularity': granularity,
+            })
+
+    def test_latency(self):
+        self.check(self.staff, 'get', '/api/analytics/latency/')
+        self.check(self.staff, 'get', '/api/analytics/latency/', {'source': 'live'})
+
+    def test_intents(self):
+        self.check(self.staff, 'get', '/api/analytics/intents/')
+
+    def test_feedback(self):
+        self.check(self.bob, 'post', '/api/analytics/feedback/', {
+            'message_id': self.bot_message.id, 'feedback_type': 'negative', 'comment': 'late',
+        })
+
+    def test_export(self):
+        for dataset in ('conversations', 'messages', 'activity'):
+            self.check(self.staff, 'get', f'/api/analytics/export/{dataset}/')
+
+    # ---------- users ----------
+
+    def test_register(self):
+        self.check(None, 'post', '/api/users/register/', {
+            'username': 'carol', 'email': 'carol@example.com', 'password': 'Str0ng-pass!', 'password2': 'Str0ng-pass!',
+            'first_name': 'Carol', 'last_name': 'Smith',
+        }, status=201)
+
+    def test_login(self):
+        self.check(None, 'post', '/api/users/login/', {'username': 'alice', 'password': 'pw'})
+
+    def test_logout(self):
+        refresh = str(RefreshToken.for_user(self.alice))
+        self.check(self.alice, 'post', '/api/users/logout/', {'refresh': refresh})
+
+    def test_profile(self):
+        self.check(self.alice, 'get', '/api/users/profile/')
+
+    def test_token_refresh(self):
+        self.check(None, 'post', '/api/users/token/refresh/', {'refresh': str(RefreshToken.for_user(self.alice))})
+
+    def test_google_login(self):
+        google_auth_service.set_cert_source(lambda: ({}, 3600))
+        self.addCleanup(google_auth_service.set_cert_source, None)
+        self.check(None, 'post', '/api/users/google-login/', {'credential': 'not-a-token'}, status=400)
+
+    # ---------- coverage ----------
+
+    def test_every_api_route_is_covered(self):
+        missing = []
+        for namespace in API_NAMESPACES:
+            resolver = get_resolver().namespace_dict[namespace][1]
+            for pattern in resolver.url_patterns:
+                if not isinstance(pattern, URLPattern):
+                    continue
+                name = pattern.name.replace('-', '_')
+                if not any(attribute.startswith(f'test_{name}') for attribute in dir(self)):
+                    missing.append(f'{namespace}:{pattern.name}')
+        self.assertEqual(missing, [], 'API routes without a query budget test')
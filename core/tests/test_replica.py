@@ -0,0 +1,101 @@
+"""
+Routing against a real second SQLite database: rows written to only one of
+the two aliases show which one a request read from.
+"""
+
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.chatbot.models import Conversation
+from core.utils import replica
+from core.utils.replica import REPLICA_ALIAS
+
+
+@override_settings(DATABASE_ROUTERS=['core.utils.replica.ReplicaRouter'], REPLICA_PIN_SECONDS=60)
+class ReplicaRoutingTests(TestCase):
+    # Every alias, resolved once setUpClass has added the replica
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        path = os.path.join(cls.directory, 'replica.sqlite3')
+        default = connections.settings['default']
+        connections.settings[REPLICA_ALIAS] = {
+            **default, 'NAME': path, 'TEST': {**default['TEST'], 'NAME': path, 'MIRROR': None},
+        }
+        # Before the router is installed, which keeps migrations off the replica
+        call_command('migrate', database=REPLICA_ALIAS, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA_ALIAS].close()
+        del connections[REPLICA_ALIAS]
+        del connections.settings[REPLICA_ALIAS]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user('ops', 'ops@example.com', 'pw', is_staff=True)
+        self.staff.save(using=REPLICA_ALIAS, force_insert=True)  # replicated
+        Conversation.objects.create(user=self.staff, title='on-primary')
+        Conversation(user_id=self.staff.id, title='on-replica').save(using=REPLICA_ALIAS)
+
+    def api_client(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.staff).access_token}')
+        return client
+
+    def exported_titles(self, client):
+        response = client.get('/api/analytics/export/conversations/', {'type': 'jsonl'})
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content).decode()
+        return {title for title in ('on-primary', 'on-replica') if title in body}
+
+    def test_router_reads_replica_until_a_write(self):
+        with replica.routing(use_replica=True):
+            self.assertEqual(list(Conversation.objects.values_list('title', flat=True)), ['on-replica'])
+            Conversation.objects.create(user=self.staff, title='written')
+            self.assertEqual(
+                set(Conversation.objects.values_list('title', flat=True)), {'on-primary', 'written'}
+            )
+
+        self.assertFalse(Conversation.objects.using(REPLICA_ALIAS).filter(title='written').exists())
+
+    def test_streamed_export_reads_from_the_replica(self):
+        self.assertEqual(self.exported_titles(self.api_client()), {'on-replica'})
+
+    def test_write_pins_a_token_client_without_cookies(self):
+        other = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        response = self.api_client().post(
+            f'/api/chatbot/admin/users/{other.id}/toggle/', {'activate': False}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # A fresh client carries the token but none of the response's cookies
+        self.assertEqual(self.exported_titles(self.api_client()), {'on-primary'})
+
+    def test_pin_expires(self):
+        replica.pin_user(self.staff.id)
+        self.assertEqual(self.exported_titles(self.api_client()), {'on-primary'})
+
+        cache.delete(replica.PIN_KEY.format(self.staff.id))
+        self.assertEqual(self.exported_titles(self.api_client()), {'on-replica'})
+
+    def test_anonymous_writes_pin_with_a_cookie(self):
+        client = self.api_client()
+        client.credentials()
+        response = client.post('/api/users/login/', {'username': 'ops', 'password': 'pw'}, format='json')
+
+        self.assertIn(replica.PIN_COOKIE, response.cookies)
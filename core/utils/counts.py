@@ -0,0 +1,82 @@
+"""
+Estimated Counts
+Row counts for dashboards and admin pagination that do not scan the table.
+
+On PostgreSQL a whole-table count is read from the planner statistics
+(pg_class.reltuples, kept current by autovacuum/ANALYZE) and a filtered
+count from the planner's row estimate for the query (EXPLAIN). Estimates
+below ESTIMATED_COUNT_THRESHOLD are replaced by an exact COUNT(*), which is
+cheap at that size and keeps small numbers precise. Other databases (SQLite
+in development) always count exactly.
+
+A model is counted through its default manager, so rows it hides (e.g.
+soft-deleted conversations) are left out of the estimate as well.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def _table_estimate(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+            [connection.ops.quote_name(table)]
+        )
+        row = cursor.fetchone()
+    # -1: never analyzed (PostgreSQL 14+); 0 may also just mean "not yet"
+    return row[0] if row and row[0] > 0 else None
+
+
+def _plan_estimate(queryset):
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimated_count(queryset):
+    """
+    Approximate len() of a queryset (or model). Returns (count, estimated):
+    estimated is False when the count is exact.
+    """
+    if not hasattr(queryset, 'query'):
+        queryset = queryset._default_manager.all()
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count(), False
+
+    if queryset.query.where or queryset.query.distinct or queryset.query.combinator:
+        estimate = _plan_estimate(queryset)
+    else:
+        estimate = _table_estimate(connection, queryset.model._meta.db_table)
+
+    if estimate is None or estimate < settings.ESTIMATED_COUNT_THRESHOLD:
+        return queryset.count(), False
+    return estimate, True
+
+
+def total(model):
+    """{'total': n, 'estimated': bool} for a dashboard tile"""
+    count, estimated = estimated_count(model)
+    return {'total': count, 'estimated': estimated}
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count is estimated for large result sets. For admin
+    changelists, together with show_full_result_count = False:
+
+        paginator = EstimatedCountPaginator
+        show_full_result_count = False
+
+    Page numbers near the end of an estimate may come back short or empty.
+    """
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        return estimated_count(self.object_list)[0]
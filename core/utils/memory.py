@@ -0,0 +1,323 @@
+"""
+Memory Introspection
+What a worker process holds and where it grows, for right-sizing workers.
+
+  * rss(): resident and peak memory of this process
+  * deep_size(): approximate bytes behind an object graph (numpy-aware)
+  * tracemalloc snapshots kept in-process, their top allocation sites and
+    diffs between any two of them
+  * the modules imported by startup (mark_startup) and since
+  * a leak detector thread that, every MEMORY_LEAK_CHECK_INTERVAL seconds,
+    snapshots allocations and logs the sites that grew the most
+
+Everything here is per process: each answer says which pid it came from.
+tracemalloc costs memory and CPU while tracing, so it is off unless started
+(PYTHONTRACEMALLOC, the admin endpoint, or the leak detector).
+"""
+
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from itertools import count
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MAX_SNAPSHOTS = 5
+GROUP_BY = ('lineno', 'filename', 'traceback')
+
+# Allocations made by the tracing machinery itself are noise
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+_lock = threading.Lock()
+_snapshots = {}  # id -> (label, taken_at, snapshot)
+_snapshot_ids = count(1)
+_startup_modules = None
+_detector_pid = None
+
+
+# ---------- process ----------
+
+def rss():
+    """{'rss_bytes', 'peak_rss_bytes'} for this process (None where unknown)"""
+    result = {'rss_bytes': None, 'peak_rss_bytes': None}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    result['rss_bytes'] = int(line.split()[1]) * 1024
+                elif line.startswith('VmHWM:'):
+                    result['peak_rss_bytes'] = int(line.split()[1]) * 1024
+    except OSError:
+        import resource
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result['peak_rss_bytes'] = peak if sys.platform == 'darwin' else peak * 1024
+    return result
+
+
+def deep_size(obj, max_depth=12):
+    """
+    Approximate bytes reachable from obj: containers, instance __dict__s (or
+    pickled state) and numpy / scipy.sparse buffers. Shared objects are
+    counted once.
+    """
+    seen = {}  # id -> object, kept alive so a temporary's id is not reused
+    stack = [(obj, 0)]
+    total = 0
+    while stack:
+        current, depth = stack.pop()
+        if id(current) in seen or depth > max_depth:
+            continue
+        seen[id(current)] = current
+
+        nbytes = getattr(current, 'nbytes', None)
+        if isinstance(nbytes, int) and hasattr(current, 'dtype'):
+            base = getattr(current, 'base', None)
+            total += sys.getsizeof(current, 0)
+            if isinstance(base, (bytes, bytearray, memoryview)) or hasattr(base, 'dtype'):
+                # A view or an unpickled array: the buffer is counted with its base
+                stack.append((base, depth))
+            else:
+                total += nbytes  # owns its buffer, or wraps an extension object's
+            continue
+        try:
+            total += sys.getsizeof(current)
+        except TypeError:
+            continue
+
+        if isinstance(current, dict):
+            children = [*current.keys(), *current.values()]
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            children = list(current)
+        elif isinstance(current, type):
+            children = ()
+        elif hasattr(current, '__dict__'):
+            children = list(vars(current).values())
+        else:
+            # Extension types (e.g. sklearn's Tree) expose their buffers via pickling state
+            try:
+                state = current.__getstate__()
+            except Exception:
+                state = None
+            children = list(state.values()) if isinstance(state, dict) else ()
+        stack.extend((child, depth + 1) for child in children)
+    return total
+
+
+# ---------- modules ----------
+
+def mark_startup():
+    """Remember the modules loaded once Django is set up"""
+    global _startup_modules
+    if _startup_modules is None:
+        _startup_modules = frozenset(sys.modules)
+
+
+def _package(name):
+    return name.split('.', 1)[0]
+
+
+def modules_report(heavy=('torch', 'transformers', 'pandas', 'sklearn', 'numpy', 'scipy', 'google', 'nltk')):
+    """Module counts per top-level package, at startup and imported since"""
+    current = set(sys.modules)
+    startup = _startup_modules or frozenset()
+    later = sorted(current - startup) if _startup_modules is not None else []
+
+    packages = {}
+    for name in current:
+        packages[_package(name)] = packages.get(_package(name), 0) + 1
+    largest = sorted(packages.items(), key=lambda item: (-item[1], item[0]))[:20]
+
+    return {
+        'loaded': len(current),
+        'at_startup': len(startup) if _startup_modules is not None else None,
+        'imported_since_startup': len(later),
+        'packages_imported_since_startup': sorted({_package(name) for name in later}),
+        'heavy_packages_loaded': [name for name in heavy if name in sys.modules],
+        'largest_packages': [{'package': name, 'modules': modules} for name, modules in largest],
+    }
+
+
+# ---------- tracemalloc snapshots ----------
+
+def start_tracing(frames=None):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames or settings.MEMORY_TRACE_FRAMES)
+
+
+def stop_tracing():
+    """Stop tracing and drop stored snapshots (they keep a lot of memory)"""
+    with _lock:
+        _snapshots.clear()
+    tracemalloc.stop()
+
+
+def tracing_status():
+    current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    return {
+        'tracing': tracemalloc.is_tracing(),
+        'frames': tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else None,
+        'traced_bytes': current,
+        'traced_peak_bytes': peak,
+        'overhead_bytes': tracemalloc.get_tracemalloc_memory(),
+    }
+
+
+def _take():
+    gc.collect()
+    return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+
+def take_snapshot(label=''):
+    """Store a snapshot (tracing must be on); the oldest is dropped past MAX_SNAPSHOTS"""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError('tracemalloc is not tracing')
+    snapshot = _take()
+    with _lock:
+        snapshot_id = next(_snapshot_ids)
+        _snapshots[snapshot_id] = (label, timezone.now(), snapshot)
+        while len(_snapshots) > MAX_SNAPSHOTS:
+            del _snapshots[min(_snapshots)]
+    return snapshot_id
+
+
+def list_snapshots():
+    with _lock:
+        items = sorted(_snapshots.items())
+    return [
+        {'id': snapshot_id, 'label': label, 'taken_at': taken_at,
+         'traced_bytes': sum(stat.size for stat in snapshot.statistics('filename'))}
+        for snapshot_id, (label, taken_at, snapshot) in items
+    ]
+
+
+def _get(snapshot_id):
+    with _lock:
+        entry = _snapshots.get(snapshot_id)
+    if entry is None:
+        raise KeyError(snapshot_id)
+    return entry[2]
+
+
+def _site(traceback, group_by):
+    if group_by == 'traceback':
+        return [f'{frame.filename}:{frame.lineno}' for frame in traceback]
+    frame = traceback[0]
+    return frame.filename if group_by == 'filename' else f'{frame.filename}:{frame.lineno}'
+
+
+def top_allocations(snapshot_id, group_by='lineno', limit=20):
+    """Largest allocation sites of a stored snapshot. Raises KeyError/ValueError"""
+    if group_by not in GROUP_BY:
+        raise ValueError(f'group_by must be one of {", ".join(GROUP_BY)}')
+    return [
+        {'site': _site(stat.traceback, group_by), 'size_bytes': stat.size, 'blocks': stat.count}
+        for stat in _get(snapshot_id).statistics(group_by)[:limit]
+    ]
+
+
+def _growth(new, old, group_by, limit):
+    return [
+        {
+            'site': _site(stat.traceback, group_by),
+            'size_bytes': stat.size,
+            'size_diff_bytes': stat.size_diff,
+            'blocks_diff': stat.count_diff,
+        }
+        for stat in new.compare_to(old, group_by)[:limit]
+    ]
+
+
+def diff(old_id, new_id, group_by='lineno', limit=20):
+    """Sites whose allocations changed the most between two stored snapshots"""
+    if group_by not in GROUP_BY:
+        raise ValueError(f'group_by must be one of {", ".join(GROUP_BY)}')
+    return _growth(_get(new_id), _get(old_id), group_by, limit)
+
+
+# ---------- leak detector ----------
+
+def _run_leak_detector(interval, limit):
+    start_tracing()
+    previous = _take()
+    previous_rss = rss()['rss_bytes']
+    while True:
+        time.sleep(interval)
+        try:
+            if not tracemalloc.is_tracing():
+                # Stopped from the admin endpoint: start over from a new baseline
+                start_tracing()
+                previous, previous_rss = _take(), rss()['rss_bytes']
+                continue
+            current = _take()
+            current_rss = rss()['rss_bytes']
+            growth = [row for row in _growth(current, previous, 'lineno', limit) if row['size_diff_bytes'] > 0]
+            if growth:
+                rss_change = (current_rss - previous_rss) if current_rss and previous_rss else None
+                logger.warning(
+                    f"Memory growth in pid {os.getpid()} over {interval}s "
+                    f"(RSS {current_rss} bytes, change {rss_change}):\n" + '\n'.join(
+                        f"  +{row['size_diff_bytes']} B ({row['blocks_diff']:+d} blocks)  {row['site']}"
+                        for row in growth
+                    )
+                )
+            previous, previous_rss = current, current_rss
+        except Exception:
+            logger.exception("Leak detector failed")
+
+
+def ensure_leak_detector():
+    """Start this process's leak detector when MEMORY_LEAK_CHECK_INTERVAL is set (cheap to call)"""
+    global _detector_pid
+    interval = settings.MEMORY_LEAK_CHECK_INTERVAL
+    if not interval or _detector_pid == os.getpid():
+        return
+    with _lock:
+        if _detector_pid == os.getpid():
+            return
+        threading.Thread(
+            target=_run_leak_detector, args=(interval, settings.MEMORY_LEAK_TOP_SITES),
+            name='leak-detector', daemon=True
+        ).start()
+        _detector_pid = os.getpid()
+
+
+# ---------- caches ----------
+
+def cache_report():
+    """Entries and bytes held by each configured Django cache"""
+    from django.core.cache import caches
+    from django.core.cache.backends.locmem import LocMemCache
+
+    report = {}
+    for alias in settings.CACHES:
+        backend = caches[alias]
+        entry = {'backend': type(backend).__name__}
+        try:
+            if isinstance(backend, LocMemCache):
+                # Values are stored pickled, so their length is what they hold
+                with backend._lock:
+                    entry['entries'] = len(backend._cache)
+                    entry['bytes'] = sum(len(value) for value in backend._cache.values())
+                entry['scope'] = 'process'
+            elif hasattr(backend, '_cache') and hasattr(backend._cache, 'get_client'):
+                info = backend._cache.get_client().info('memory')
+                entry['bytes'] = info.get('used_memory')
+                entry['peak_bytes'] = info.get('used_memory_peak')
+                entry['scope'] = 'server'
+        except Exception as e:
+            entry['error'] = str(e)
+        report[alias] = entry
+    return report
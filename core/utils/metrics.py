@@ -0,0 +1,222 @@
+"""
+In-process Metrics
+Thread-safe counters, gauges and histograms kept per process, and a stage
+timer for one unit of work.
+
+Histograms use fixed buckets: the bucket is found with a bisect outside the
+lock and observing holds it for three additions, so memory stays constant
+however many values are observed; percentiles are interpolated within the
+bucket they fall in. Values are per process and reset on restart: durable
+numbers belong in the database. core.utils.prometheus exports them (and
+aggregates them across worker processes).
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds (milliseconds) of the latency buckets; the last bucket is open
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Buckets for small counts, e.g. database queries per request
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+
+def _key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Counter:
+    """Monotonic count, one series per label set"""
+    kind = 'counter'
+
+    def __init__(self, name, description=''):
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+        self._series = {}  # labels -> value
+
+    def inc(self, amount=1, **labels):
+        key = _key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def series(self):
+        with self._lock:
+            return dict(self._series)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._series.get(_key(labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+
+class Gauge(Counter):
+    """Value that goes up and down, one series per label set"""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = _key(labels)
+        with self._lock:
+            self._series[key] = value
+
+
+class Histogram:
+    """Bucketed distribution of observed values, one series per label set"""
+    kind = 'histogram'
+
+    def __init__(self, name, buckets=LATENCY_BUCKETS_MS, description=''):
+        self.name = name
+        self.buckets = tuple(buckets)
+        self.description = description
+        self._lock = threading.Lock()
+        self._series = {}  # labels -> [bucket counts (+ overflow), sum, count]
+
+    def observe(self, value, **labels):
+        key = _key(labels)
+        index = bisect_left(self.buckets, value)  # first bound >= value, or the overflow bucket
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def series(self):
+        """{labels dict as tuple: (bucket counts, sum, count)}, a consistent copy"""
+        with self._lock:
+            return {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+
+    def percentile(self, q, **labels):
+        """Estimated q-th percentile (0-100) for one label set, or None when empty"""
+        key = _key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                return None
+            counts = list(series[0])
+            count = series[2]
+        return bucket_percentile(self.buckets, counts, count, q)
+
+    def summary(self, percentiles=(50, 95, 99)):
+        """[{'labels': {...}, 'count', 'mean', 'p50', ...}] for every label set"""
+        result = []
+        for key, (counts, total, count) in sorted(self.series().items()):
+            row = {'labels': dict(key), 'count': count, 'mean': round(total / count, 3) if count else None}
+            for q in percentiles:
+                row[f'p{q}'] = bucket_percentile(self.buckets, counts, count, q)
+            result.append(row)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+
+def bucket_percentile(buckets, counts, count, q):
+    """Percentile from bucket counts, interpolated linearly inside the bucket"""
+    if not count:
+        return None
+    rank = q / 100 * count
+    seen = 0
+    for index, bucket_count in enumerate(counts):
+        if bucket_count and seen + bucket_count >= rank:
+            if index == len(buckets):
+                return float(buckets[-1])  # open bucket: report its lower bound
+            lower = buckets[index - 1] if index else 0.0
+            return round(lower + (buckets[index] - lower) * (rank - seen) / bucket_count, 3)
+        seen += bucket_count
+    return float(buckets[-1])
+
+
+def percentile(values, q):
+    """Exact percentile (nearest rank) of a sorted list, or None when empty"""
+    if not values:
+        return None
+    rank = max(1, -(-q * len(values) // 100))  # ceil without floats
+    return values[int(rank) - 1]
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+_collectors = []
+
+
+def _register(name, factory):
+    existing = _registry.get(name)
+    if existing is not None:
+        return existing
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = factory()
+        return _registry[name]
+
+
+def histogram(name, buckets=LATENCY_BUCKETS_MS, description=''):
+    """The process-wide histogram called `name`, created on first use"""
+    return _register(name, lambda: Histogram(name, buckets, description))
+
+
+def counter(name, description=''):
+    """The process-wide counter called `name`, created on first use"""
+    return _register(name, lambda: Counter(name, description))
+
+
+def gauge(name, description=''):
+    """The process-wide gauge called `name`, created on first use"""
+    return _register(name, lambda: Gauge(name, description))
+
+
+def register_collector(collect):
+    """Call collect() before every export, to refresh gauges read from elsewhere"""
+    _collectors.append(collect)
+
+
+def registry():
+    """Every registered metric, by name, after running the collectors"""
+    for collect in list(_collectors):
+        collect()
+    return dict(_registry)
+
+
+def _reset_after_fork():
+    # A forked worker starts counting from zero; otherwise everything the
+    # parent counted before the fork would be counted again by every worker.
+    # Gauges describe state the child shares, so they are kept. Locks are
+    # replaced: one held by another parent thread would never be released.
+    for metric in list(_registry.values()):
+        metric._lock = threading.Lock()
+        if metric.kind != 'gauge':
+            metric._series = {}
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class StageTimer:
+    """Wall-clock duration of the named stages of one unit of work, in ms"""
+
+    def __init__(self):
+        self.timings = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name, milliseconds):
+        self.timings[name] = round(self.timings.get(name, 0) + milliseconds, 3)
+
+    def elapsed(self):
+        """ms since the timer was created"""
+        return round((time.perf_counter() - self._started) * 1000, 3)
@@ -0,0 +1,165 @@
+"""
+Sampling Profiler
+Profiles one thread (one request) by sampling its stack from a second thread.
+
+The profiled thread runs unmodified: no sys.setprofile hooks, no per-call
+overhead. Every PROFILER_INTERVAL_MS the sampler thread reads the target's
+current frame (sys._current_frames) and counts the stack. The result is in
+the folded-stack format ("outer;inner;leaf count" per line) that
+flamegraph.pl, speedscope and inferno read directly.
+
+Profiles are kept for PROFILER_TTL seconds as files under PROFILER_DIR, so
+every worker that can see the directory can list and serve them (a
+process-local cache would 404 on whichever worker did not record it).
+Profiling is off when PROFILER_DIR is empty.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.utils import timezone
+
+MAX_LISTED = 100
+
+_base_dir = str(settings.BASE_DIR) + os.sep
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(_base_dir):
+        filename = filename[len(_base_dir):]
+    elif 'site-packages' + os.sep in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread until stopped"""
+
+    def __init__(self, thread_id=None, interval_ms=None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = (interval_ms or settings.PROFILER_INTERVAL_MS) / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._labels = {}  # code object -> label, formatted once
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._started = None
+        self.duration = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+        return self
+
+    def _run(self):
+        current_frames = sys._current_frames
+        labels = self._labels
+        while not self._stop.wait(self.interval):
+            frame = current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.stacks[';'.join(stack)] += 1
+                self.samples += 1
+
+    def folded(self):
+        """Folded stacks, heaviest first"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+# ---------- storage ----------
+
+def enabled():
+    """Whether profiles can be stored (PROFILER_DIR is set)"""
+    return bool(settings.PROFILER_DIR)
+
+
+def save_profile(profiler, **details):
+    """Store a finished profile under PROFILER_DIR and return its id"""
+    directory = settings.PROFILER_DIR
+    if not directory:
+        raise RuntimeError('PROFILER_DIR is not set')
+    profile_id = uuid.uuid4().hex[:16]
+    meta = dict(
+        details,
+        id=profile_id,
+        created_at=timezone.now().isoformat(),
+        duration_ms=round(profiler.duration * 1000, 1),
+        samples=profiler.samples,
+        interval_ms=round(profiler.interval * 1000, 3),
+    )
+
+    os.makedirs(directory, exist_ok=True)
+    _prune(directory)
+    # The .json is renamed into place last: other workers list a profile
+    # only once both files are complete
+    with open(os.path.join(directory, f'{profile_id}.folded'), 'w') as f:
+        f.write(profiler.folded())
+    partial = os.path.join(directory, f'{profile_id}.json.tmp')
+    with open(partial, 'w') as f:
+        json.dump(meta, f)
+    os.replace(partial, os.path.join(directory, f'{profile_id}.json'))
+    return profile_id
+
+
+def _prune(directory):
+    """Delete profile files older than PROFILER_TTL"""
+    cutoff = time.time() - settings.PROFILER_TTL
+    for filename in os.listdir(directory):
+        path = os.path.join(directory, filename)
+        try:
+            if filename.endswith(('.json', '.folded', '.tmp')) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            continue  # removed concurrently
+
+
+def get_profile(profile_id):
+    """(meta, folded text) for a stored profile, or None"""
+    directory = settings.PROFILER_DIR
+    if not directory or not profile_id.isalnum():
+        return None
+    try:
+        with open(os.path.join(directory, f'{profile_id}.json')) as f:
+            meta = json.load(f)
+        with open(os.path.join(directory, f'{profile_id}.folded')) as f:
+            return meta, f.read()
+    except FileNotFoundError:
+        return None
+
+
+def list_profiles():
+    """Metadata of stored profiles, newest first"""
+    directory = settings.PROFILER_DIR
+    if not directory or not os.path.isdir(directory):
+        return []
+    profiles = []
+    for filename in os.listdir(directory):
+        if filename.endswith('.json'):
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    profiles.sort(key=lambda meta: meta['created_at'], reverse=True)
+    return profiles[:MAX_LISTED]
@@ -0,0 +1,214 @@
+"""
+Prometheus Export
+Renders the in-process metrics (core.utils.metrics) in the Prometheus text
+exposition format, aggregated across worker processes.
+
+With METRICS_MULTIPROC_DIR set (a directory shared by the workers of one
+host, emptied on deploy), every process writes a JSON snapshot of its metrics
+there every METRICS_SNAPSHOT_INTERVAL seconds and at exit, and a scrape
+merges all snapshots: counters and histograms are summed, so a worker that
+exited keeps contributing what it counted, while gauges are reported per live
+process with a `pid` label. Without it a scrape sees only the process that
+serves it, which is right for a single-process server.
+"""
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from core.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+SNAPSHOT_PREFIX = 'metrics_'
+
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def snapshot():
+    """This process's metrics as JSON-serializable data"""
+    data = {}
+    for name, metric in metrics.registry().items():
+        entry = {'kind': metric.kind, 'description': metric.description}
+        if metric.kind == 'histogram':
+            entry['buckets'] = list(metric.buckets)
+            entry['series'] = [
+                [list(key), counts, total, count]
+                for key, (counts, total, count) in metric.series().items()
+            ]
+        else:
+            entry['series'] = [[list(key), value] for key, value in metric.series().items()]
+        data[name] = entry
+    return data
+
+
+def merge(snapshots, per_pid=False):
+    """
+    Combine [(pid, snapshot, alive)] into {name: metric} with series keyed by
+    label tuples. Gauges of dead processes are dropped.
+    """
+    merged = {}
+    for pid, data, alive in snapshots:
+        for name, entry in data.items():
+            target = merged.setdefault(name, {
+                'kind': entry['kind'],
+                'description': entry['description'],
+                'buckets': entry.get('buckets'),
+                'series': {},
+            })
+            if target['kind'] != entry['kind'] or target['buckets'] != entry.get('buckets'):
+                continue  # definition changed between deploys: keep the first one seen
+
+            for row in entry['series']:
+                key = tuple(tuple(pair) for pair in row[0])
+                if entry['kind'] == 'gauge':
+                    if not alive:
+                        continue
+                    if per_pid:
+                        key += (('pid', str(pid)),)
+                    target['series'][key] = row[1]
+                elif entry['kind'] == 'counter':
+                    target['series'][key] = target['series'].get(key, 0) + row[1]
+                else:
+                    counts, total, count = row[1:]
+                    existing = target['series'].get(key)
+                    if existing is None:
+                        target['series'][key] = [list(counts), total, count]
+                    else:
+                        existing[0] = [a + b for a, b in zip(existing[0], counts)]
+                        existing[1] += total
+                        existing[2] += count
+    return merged
+
+
+# ---------- text format ----------
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def render(merged):
+    """Prometheus text exposition of merged metrics"""
+    lines = []
+    for name in sorted(merged):
+        entry = merged[name]
+        if entry['description']:
+            lines.append(f"# HELP {name} {_escape(entry['description'])}")
+        lines.append(f"# TYPE {name} {entry['kind']}")
+
+        for key in sorted(entry['series']):
+            value = entry['series'][key]
+            if entry['kind'] != 'histogram':
+                lines.append(f'{name}{_labels(key)} {_number(value)}')
+                continue
+
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(entry['buckets'], counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_labels(key, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(key, [("le", "+Inf")])} {count}')
+            lines.append(f'{name}_sum{_labels(key)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(key)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+# ---------- multi-process ----------
+
+def _snapshot_path(directory, pid):
+    return os.path.join(directory, f'{SNAPSHOT_PREFIX}{pid}.json')
+
+
+def write_snapshot():
+    """Atomically replace this process's snapshot file"""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return
+    payload = json.dumps({'pid': os.getpid(), 'written_at': time.time(), 'metrics': snapshot()})
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix='.' + SNAPSHOT_PREFIX)
+    with os.fdopen(fd, 'w') as f:
+        f.write(payload)
+    os.replace(temporary, _snapshot_path(directory, os.getpid()))
+
+
+def _run_writer():
+    while True:
+        time.sleep(settings.METRICS_SNAPSHOT_INTERVAL)
+        try:
+            write_snapshot()
+        except Exception:
+            logger.exception("Could not write metrics snapshot")
+
+
+def _write_final_snapshot():
+    try:
+        write_snapshot()
+    except Exception:
+        pass
+
+
+def ensure_writer():
+    """Start this process's snapshot writer if multi-process mode is on (cheap to call)"""
+    global _writer_pid
+    if not settings.METRICS_MULTIPROC_DIR or _writer_pid == os.getpid():
+        return
+    with _writer_lock:
+        # A forked worker inherits _writer_pid but not the thread
+        if _writer_pid == os.getpid():
+            return
+        os.makedirs(settings.METRICS_MULTIPROC_DIR, exist_ok=True)
+        threading.Thread(target=_run_writer, name='metrics-writer', daemon=True).start()
+        atexit.register(_write_final_snapshot)
+        _writer_pid = os.getpid()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect():
+    """Merged metrics of every worker (or just this process)"""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return merge([(os.getpid(), snapshot(), True)])
+
+    ensure_writer()
+    write_snapshot()  # the serving process is always current
+    snapshots = []
+    for filename in os.listdir(directory):
+        if not (filename.startswith(SNAPSHOT_PREFIX) and filename.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            continue  # removed or unreadable: skip this scrape
+        snapshots.append((document['pid'], document['metrics'], _alive(document['pid'])))
+    return merge(snapshots, per_pid=True)
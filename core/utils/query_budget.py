@@ -0,0 +1,112 @@
+"""
+Query Budgets
+Per-view limits on database queries per request, and the SQL-shape
+bookkeeping used to spot N+1 patterns.
+
+A view declares its budget with a `query_budget` class attribute (class-based
+views) or the @query_budget(n) decorator (function views, placed above
+@api_view); views without one get QUERY_BUDGET_DEFAULT. The middleware
+(core.middleware.query_budget) logs requests over budget, core.utils.testing
+fails tests on them.
+"""
+
+import re
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+# Parameter lists of any length are one shape: IN (%s, %s, %s) -> IN (%s, ...)
+_PARAMETER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+# Literals inlined by the backend (LIMIT 21, OFFSET 40)
+_NUMBER = re.compile(r'\b\d+\b')
+
+
+def query_budget(limit):
+    """Declare the query budget of a function view (put it above @api_view)"""
+    def decorate(view):
+        view.query_budget = limit
+        return view
+    return decorate
+
+
+def budget_for(view_func):
+    """The declared budget of a resolved view callable, or QUERY_BUDGET_DEFAULT"""
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+        budget = getattr(view_class, 'query_budget', None)
+    return settings.QUERY_BUDGET_DEFAULT if budget is None else budget
+
+
+def view_name(view_func):
+    view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+    target = view_class if view_class is not None and view_class.__name__ != 'WrappedAPIView' else view_func
+    return f'{target.__module__}.{target.__name__}'
+
+
+@contextmanager
+def all_connections(wrapper):
+    """Install an execute wrapper on every configured database (primary and replica)"""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
+
+
+def sql_shape(sql):
+    """SQL with parameter lists and inline numbers collapsed, whitespace normalized"""
+    sql = _PARAMETER_LIST.sub('(%s, ...)', sql)
+    sql = _NUMBER.sub('N', sql)
+    return ' '.join(sql.split())
+
+
+class QueryLog:
+    """
+    Database execute wrapper that counts queries and their time by SQL text.
+    Shapes are only computed when reporting, so the hot path is one dict update.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.milliseconds = 0.0
+        self._by_sql = {}  # sql -> [count, ms]
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.milliseconds += elapsed
+            entry = self._by_sql.get(sql)
+            if entry is None:
+                self._by_sql[sql] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+
+    def shapes(self):
+        """[(count, ms, shape)], most repeated first"""
+        merged = {}
+        for sql, (count, elapsed) in self._by_sql.items():
+            entry = merged.setdefault(sql_shape(sql), [0, 0.0])
+            entry[0] += count
+            entry[1] += elapsed
+        return sorted(
+            ((count, round(elapsed, 3), shape) for shape, (count, elapsed) in merged.items()),
+            key=lambda row: (-row[0], -row[1])
+        )
+
+    def repeated(self, threshold):
+        """Shapes run at least `threshold` times: the usual sign of an N+1"""
+        return [row for row in self.shapes() if row[0] >= threshold]
+
+    def report(self, limit=5, width=300):
+        """Top shapes, one per line"""
+        return '\n'.join(
+            f'  {count}x {elapsed}ms  {shape[:width]}'
+            for count, elapsed, shape in self.shapes()[:limit]
+        )
@@ -0,0 +1,121 @@
+"""
+Read Replica Routing
+Sends the reads of read-only views (analytics, admin listings) to the
+`replica` database so dashboard traffic stays off the primary that serves
+chat writes. Used only when DATABASE_REPLICA_URL is set.
+
+A view opts in with a `read_replica = True` class attribute (class-based
+views) or the @read_replica decorator (function views, placed above
+@api_view); only its GET/HEAD requests are routed. Everything else, and
+every write, uses the primary.
+
+Pinning keeps a client's reads consistent with its own writes despite
+replication lag: once a request writes, the rest of it reads from the
+primary, and its caller stays on the primary for REPLICA_PIN_SECONDS
+(core.middleware.replica). An authenticated user is pinned in the cache,
+which API (JWT) and cross-origin clients need since they do not send
+cookies back; anonymous clients get a cookie. The pin is seen by every
+worker only when the cache is shared (Redis).
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'replica_pin'
+PIN_KEY = 'replica:pin:{}'
+
+
+class _Routing:
+    """Per-request (or per-block) routing state"""
+
+    def __init__(self, use_replica=False):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+_routing = ContextVar('replica_routing', default=None)
+
+
+def read_replica(view):
+    """Let a function view read from the replica (put it above @api_view)"""
+    view.read_replica = True
+    return view
+
+
+def replica_allowed(view_func):
+    """Whether a resolved view callable opted in to replica reads"""
+    if getattr(view_func, 'read_replica', False):
+        return True
+    view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+    return bool(getattr(view_class, 'read_replica', False))
+
+
+@contextmanager
+def routing(use_replica=False):
+    """Route the reads of this block (this thread/task only)"""
+    state = _Routing(use_replica)
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+def current():
+    return _routing.get()
+
+
+def routed(iterable, state):
+    """
+    Iterate under `state`'s routing: a streamed response body is read after
+    the request's routing block has ended, and would otherwise hit the primary.
+    """
+    iterator = iter(iterable)
+    while True:
+        token = _routing.set(state)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _routing.reset(token)
+        yield item
+
+
+def pin_user(user_id):
+    """Keep this user's reads on the primary for REPLICA_PIN_SECONDS"""
+    cache.set(PIN_KEY.format(user_id), 1, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def user_pinned(user_id):
+    return cache.get(PIN_KEY.format(user_id)) is not None
+
+
+class ReplicaRouter:
+    """Replica for opted-in reads until something is written; the primary otherwise"""
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is not None and state.use_replica and not state.wrote:
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        # Explicit: Django would otherwise write an instance back to the database it was read from
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both aliases
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica's schema comes from replication
+        return db != REPLICA_ALIAS
@@ -0,0 +1,64 @@
+"""
+Test Helpers
+Query budget assertions for API views.
+
+    from core.utils.testing import assert_query_budget, assert_view_query_budget
+
+    response = assert_view_query_budget(client, 'get', '/api/chatbot/conversations/')
+
+    with assert_query_budget(3):
+        ChatbotService().process_message('hello', user=user)
+
+assert_view_query_budget resolves the URL and holds the request to the view's
+declared budget (core.utils.query_budget), so tightening or loosening a budget
+is a one-line change on the view (streamed bodies are read inside the
+count); both helpers also fail on a repeated SQL shape (an N+1) unless
+allow_repeats is set.
+"""
+
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.urls import resolve
+
+from core.utils.query_budget import QueryLog, all_connections, budget_for, view_name
+
+
+def _check(log, budget, allow_repeats, label):
+    if log.count > budget:
+        raise AssertionError(
+            f"{label} ran {log.count} queries, budget is {budget}:\n{log.report(limit=10)}"
+        )
+    repeated = log.repeated(settings.QUERY_REPEAT_THRESHOLD)
+    if repeated and not allow_repeats:
+        raise AssertionError(
+            f"{label} ran one query {repeated[0][0]} times (possible N+1):\n{log.report(limit=10)}"
+        )
+
+
+@contextmanager
+def assert_query_budget(budget, allow_repeats=False, label='Block'):
+    """Fail if the block runs more than `budget` queries (or repeats one)"""
+    log = QueryLog()
+    with all_connections(log):
+        yield log
+    _check(log, budget, allow_repeats, label)
+
+
+def assert_view_query_budget(client, method, path, data=None, budget=None, allow_repeats=False, **extra):
+    """
+    Make a request with a Django/DRF test client and fail if it runs more
+    queries than the view's budget (or `budget`). Returns the response.
+    """
+    view = resolve(path.split('?', 1)[0]).func
+    if budget is None:
+        budget = budget_for(view)
+
+    log = QueryLog()
+    with all_connections(log):
+        response = getattr(client, method.lower())(path, data, **extra)
+        if getattr(response, 'streaming', False):
+            # A streamed body runs its queries while it is read
+            response.streaming_content = [b''.join(response.streaming_content)]
+    _check(log, budget, allow_repeats, f'{method.upper()} {path} ({view_name(view)})')
+    return response
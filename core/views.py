@@ -0,0 +1,31 @@
+"""
+Core Views
+"""
+
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_http_methods
+
+from core.utils import prometheus
+from core.utils.auth import is_staff_request
+
+
+def _may_scrape(request):
+    """Bearer METRICS_TOKEN or a staff user; open only in DEBUG with no token set"""
+    token = settings.METRICS_TOKEN
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    if is_staff_request(request):
+        return True
+    return settings.DEBUG and not token
+
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """Prometheus scrape endpoint for METRICS_TOKEN holders and staff"""
+    if not _may_scrape(request):
+        return HttpResponse(status=401)
+
+    return HttpResponse(prometheus.render(prometheus.collect()), content_type=prometheus.CONTENT_TYPE)
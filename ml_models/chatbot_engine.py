@@ -3,11 +3,19 @@ Chatbot Prediction Engine
 Loads trained model and generates responses
 """
 
+import hashlib
 import pickle
 import random
+import time
 from pathlib import Path
 
 
+def _record(timings, stage, started):
+    """Add the ms since `started` to timings[stage] (no-op without a dict)"""
+    if timings is not None:
+        timings[stage] = round(timings.get(stage, 0) + (time.perf_counter() - started) * 1000, 3)
+
+
 class ChatbotEngine:
     def __init__(self):
         self.base_dir = Path(__file__).resolve().parent.parent
@@ -18,6 +26,10 @@ class ChatbotEngine:
         self._lemmatizer = None
         self._models_loaded = False
 
+        # Set by load_models(): seconds it took and a short hash of the model file
+        self.load_seconds = None
+        self.model_version = None
+
     def _ensure_nltk_loaded(self):
         """Lazy load NLTK only when needed"""
         if not self._nltk_loaded:
@@ -39,10 +51,13 @@ class ChatbotEngine:
         if self._models_loaded:
             return
 
+        started = time.perf_counter()
         try:
             # Load model
             with open(self.model_path / 'chatbot_model.pkl', 'rb') as f:
-                self.model = pickle.load(f)
+                model_bytes = f.read()
+            self.model = pickle.loads(model_bytes)
+            self.model_version = hashlib.sha256(model_bytes).hexdigest()[:12]
 
             # Load vectorizer
             with open(self.model_path / 'vectorizer.pkl', 'rb') as f:
@@ -52,6 +67,7 @@ class ChatbotEngine:
             with open(self.model_path / 'responses.pkl', 'rb') as f:
                 self.responses_dict = pickle.load(f)
 
+            self.load_seconds = time.perf_counter() - started
             self._models_loaded = True
             print("✓ Models loaded successfully!")
 
@@ -65,6 +81,8 @@ class ChatbotEngine:
                 'thanks': ['You\'re welcome!', 'Happy to help!', 'Anytime!'],
                 'default': ['I\'m here to help! Can you rephrase that?']
             }
+            self.model_version = 'fallback'
+            self.load_seconds = time.perf_counter() - started
             self._models_loaded = True
 
         except Exception as e:
@@ -80,37 +98,88 @@ class ChatbotEngine:
         lemmatized = [self._lemmatizer.lemmatize(word) for word in tokens]
         return ' '.join(lemmatized)
 
-    def predict_intent(self, message):
-        """Predict intent from user message"""
+    def _fallback_intent(self, message):
+        """Simple keyword matching when no trained model is available"""
+        message_lower = message.lower()
+        if any(word in message_lower for word in ['hi', 'hello', 'hey']):
+            return 'greeting', 0.8
+        elif any(word in message_lower for word in ['bye', 'goodbye', 'see you']):
+            return 'goodbye', 0.8
+        elif any(word in message_lower for word in ['thanks', 'thank you']):
+            return 'thanks', 0.8
+        else:
+            return 'default', 0.5
+
+    def predict_intent(self, message, timings=None):
+        """
+        Predict intent from user message.
+        With a timings dict, adds ml_preprocess/ml_vectorize/ml_predict (ms) to it.
+        """
         self.load_models()
 
         if self.model is None:
-            # Fallback: Simple keyword matching
-            message_lower = message.lower()
-            if any(word in message_lower for word in ['hi', 'hello', 'hey']):
-                return 'greeting', 0.8
-            elif any(word in message_lower for word in ['bye', 'goodbye', 'see you']):
-                return 'goodbye', 0.8
-            elif any(word in message_lower for word in ['thanks', 'thank you']):
-                return 'thanks', 0.8
-            else:
-                return 'default', 0.5
+            started = time.perf_counter()
+            result = self._fallback_intent(message)
+            _record(timings, 'ml_predict', started)
+            return result
 
         # Preprocess message
+        started = time.perf_counter()
         processed_message = self.preprocess_text(message)
+        _record(timings, 'ml_preprocess', started)
 
         # Vectorize
+        started = time.perf_counter()
         message_vector = self.vectorizer.transform([processed_message]).toarray()
+        _record(timings, 'ml_vectorize', started)
 
         # Predict intent
+        started = time.perf_counter()
         intent = self.model.predict(message_vector)[0]
 
         # Get confidence (probability)
         probabilities = self.model.predict_proba(message_vector)[0]
         confidence = max(probabilities)
+        _record(timings, 'ml_predict', started)
 
         return intent, confidence
 
+    def predict_intents(self, messages, timings=None):
+        """
+        Predict intents for many messages in one vectorized pass.
+        Returns a list of (intent, confidence) in input order.
+        With a timings dict, adds the stage totals for the whole batch to it.
+        """
+        self.load_models()
+
+        if not messages:
+            return []
+
+        if self.model is None:
+            started = time.perf_counter()
+            result = [self._fallback_intent(message) for message in messages]
+            _record(timings, 'ml_predict', started)
+            return result
+
+        started = time.perf_counter()
+        processed = [self.preprocess_text(message) for message in messages]
+        _record(timings, 'ml_preprocess', started)
+
+        started = time.perf_counter()
+        vectors = self.vectorizer.transform(processed).toarray()
+        _record(timings, 'ml_vectorize', started)
+
+        # One predict_proba call; argmax over classes_ matches model.predict
+        started = time.perf_counter()
+        probabilities = self.model.predict_proba(vectors)
+        best = probabilities.argmax(axis=1)
+        _record(timings, 'ml_predict', started)
+
+        return [
+            (str(self.model.classes_[index]), float(probabilities[row, index]))
+            for row, index in enumerate(best)
+        ]
+
     def get_response(self, intent):
         """Get a random response for the predicted intent"""
         if intent in self.responses_dict:
@@ -119,11 +188,11 @@ class ChatbotEngine:
         else:
             return "I'm not sure how to respond to that. Can you rephrase?"
 
-    def chat(self, message):
+    def chat(self, message, timings=None):
         """Main chat function - predicts intent and returns response"""
         try:
             # Predict intent
-            intent, confidence = self.predict_intent(message)
+            intent, confidence = self.predict_intent(message, timings)
 
             # Get response
             response = self.get_response(intent)
@@ -143,6 +212,31 @@ class ChatbotEngine:
                 'response': f"Sorry, I encountered an error: {str(e)}"
             }
 
+    def chat_batch(self, messages, timings=None):
+        """Batched chat(): one prediction pass, same result shape per message"""
+        try:
+            predictions = self.predict_intents(messages, timings)
+        except Exception as e:
+            return [
+                {
+                    'message': message,
+                    'intent': 'error',
+                    'confidence': 0.0,
+                    'response': f"Sorry, I encountered an error: {str(e)}"
+                }
+                for message in messages
+            ]
+
+        return [
+            {
+                'message': message,
+                'intent': intent,
+                'confidence': float(confidence),
+                'response': self.get_response(intent)
+            }
+            for message, (intent, confidence) in zip(messages, predictions)
+        ]
+
 
 # Test the chatbot
 if __name__ == "__main__":
@@ -7,8 +7,15 @@ import google.generativeai as genai
 from decouple import config
 import logging
 
+try:
+    from google.api_core.exceptions import DeadlineExceeded
+except ImportError:
+    DeadlineExceeded = TimeoutError
+
 logger = logging.getLogger(__name__)
 
+TIMEOUT_ERRORS = (TimeoutError, DeadlineExceeded)
+
 
 class GeminiEngine:
     """
@@ -19,6 +26,7 @@ class GeminiEngine:
     def __init__(self):
         """Initialize Gemini client"""
         api_key = config('GEMINI_API_KEY', default=None)
+        self.timeout = config('GEMINI_TIMEOUT', default=30, cast=int)
 
         if not api_key:
             logger.warning("Gemini API key not found")
@@ -95,12 +103,14 @@ Keep responses short and to the point."""
                             'parts': [msg['content']]
                         })
 
-                self.chat_session = self.model.start_chat(history=history)
-                response = self.chat_session.send_message(message)
+                # Local session so concurrent calls on one engine don't share it
+                chat_session = self.model.start_chat(history=history)
+                self.chat_session = chat_session
+                response = chat_session.send_message(message, request_options={'timeout': self.timeout})
             else:
                 # Single message
                 full_prompt = f"{system_prompt}\n\nUser: {message}\nAssistant:"
-                response = self.model.generate_content(full_prompt)
+                response = self.model.generate_content(full_prompt, request_options={'timeout': self.timeout})
 
             # Extract response text
             bot_response = response.text
@@ -116,7 +126,8 @@ Keep responses short and to the point."""
             return {
                 'response': f"Sorry, I encountered an error: {str(e)}",
                 'intent': 'error',
-                'confidence': 0.0
+                'confidence': 0.0,
+                'error_type': 'timeout' if isinstance(e, TIMEOUT_ERRORS) else 'error'
             }
 
 